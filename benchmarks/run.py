@@ -0,0 +1,330 @@
+"""Benchmark `curl()` against a local copy of the test server
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Every metric is written as `{"value": ..., "unit": ..., "better": ...}`.
+With `--baseline`, metrics that got worse than the baseline by more than
+`--tolerance` are reported and the run exits with status 1.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LARGE_BODY_SIZE = 32 * 1024 * 1024
+
+METRICS = typing.Dict[str, typing.Dict[str, typing.Any]]
+
+
+def metric(
+    value: float, unit: str, better: str = "lower"
+) -> typing.Dict[str, typing.Any]:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def percentile(samples: typing.List[float], percent: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server() -> typing.Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "tests.server:app",
+            "--log-level",
+            "critical",
+            "--port",
+            str(port),
+        ],
+        cwd=ROOT,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, "http://127.0.0.1:%d" % port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The benchmark server didn't start")
+
+
+def _per_call(
+    function: typing.Callable[[], typing.Any], calls: int, rounds: int = 5
+) -> float:
+    """Duration of one `function` call in microseconds
+
+    Like `timeit`, the fastest of several rounds is kept, since slower rounds
+    mostly measure interference from the rest of the machine.
+    """
+    for _ in range(min(calls, 50)):
+        function()
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - started) / calls)
+    return best * 1e6
+
+
+def bench_overhead(url: str, calls: int) -> METRICS:
+    """What `curl()` costs on top of calling `requests` directly
+
+    `curl_urllib3` is the same call through the lighter `urllib3` engine.
+    """
+    import requests
+
+    from httpalchemy import curl
+    from httpalchemy._curl import create_curl_request
+
+    session = requests.Session()
+    direct = _per_call(lambda: session.get(url), calls)
+    wrapped = _per_call(lambda: curl(url), calls)
+    lightweight = _per_call(lambda: curl(url, engine="urllib3"), calls)
+    build = _per_call(
+        lambda: create_curl_request(url, _H=["Accept: */*"], _d="a=1"), calls * 10
+    )
+    session.close()
+    return {
+        "overhead.requests_direct": metric(direct, "us"),
+        "overhead.curl_requests": metric(wrapped, "us"),
+        "overhead.curl_vs_direct": metric(wrapped / direct, "x"),
+        "overhead.curl_urllib3": metric(lightweight, "us"),
+        "overhead.create_curl_request": metric(build, "us"),
+    }
+
+
+def _throughput_metrics(
+    name: str, latencies: typing.List[float], elapsed: float
+) -> METRICS:
+    return {
+        "%s.requests_per_second"
+        % name: metric(len(latencies) / elapsed, "req/s", better="higher"),
+        "%s.p50" % name: metric(percentile(latencies, 50) * 1e3, "ms"),
+        "%s.p90" % name: metric(percentile(latencies, 90) * 1e3, "ms"),
+        "%s.p99" % name: metric(percentile(latencies, 99) * 1e3, "ms"),
+    }
+
+
+def bench_throughput(url: str, requests: int, concurrency: int) -> METRICS:
+    """Throughput and latency percentiles of each engine under concurrency"""
+    from httpalchemy import acurl
+    from httpalchemy import curl
+
+    results: METRICS = {}
+    for engine in ("requests", "httpx", "urllib3"):
+
+        def timed(_: int) -> float:
+            started = time.perf_counter()
+            curl(url, engine=engine)
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, range(concurrency)))
+            started = time.perf_counter()
+            latencies = list(executor.map(timed, range(requests)))
+            elapsed = time.perf_counter() - started
+        results.update(_throughput_metrics("threads.%s" % engine, latencies, elapsed))
+
+    async def main() -> typing.Tuple[typing.List[float], float]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed() -> float:
+            async with semaphore:
+                started = time.perf_counter()
+                await acurl(url, engine="httpx")
+                return time.perf_counter() - started
+
+        await asyncio.gather(*(timed() for _ in range(concurrency)))
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(timed() for _ in range(requests)))
+        return list(latencies), time.perf_counter() - started
+
+    latencies, elapsed = asyncio.run(main())
+    results.update(_throughput_metrics("asyncio.httpx", latencies, elapsed))
+    return results
+
+
+def _peak_memory(function: typing.Callable[[], typing.Any]) -> float:
+    """Peak Python heap growth while `function` runs, in MiB"""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(server: str, size: int) -> METRICS:
+    """Peak memory of large uploads and downloads"""
+    from httpalchemy import curl
+
+    results: METRICS = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "body")
+        with open(path, "wb") as file:
+            file.write(os.urandom(1024 * 1024) * (size // (1024 * 1024)))
+        output = os.path.join(directory, "download")
+
+        for engine in ("requests", "httpx", "urllib3"):
+            upload = _peak_memory(
+                lambda: curl(server + "/discard", _T=path, engine=engine)
+            )
+            download = _peak_memory(
+                lambda: curl(server + "/bytes/%d" % size, _o=output, engine=engine)
+            )
+            results["memory.%s.upload" % engine] = metric(upload, "MiB")
+            results["memory.%s.download" % engine] = metric(download, "MiB")
+    return results
+
+
+def bench_import(runs: int) -> METRICS:
+    """Time to `import httpalchemy` and to start each engine, in fresh interpreters"""
+    code = (
+        "import json, time; started = time.perf_counter(); import httpalchemy; "
+        "imported = time.perf_counter() - started; "
+        "from httpalchemy._engines import cold_start_times, get_engine; "
+        "[get_engine(name) for name in ('requests', 'httpx', 'urllib3')]; "
+        "print(json.dumps(dict(cold_start_times(), httpalchemy=imported)))"
+    )
+    samples: typing.Dict[str, typing.List[float]] = {}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        for name, seconds in json.loads(output).items():
+            samples.setdefault(name, []).append(seconds)
+    return {
+        "import.httpalchemy": metric(
+            statistics.median(samples.pop("httpalchemy")) * 1e3, "ms"
+        ),
+        **{
+            "import.engine.%s" % name: metric(statistics.median(values) * 1e3, "ms")
+            for name, values in sorted(samples.items())
+        },
+    }
+
+
+def compare(results: METRICS, baseline: METRICS, tolerance: float) -> typing.List[str]:
+    """Describe every metric that regressed past `tolerance` (0.2 is 20%)"""
+    regressions = []
+    for name, expected in sorted(baseline.items()):
+        current = results.get(name)
+        if current is None or not expected["value"]:
+            continue
+        change = (current["value"] - expected["value"]) / expected["value"]
+        if expected["better"] == "higher":
+            change = -change
+        if change > tolerance:
+            regressions.append(
+                "%s: %s %s -> %s %s (%+.0f%%)"
+                % (
+                    name,
+                    expected["value"],
+                    expected["unit"],
+                    current["value"],
+                    current["unit"],
+                    change * 100,
+                )
+            )
+    return regressions
+
+
+def run(arguments: argparse.Namespace) -> METRICS:
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    results: METRICS = {}
+    if "import" in arguments.suites:
+        results.update(bench_import(arguments.import_runs))
+    process, server = start_server()
+    try:
+        if "overhead" in arguments.suites:
+            results.update(bench_overhead(server + "/", arguments.calls))
+        if "throughput" in arguments.suites:
+            results.update(
+                bench_throughput(
+                    server + "/", arguments.requests, arguments.concurrency
+                )
+            )
+        if "memory" in arguments.suites:
+            results.update(bench_memory(server, arguments.body_size))
+    finally:
+        from httpalchemy import close_engines
+
+        close_engines()
+        process.terminate()
+        process.wait()
+    return results
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--suites",
+        nargs="+",
+        default=["overhead", "throughput", "memory", "import"],
+        choices=["overhead", "throughput", "memory", "import"],
+    )
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--body-size", type=int, default=LARGE_BODY_SIZE)
+    parser.add_argument("--import-runs", type=int, default=10)
+    arguments = parser.parse_args(argv)
+
+    results = run(arguments)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "metrics": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)["metrics"]
+        regressions = compare(results, baseline, arguments.tolerance)
+        for regression in regressions:
+            print("REGRESSION %s" % regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,37 @@
+from ._batch import BatchResult
+from ._batch import curl_many
+from ._cache import CacheEngine
+from ._cache import FileCache
+from ._cache import MemoryCache
+from ._command import curl_cmd
+from ._curl import acurl
 from ._curl import curl
+from ._engines import Engine
+from ._engines import close_engines
+from ._engines import cold_start_times
+from ._engines import engines
+from ._engines import get_engine
+from ._engines import register_engine
+from ._headers import Headers
+from ._json import JSONCodec
+from ._json import set_json_codec
+from ._metrics import metrics
+from ._ratelimit import set_rate_limit
+from ._replay import RecordingEngine
+from ._replay import ReplayStore
+from ._template import CurlTemplate
+from ._timings import Timings
+from .config import PoolLimits
+
+
+def __getattr__(name: str):
+    # Engine classes import their HTTP library, so only when they're asked for
+    if name == "AppEngine":
+        from ._app_engine import AppEngine
+
+        return AppEngine
+    if name in ("requestsEngine", "httpxEngine", "urllib3Engine"):
+        from . import _engines
+
+        return getattr(_engines, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -0,0 +1,142 @@
+import asyncio
+import inspect
+import threading
+import typing
+
+import httpx
+
+from ._engines import Engine
+from ._exceptions import InvalidOptionError
+from ._httpx_engine import httpxEngine
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+ASGI = "asgi"
+WSGI = "wsgi"
+
+
+def detect_interface(app: typing.Callable) -> str:
+    """`"asgi"` for coroutine applications, `"wsgi"` for the others"""
+    call = app if inspect.isfunction(app) or inspect.ismethod(app) else app.__call__
+    return ASGI if asyncio.iscoroutinefunction(call) else WSGI
+
+
+class SyncASGITransport(httpx.BaseTransport):
+    """Runs an ASGI application for synchronous clients, on an event loop of
+    its own in a background thread
+    """
+
+    def __init__(self, transport: httpx.ASGITransport):
+        self.transport = transport
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="httpalchemy-asgi",
+                    daemon=True,
+                ).start()
+        return self._loop
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # The application reads the body from the loop, so it's read here first
+        request.read()
+        future = asyncio.run_coroutine_threadsafe(
+            self._handle(request), self._get_loop()
+        )
+        return future.result()
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            content=await response.aread(),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+class AppEngine(httpxEngine):
+    """Engine calling an ASGI or WSGI application in-process, without sockets
+
+    Requests go through httpx like with the `httpx` engine, so forms,
+    redirects, authentication and the other options behave the same, but
+    every URL is answered by `app`. `interface` is detected from `app`
+    unless given. ASGI applications called from synchronous code run on an
+    event loop of the engine's own; WSGI ones called from asynchronous code
+    run in the loop's default executor. Lifespan events aren't sent.
+    """
+
+    def __init__(
+        self,
+        app: typing.Callable,
+        interface: typing.Optional[typing.Literal["asgi", "wsgi"]] = None,
+        root_path: str = "",
+        client: typing.Tuple[str, int] = ("127.0.0.1", 123),
+        max_concurrency: typing.Optional[int] = None,
+    ):
+        super().__init__(max_concurrency=max_concurrency, proxies={})
+        interface = interface or detect_interface(app)
+        if interface not in (ASGI, WSGI):
+            raise InvalidOptionError(
+                "Unknown application interface '%s', use 'asgi' or 'wsgi'" % interface
+            )
+        self.app = app
+        self.interface = interface
+        self.root_path = root_path
+        self.client = client
+
+    def _asgi_transport(self) -> httpx.ASGITransport:
+        return httpx.ASGITransport(
+            self.app, root_path=self.root_path, client=self.client
+        )
+
+    def _create_client(
+        self,
+        curl_request: "CurlRequest",
+        proxies: typing.Dict[str, str],
+        asynchronous: bool = False,
+    ) -> typing.Union["httpx.Client", "httpx.AsyncClient"]:
+        client: typing.Union["httpx.Client", "httpx.AsyncClient"]
+        if asynchronous:
+            client = httpx.AsyncClient(transport=self._asgi_transport())
+        elif self.interface == ASGI:
+            transport = SyncASGITransport(self._asgi_transport())
+            client = httpx.Client(transport=transport)
+        else:
+            client = httpx.Client(
+                transport=httpx.WSGITransport(
+                    self.app,  # type: ignore[arg-type]
+                    script_name=self.root_path,
+                    remote_addr=self.client[0],
+                )
+            )
+        client.headers.clear()
+        return client
+
+    @staticmethod
+    def _client_key(
+        curl_request: "CurlRequest", proxies: typing.Dict[str, str]
+    ) -> typing.Hashable:
+        # Neither the HTTP version nor the address resolution apply here
+        return None
+
+    async def _ahandle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        if self.interface == WSGI:
+            return await Engine._ahandle_curl(self, request)
+        return await super()._ahandle_curl(request)
+
+    def __repr__(self):
+        return "<AppEngine [%s %r]>" % (self.interface, self.app)
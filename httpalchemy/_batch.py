@@ -0,0 +1,137 @@
+import collections
+import typing
+from urllib.parse import urlsplit
+
+from ._curl import CurlRequest
+from ._curl import CurlResponse
+from ._curl import create_curl_request
+from ._dispatch import dispatch
+from ._engines import ENGINE_LITERAL
+from ._engines import Engine
+from ._engines import engines
+from ._engines import get_engine
+from ._exceptions import IncompatibleTypeError
+
+REQUEST_SPEC = typing.Union[
+    str, typing.Dict[str, typing.Any], typing.Tuple[str, typing.Dict[str, typing.Any]]
+]
+
+
+class BatchResult:
+    def __init__(
+        self,
+        index: int,
+        request: typing.Optional[CurlRequest],
+        response: typing.Optional[CurlResponse] = None,
+        error: typing.Optional[BaseException] = None,
+    ):
+        self.index = index
+        self.request = request
+        self.response = response
+        self.error = error
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def __repr__(self):
+        outcome = self.error if self.failed else self.response
+        return "<BatchResult [%d] %r>" % (self.index, outcome)
+
+
+def build_curl_request(spec: REQUEST_SPEC) -> CurlRequest:
+    """Build a `CurlRequest` from a URL, `(url, options)` or a dictionary
+
+    Dictionaries hold the URL under `"url"` and the options under their names.
+    """
+    if isinstance(spec, str):
+        return create_curl_request(spec)
+    if isinstance(spec, tuple):
+        url, options = spec
+        return create_curl_request(url, **options)
+    if isinstance(spec, dict):
+        options = dict(spec)
+        return create_curl_request(options.pop("url"), **options)
+    msg = (
+        "Request spec must be a URL, a `(url, options)` tuple or a dictionary, "
+        "not `%s`" % spec.__class__.__name__
+    )
+    raise IncompatibleTypeError(msg)
+
+
+def curl_many(
+    specs: typing.Iterable[REQUEST_SPEC],
+    /,
+    *,
+    engine: typing.Union[Engine, engines, ENGINE_LITERAL] = engines.requests,
+    max_workers: int = 10,
+    max_per_host: typing.Optional[int] = None,
+    ordered: bool = True,
+) -> typing.Iterator[BatchResult]:
+    """Send many curl requests on a thread pool sharing one engine
+
+    Yields a `BatchResult` per spec, in input order when `ordered` is true and
+    in completion order otherwise. Errors are stored on the result instead of
+    aborting the batch. At most `max_per_host` requests run against the same
+    host at once.
+    """
+    engine_instance = get_engine(engine)
+    pending: typing.Dict[str, typing.Deque[BatchResult]] = collections.defaultdict(
+        collections.deque
+    )
+    running_per_host: typing.Counter[str] = collections.Counter()
+    finished: typing.List[BatchResult] = []
+
+    for index, spec in enumerate(specs):
+        try:
+            curl_request = build_curl_request(spec)
+        except Exception as exc:
+            finished.append(BatchResult(index, None, error=exc))
+            continue
+        pending[urlsplit(curl_request.url).netloc].append(
+            BatchResult(index, curl_request)
+        )
+
+    def send(result: BatchResult) -> BatchResult:
+        try:
+            result.response = dispatch(
+                engine_instance, typing.cast(CurlRequest, result.request)
+            )
+        except Exception as exc:
+            result.error = exc
+        return result
+
+    from concurrent.futures import FIRST_COMPLETED
+    from concurrent.futures import Future
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import wait
+
+    buffered: typing.Dict[int, BatchResult] = {}
+    next_index = 0
+    running: typing.Dict[Future, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            for host, queue in pending.items():
+                while queue and (
+                    max_per_host is None or running_per_host[host] < max_per_host
+                ):
+                    running_per_host[host] += 1
+                    running[executor.submit(send, queue.popleft())] = host
+
+            for result in finished:
+                if not ordered:
+                    yield result
+                    continue
+                buffered[result.index] = result
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+            finished = []
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running_per_host[running.pop(future)] -= 1
+                finished.append(future.result())
@@ -0,0 +1,463 @@
+import collections
+import json
+import os
+import struct
+import threading
+import time
+import typing
+from abc import ABC
+from abc import abstractmethod
+
+from ._engines import ENGINE_LITERAL
+from ._engines import Engine
+from ._engines import engines
+from ._engines import get_engine
+from ._headers import EMPTY_HEADERS
+from ._timings import Timings
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_REVALIDATED = "REVALIDATED"
+
+CACHEABLE_METHODS = frozenset(["GET", "HEAD"])
+CACHEABLE_STATUS_CODES = frozenset([200, 203, 204, 300, 301, 308, 404, 410])
+# Cached bodies are stored decoded, these headers describe the body as sent
+TRANSFER_HEADERS = frozenset(
+    ["content-encoding", "content-length", "transfer-encoding"]
+)
+
+
+def parse_cache_control(
+    value: typing.Optional[str],
+) -> typing.Dict[str, typing.Optional[str]]:
+    directives: typing.Dict[str, typing.Optional[str]] = {}
+    for directive in (value or "").split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+def parse_http_date(value: typing.Optional[str]) -> typing.Optional[float]:
+    if not value:
+        return None
+    import calendar
+    import email.utils
+
+    parsed = email.utils.parsedate(value)
+    if parsed is None:
+        return None
+    return float(calendar.timegm(parsed))
+
+
+class CacheEntry:
+    def __init__(
+        self,
+        *,
+        status_code: int,
+        reason: str,
+        headers: typing.List[typing.Tuple[str, str]],
+        content: bytes,
+        stored_at: float,
+        vary: typing.Dict[str, typing.Optional[str]],
+    ):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.stored_at = stored_at
+        self.vary = vary
+
+    def header(self, name: str) -> typing.Optional[str]:
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def freshness_lifetime(self) -> float:
+        cache_control = parse_cache_control(self.header("Cache-Control"))
+        if "no-cache" in cache_control:
+            return 0.0
+        max_age = cache_control.get("max-age")
+        if max_age is not None:
+            try:
+                return float(max_age)
+            except ValueError:
+                return 0.0
+        expires = parse_http_date(self.header("Expires"))
+        if expires is None:
+            return 0.0
+        date = parse_http_date(self.header("Date")) or self.stored_at
+        return max(0.0, expires - date)
+
+    def age(self, now: typing.Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        try:
+            initial_age = float(self.header("Age") or 0)
+        except ValueError:
+            initial_age = 0.0
+        return initial_age + max(0.0, now - self.stored_at)
+
+    def is_fresh(self, now: typing.Optional[float] = None) -> bool:
+        return self.age(now) < self.freshness_lifetime()
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps(
+            {
+                "status_code": self.status_code,
+                "reason": self.reason,
+                "headers": self.headers,
+                "stored_at": self.stored_at,
+                "vary": self.vary,
+            }
+        ).encode()
+        return struct.pack("!I", len(meta)) + meta + self.content
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CacheEntry":
+        (meta_size,) = struct.unpack_from("!I", data)
+        meta = json.loads(data[4 : 4 + meta_size])
+        return cls(
+            status_code=meta["status_code"],
+            reason=meta["reason"],
+            headers=[tuple(header) for header in meta["headers"]],
+            content=data[4 + meta_size :],
+            stored_at=meta["stored_at"],
+            vary=meta["vary"],
+        )
+
+
+class CacheStorage(ABC):
+    @abstractmethod
+    def get(self, key: str) -> typing.Optional[CacheEntry]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, entry: CacheEntry) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemoryCache(CacheStorage):
+    """In-memory LRU store that evicts entries once `max_size` bytes are used"""
+
+    def __init__(self, max_size: int = 64 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self._entries: "collections.OrderedDict[str, CacheEntry]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> typing.Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class FileCache(CacheStorage):
+    """On-disk store, one file per entry, evicting least recently used entries"""
+
+    SUFFIX = ".entry"
+
+    def __init__(self, directory: str, max_size: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._sizes: "collections.OrderedDict[str, int]" = collections.OrderedDict()
+        files = []
+        for name in os.listdir(directory):
+            if name.endswith(self.SUFFIX):
+                stat = os.stat(os.path.join(directory, name))
+                files.append((stat.st_mtime, name[: -len(self.SUFFIX)], stat.st_size))
+        for _, file_key, size in sorted(files):
+            self._sizes[file_key] = size
+        self.size = sum(self._sizes.values())
+
+    def _path(self, file_key: str) -> str:
+        return os.path.join(self.directory, file_key + self.SUFFIX)
+
+    @staticmethod
+    def _file_key(key: str) -> str:
+        import hashlib
+
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> typing.Optional[CacheEntry]:
+        file_key = self._file_key(key)
+        with self._lock:
+            if file_key not in self._sizes:
+                return None
+            self._sizes.move_to_end(file_key)
+        try:
+            with open(self._path(file_key), "rb") as file:
+                data = file.read()
+            os.utime(self._path(file_key))
+        except OSError:
+            return None
+        return CacheEntry.from_bytes(data)
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        data = entry.to_bytes()
+        if len(data) > self.max_size:
+            return
+        file_key = self._file_key(key)
+        temporary_path = "%s.%d.tmp" % (self._path(file_key), threading.get_ident())
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, self._path(file_key))
+        with self._lock:
+            self.size += len(data) - self._sizes.pop(file_key, 0)
+            self._sizes[file_key] = len(data)
+            while self.size > self.max_size:
+                evicted, size = self._sizes.popitem(last=False)
+                self.size -= size
+                self._remove(evicted)
+
+    def _remove(self, file_key: str) -> None:
+        try:
+            os.remove(self._path(file_key))
+        except FileNotFoundError:
+            ...
+
+    def delete(self, key: str) -> None:
+        file_key = self._file_key(key)
+        with self._lock:
+            self.size -= self._sizes.pop(file_key, 0)
+        self._remove(file_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            file_keys = list(self._sizes)
+            self._sizes.clear()
+            self.size = 0
+        for file_key in file_keys:
+            self._remove(file_key)
+
+
+class CacheEngine(Engine):
+    """Engine wrapper that serves responses from an HTTP cache
+
+    Follows `Cache-Control` and `Expires`, revalidates stale entries with
+    `If-None-Match`/`If-Modified-Since` and sets `CurlResponse.cache_status`.
+    Streaming (`-o`/`-N`) and `Range` requests bypass the cache, and
+    requests with credentials only share entries with the same credentials.
+    Closing the wrapper
+    leaves `engine` open, it's shared or owned by the caller.
+    """
+
+    def __init__(
+        self,
+        engine: typing.Union[Engine, engines, ENGINE_LITERAL] = engines.requests,
+        storage: typing.Optional[CacheStorage] = None,
+        max_concurrency: typing.Optional[int] = None,
+    ):
+        super().__init__(max_concurrency=max_concurrency)
+        self.engine = get_engine(engine)
+        self.storage = storage if storage is not None else MemoryCache()
+
+    def _convert_request(self, curl_request: "CurlRequest"):
+        return self.engine._convert_request(curl_request)
+
+    def _send(self, request, curl_request: "CurlRequest", proxies):
+        return self.engine._send(request, curl_request, proxies)
+
+    def build_response(self, *args, **kwargs) -> "CurlResponse":
+        return self.engine.build_response(*args, **kwargs)
+
+    @classmethod
+    def _key(cls, curl_request: "CurlRequest") -> str:
+        key = "%s %s" % (curl_request.method or "GET", curl_request.url)
+        # Each set of credentials has entries of its own
+        credentials = cls._request_header(curl_request, "Authorization")
+        if curl_request.auth is not None:
+            credentials = "%s:%s" % curl_request.auth
+        if credentials is not None:
+            import hashlib
+
+            key += " " + hashlib.sha256(credentials.encode()).hexdigest()
+        return key
+
+    @classmethod
+    def _cacheable(cls, curl_request: "CurlRequest") -> bool:
+        # Partial responses aren't cached, nor served for a whole body
+        return (
+            (curl_request.method or "GET") in CACHEABLE_METHODS
+            and not curl_request.stream
+            and cls._request_header(curl_request, "Range") is None
+        )
+
+    @staticmethod
+    def _request_header(curl_request: "CurlRequest", name: str) -> typing.Optional[str]:
+        return (curl_request.headers or EMPTY_HEADERS).get(name)
+
+    def _lookup(
+        self, curl_request: "CurlRequest"
+    ) -> typing.Tuple[typing.Optional[CacheEntry], "CurlRequest"]:
+        """Find the cached entry and the request to send if it isn't fresh"""
+        if not self._cacheable(curl_request):
+            return None, curl_request
+        request_cache_control = parse_cache_control(
+            self._request_header(curl_request, "Cache-Control")
+        )
+        if "no-store" in request_cache_control:
+            return None, curl_request
+        entry = self.storage.get(self._key(curl_request))
+        if entry is None or any(
+            self._request_header(curl_request, name) != value
+            for name, value in entry.vary.items()
+        ):
+            return None, curl_request
+        if entry.is_fresh() and "no-cache" not in request_cache_control:
+            return entry, curl_request
+
+        validators = {}
+        etag = entry.header("ETag")
+        if etag is not None:
+            validators["If-None-Match"] = etag
+        last_modified = entry.header("Last-Modified")
+        if last_modified is not None:
+            validators["If-Modified-Since"] = last_modified
+        if not validators:
+            return None, curl_request
+        headers = (curl_request.headers or EMPTY_HEADERS).with_headers(validators)
+        return entry, curl_request.replace(headers=headers)
+
+    def _store(self, curl_request: "CurlRequest", response: "CurlResponse") -> None:
+        if (
+            not self._cacheable(curl_request)
+            or response.status_code not in CACHEABLE_STATUS_CODES
+        ):
+            return
+        cache_control = parse_cache_control(response.headers.get("Cache-Control"))
+        vary_header = response.headers.get("Vary") or ""
+        if "no-store" in cache_control or vary_header.strip() == "*":
+            return
+        entry = CacheEntry(
+            status_code=response.status_code,
+            reason=response.reason,
+            headers=list(response.headers.items()),
+            content=response.content,
+            stored_at=time.time(),
+            vary={
+                name.strip(): self._request_header(curl_request, name.strip())
+                for name in vary_header.split(",")
+                if name.strip()
+            },
+        )
+        if (
+            entry.freshness_lifetime()
+            or entry.header("ETag")
+            or entry.header("Last-Modified")
+        ):
+            self.storage.set(self._key(curl_request), entry)
+
+    def _from_entry(
+        self,
+        curl_request: "CurlRequest",
+        entry: CacheEntry,
+        cache_status: str,
+        timings: typing.Optional[Timings] = None,
+    ) -> "CurlResponse":
+        headers = [
+            (name, value)
+            for name, value in entry.headers
+            if name.lower() not in TRANSFER_HEADERS
+        ]
+        if entry.content or (curl_request.method or "GET") != "HEAD":
+            headers.append(("Content-Length", str(len(entry.content))))
+        response = self.engine.build_response(
+            curl_request,
+            status_code=entry.status_code,
+            reason=entry.reason,
+            headers=headers,
+            content=entry.content,
+        )
+        response.cache_status = cache_status
+        if timings is not None:
+            response.timings = timings
+        response.finish_transfer()
+        return response
+
+    def _revalidated(
+        self, curl_request: "CurlRequest", entry: CacheEntry, response: "CurlResponse"
+    ) -> "CurlResponse":
+        updated = dict(entry.headers)
+        updated.update(response.headers.items())
+        entry = CacheEntry(
+            status_code=entry.status_code,
+            reason=entry.reason,
+            headers=list(updated.items()),
+            content=entry.content,
+            stored_at=time.time(),
+            vary=entry.vary,
+        )
+        self.storage.set(self._key(curl_request), entry)
+        return self._from_entry(
+            curl_request, entry, CACHE_REVALIDATED, response.timings
+        )
+
+    def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        entry, upstream_request = self._lookup(request)
+        if entry is not None and upstream_request is request:
+            return self._from_entry(request, entry, CACHE_HIT)
+        response = self.engine.handle_curl(upstream_request)
+        if entry is not None and response.status_code == 304:
+            return self._revalidated(request, entry, response)
+        self._store(request, response)
+        response.cache_status = CACHE_MISS
+        return response
+
+    async def _ahandle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        entry, upstream_request = self._lookup(request)
+        if entry is not None and upstream_request is request:
+            return self._from_entry(request, entry, CACHE_HIT)
+        response = await self.engine.ahandle_curl(upstream_request)
+        if entry is not None and response.status_code == 304:
+            return self._revalidated(request, entry, response)
+        self._store(request, response)
+        response.cache_status = CACHE_MISS
+        return response
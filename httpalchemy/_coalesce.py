@@ -0,0 +1,174 @@
+import copy
+import threading
+import typing
+import weakref
+
+from ._exceptions import OperationTimeoutError
+from ._headers import EMPTY_HEADERS
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+    from ._engines import Engine
+
+# Safe methods only: sharing a response must not skip a side effect
+COALESCED_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+SEND = typing.Callable[[], "CurlResponse"]
+ASEND = typing.Callable[[], typing.Awaitable["CurlResponse"]]
+
+
+def coalesce_key(
+    engine: "Engine", curl_request: "CurlRequest"
+) -> typing.Optional[typing.Hashable]:
+    """What makes concurrent requests identical, `None` for requests that
+    can't share a response
+
+    Requests with a body or with effects of their own (`-o`, `-N`, `-w`,
+    `--etag-save`, `--limit-rate`, ranges) are always sent on their own.
+    """
+    method = curl_request.method or "GET"
+    if (
+        method not in COALESCED_METHODS
+        or curl_request.stream
+        or curl_request.write_out is not None
+        or curl_request.etag_save is not None
+        or curl_request.continue_at
+        or curl_request.segments
+        or curl_request.data is not None
+        or curl_request.data_binary is not None
+        or curl_request.form
+        or curl_request.upload_file is not None
+    ):
+        return None
+    headers = curl_request.headers or EMPTY_HEADERS
+    return (
+        engine,
+        method,
+        curl_request.url,
+        tuple(sorted((name.lower(), value) for name, value in headers.multi_items())),
+        curl_request.auth,
+        curl_request.user_agent,
+        curl_request.follow_redirects,
+        curl_request.http_version,
+        curl_request.compressed,
+        curl_request.resolver,
+    )
+
+
+def share_response(
+    response: "CurlResponse", curl_request: "CurlRequest"
+) -> "CurlResponse":
+    """A response of its own for `curl_request`, over the body of `response`
+
+    The body isn't copied: `content` is the same `bytes` object, and closing
+    either response leaves the other one readable. `timings` are copied, so
+    callers can't change each other's.
+    """
+    from ._curl import CurlResponse
+
+    shared = CurlResponse(
+        status_code=response.status_code,
+        reason=response.reason,
+        raw_response=response.raw,
+        request=curl_request,
+        timings=copy.copy(response.timings),
+    )
+    shared.cache_status = response.cache_status
+    return shared
+
+
+def _copy_error(error: BaseException) -> BaseException:
+    """An exception of its own for each caller sharing a failed call"""
+    try:
+        copied = copy.copy(error)
+    except Exception:
+        # Exceptions that can't be rebuilt from their arguments are shared
+        return error
+    return copied.with_traceback(error.__traceback__)
+
+
+def _timeout_error(curl_request: "CurlRequest") -> OperationTimeoutError:
+    return OperationTimeoutError(
+        "Gave up on %s after waiting %s seconds for the identical request in flight"
+        % (curl_request.url, curl_request.coalesce_timeout)
+    )
+
+
+class _Call:
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: typing.Optional["CurlResponse"] = None
+        self.error: typing.Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Lets identical requests in flight at the same time share one call
+
+    The first caller of a key sends the request, the callers that arrive
+    before it completes wait for it and get `share_response` of its
+    response, or a copy of its exception. Callers with a `coalesce_timeout`
+    wait that long at most. Asynchronous calls are shared among the tasks
+    of one event loop, and the upstream call outlives a cancelled caller.
+    """
+
+    def __init__(self):
+        self._calls: typing.Dict[typing.Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._tasks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def call(
+        self, key: typing.Hashable, curl_request: "CurlRequest", send: SEND
+    ) -> "CurlResponse":
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(curl_request.coalesce_timeout):
+                raise _timeout_error(curl_request)
+            if call.error is not None:
+                raise _copy_error(call.error)
+            return share_response(
+                typing.cast("CurlResponse", call.response), curl_request
+            )
+        try:
+            call.response = send()
+            return call.response
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def acall(
+        self, key: typing.Hashable, curl_request: "CurlRequest", send: ASEND
+    ) -> "CurlResponse":
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        tasks: typing.Dict[typing.Hashable, asyncio.Future]
+        tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = asyncio.ensure_future(send())
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+            return await asyncio.shield(task)
+        # Waiting doesn't cancel the call when the caller is cancelled
+        done, _ = await asyncio.wait({task}, timeout=curl_request.coalesce_timeout)
+        if not done:
+            raise _timeout_error(curl_request)
+        error = task.exception()
+        if error is not None:
+            raise _copy_error(error)
+        return share_response(task.result(), curl_request)
+
+    def __len__(self) -> int:
+        return len(self._calls) + sum(len(tasks) for tasks in self._tasks.values())
+
+
+single_flight = SingleFlight()
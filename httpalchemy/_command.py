@@ -0,0 +1,125 @@
+import functools
+import shlex
+import typing
+
+from ._curl import OPTIONS
+from ._curl import CurlResponse
+from ._curl import create_curl_request
+from ._dispatch import dispatch
+from ._engines import ENGINE_LITERAL
+from ._engines import Engine
+from ._engines import engines
+from ._engines import get_engine
+from ._exceptions import UnsupportedOptionError
+
+COMMAND_CACHE_SIZE = 256
+
+# Options that only change what curl prints, they don't affect the request
+IGNORED_FLAGS = frozenset(
+    ["-s", "--silent", "-S", "--show-error", "-#", "--progress-bar"]
+)
+REPEATABLE_OPTIONS = frozenset(["_H", "_F", "__resolve", "__connect_to"])
+
+PARSED_COMMAND = typing.Tuple[str, typing.Tuple[typing.Tuple[str, typing.Any], ...]]
+
+
+@functools.lru_cache(maxsize=None)
+def flag_table() -> typing.Dict[str, typing.Tuple[str, bool]]:
+    """Map command line flags to `create_curl_request` option names
+
+    Each flag maps to the short option name when it has one, and to whether
+    the option is a switch that takes no value. The table is built on first
+    use, so importing the package doesn't pay for `inspect`.
+    """
+    import inspect
+
+    aliases = {alias: option for option, alias in OPTIONS}
+    table = {}
+    for name, parameter in inspect.signature(create_curl_request).parameters.items():
+        if parameter.kind is not inspect.Parameter.KEYWORD_ONLY:
+            continue
+        if not name.startswith("_"):
+            # Library-only keywords such as `compress_request` have no flag
+            continue
+        is_switch = parameter.annotation == typing.Optional[bool]
+        if name.startswith("__"):
+            flag = "--" + name[2:].replace("_", "-")
+        else:
+            flag = "-" + name[1:]
+        table[flag] = (aliases.get(name, name), is_switch)
+    return table
+
+
+def _expand_short_flags(token: str) -> typing.List[str]:
+    """Split `-sSL` into `-s -S -L` and `-XPOST` into `-X POST`"""
+    if token.startswith("--") or len(token) <= 2:
+        return [token]
+    flag, rest = token[:2], token[2:]
+    option = flag_table().get(flag)
+    if option is not None and not option[1]:
+        return [flag, rest]
+    return [flag] + _expand_short_flags("-" + rest)
+
+
+@functools.lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def parse_command(command: str) -> PARSED_COMMAND:
+    """Parse a curl command line into a URL and `create_curl_request` options
+
+    Results are cached, so a command that runs in a loop is tokenized once.
+    """
+    tokens = shlex.split(command.replace("\\\n", " "))
+    if tokens and tokens[0] == "curl":
+        tokens = tokens[1:]
+
+    expanded: typing.List[str] = []
+    for token in tokens:
+        if token.startswith("-") and token != "-":
+            expanded.extend(_expand_short_flags(token))
+        else:
+            expanded.append(token)
+
+    url: typing.Optional[str] = None
+    options: typing.Dict[str, typing.Any] = {}
+    iterator = iter(expanded)
+    for token in iterator:
+        if token in IGNORED_FLAGS:
+            continue
+        if token == "--url" or not token.startswith("-") or token == "-":
+            value = next(iterator, None) if token == "--url" else token
+            if url is not None:
+                raise UnsupportedOptionError("Only one URL per command is supported")
+            url = value
+            continue
+        if token not in flag_table():
+            raise UnsupportedOptionError("Unsupported curl option '%s'" % token)
+
+        option, is_switch = flag_table()[token]
+        if is_switch:
+            options[option] = True
+            continue
+        value = next(iterator, None)
+        if value is None:
+            raise UnsupportedOptionError("Option '%s' requires a value" % token)
+        if option in REPEATABLE_OPTIONS:
+            options[option] = options.get(option, ()) + (value,)
+        elif option == "_d" and option in options:
+            # curl joins repeated -d values with '&'
+            options[option] += "&" + value
+        else:
+            options[option] = value
+
+    if url is None:
+        raise UnsupportedOptionError("No URL specified in the curl command")
+    return url, tuple(options.items())
+
+
+def curl_cmd(
+    command: str,
+    /,
+    *,
+    engine: typing.Union[Engine, engines, ENGINE_LITERAL] = engines.requests,
+) -> CurlResponse:
+    """Run a curl command line such as `curl -X POST -d data http://example.com`"""
+    url, options = parse_command(command)
+    curl_request = create_curl_request(url, **dict(options))
+    return dispatch(get_engine(engine), curl_request)
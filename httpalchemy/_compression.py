@@ -0,0 +1,44 @@
+import functools
+import gzip
+import typing
+
+from . import config
+
+
+ENCODINGS = ("gzip", "deflate", "br", "zstd")
+
+
+def _decodable(library: str) -> typing.Collection[str]:
+    if library == "httpx":
+        try:
+            from httpx._decoders import SUPPORTED_DECODERS
+        except ImportError:
+            return ("gzip", "deflate")
+        return SUPPORTED_DECODERS
+    from urllib3.util.request import ACCEPT_ENCODING
+
+    return ACCEPT_ENCODING.split(",")
+
+
+@functools.lru_cache(maxsize=None)
+def accept_encoding(library: str = "urllib3") -> str:
+    """`Accept-Encoding` for `--compressed`, listing only the encodings
+    `library` ("urllib3" or "httpx") can decode
+
+    `br` and `zstd` depend on optional packages, and `zstd` on urllib3 2 or
+    a recent httpx too.
+    """
+    decodable = _decodable(library)
+    return ", ".join(encoding for encoding in ENCODINGS if encoding in decodable)
+
+
+def compress_body(
+    body: typing.Union[str, bytes], headers: typing.MutableMapping[str, str]
+) -> typing.Union[str, bytes]:
+    """Gzip in-memory bodies of at least `COMPRESS_REQUEST_MIN_SIZE` bytes"""
+    if isinstance(body, str):
+        body = body.encode()
+    if len(body) < config.COMPRESS_REQUEST_MIN_SIZE or "Content-Encoding" in headers:
+        return body
+    headers["Content-Encoding"] = "gzip"
+    return gzip.compress(body, compresslevel=config.COMPRESS_REQUEST_LEVEL)
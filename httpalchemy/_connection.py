@@ -0,0 +1,232 @@
+import socket
+import threading
+import time
+import typing
+
+from urllib3.connection import HTTPConnection
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.connectionpool import HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError
+from urllib3.exceptions import NewConnectionError
+from urllib3.poolmanager import PoolManager
+from urllib3.poolmanager import ProxyManager
+from urllib3.util.connection import allowed_gai_family
+
+from ._dns import DEFAULT_RESOLVER
+from ._dns import Resolver
+from ._dns import current_resolver
+from ._metrics import PoolGauges
+from ._timings import current_timings
+from .config import PoolLimits
+
+
+class _TimedConnectionMixin:
+    """Report connection phases to the `Timings` recorded by the calling thread
+
+    The host name is resolved here rather than inside urllib3, through the
+    `Resolver` of the request (`--connect-to`, `--resolve` and the DNS
+    cache), so the lookup is timed on its own and each resolved address is
+    tried in turn. With `--unix-socket`, the connection goes to the socket.
+    """
+
+    def _new_conn(self):
+        timings = current_timings()
+        resolver = current_resolver()
+        if self.proxy is not None:  # type: ignore[attr-defined]
+            # Connections to a proxy aren't rerouted, like in curl
+            resolver = DEFAULT_RESOLVER
+        if resolver.unix_socket is not None:
+            return self._new_unix_conn(resolver)
+        host, port = self._dns_host, self.port  # type: ignore[has-type]
+        target_host, target_port = resolver.route(host, port)
+        try:
+            addresses = resolver.getaddrinfo(
+                target_host, target_port, allowed_gai_family()
+            )
+        except socket.gaierror as e:
+            raise NameResolutionError(target_host, self, e) from e
+        if timings is not None:
+            timings.mark("namelookup")
+
+        error: typing.Optional[Exception] = None
+        for *_, sockaddr in addresses:
+            self._dns_host, self.port = sockaddr[0], target_port
+            try:
+                sock = super()._new_conn()  # type: ignore[misc]
+                break
+            except NewConnectionError as e:
+                error = e
+            finally:
+                self._dns_host, self.port = host, port
+        else:
+            raise typing.cast(Exception, error)
+        self._httpalchemy_resolver = resolver
+        if timings is not None:
+            timings.mark("connect")
+            timings.num_connects += 1
+        return sock
+
+    def _new_unix_conn(self, resolver: Resolver) -> socket.socket:
+        timeout = self.timeout  # type: ignore[attr-defined]
+        try:
+            sock = resolver.connect_unix_socket(
+                timeout if isinstance(timeout, (int, float)) else None
+            )
+        except OSError as e:
+            raise NewConnectionError(
+                self, "Failed to connect to %r: %s" % (resolver.unix_socket, e)
+            ) from e
+        self._httpalchemy_resolver = resolver
+        timings = current_timings()
+        if timings is not None:
+            timings.mark("connect")
+            timings.num_connects += 1
+        return sock
+
+    def request(self, *args, **kwargs):
+        if self.sock is None:  # type: ignore[has-type]
+            # Connect upfront so the connection isn't timed as request sending
+            self.connect()  # type: ignore[attr-defined]
+        timings = current_timings()
+        if timings is not None:
+            timings.mark("pretransfer")
+        return super().request(*args, **kwargs)  # type: ignore[misc]
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)  # type: ignore[misc]
+        timings = current_timings()
+        if timings is not None:
+            timings.mark("starttransfer")
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    ...
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self) -> None:
+        super().connect()
+        timings = current_timings()
+        if timings is not None:
+            timings.mark("appconnect")
+
+
+class _KeepAliveMixin:
+    """Drop pooled connections that stayed idle longer than `keepalive_expiry`
+
+    Connections opened for another `--resolve`/`--connect-to`/
+    `--unix-socket` setup than the current request's are dropped as well.
+    `in_use` counts the connections taken out of the pool and not put back
+    yet.
+    """
+
+    keepalive_expiry: typing.Optional[float] = None
+    in_use = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Pools are shared by threads, `+=` on an attribute isn't atomic
+        self._in_use_lock = threading.Lock()
+
+    def _count_in_use(self, change: int) -> None:
+        with self._in_use_lock:
+            self.in_use = max(0, self.in_use + change)
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)  # type: ignore[misc]
+        idle_since = getattr(conn, "_httpalchemy_idle_since", None)
+        resolver = getattr(conn, "_httpalchemy_resolver", None)
+        if (
+            self.keepalive_expiry is not None
+            and idle_since is not None
+            and time.monotonic() - idle_since > self.keepalive_expiry
+        ) or (
+            resolver is not None
+            and conn.proxy is None
+            and resolver != current_resolver()
+        ):
+            conn.close()
+            conn = self._new_conn()  # type: ignore[attr-defined]
+        self._count_in_use(1)
+        return conn
+
+    def _put_conn(self, conn):
+        self._count_in_use(-1)
+        if conn is not None:
+            conn._httpalchemy_idle_since = time.monotonic()
+        super()._put_conn(conn)  # type: ignore[misc]
+
+    def gauges(self) -> PoolGauges:
+        queue = getattr(self.pool, "queue", ())  # type: ignore[attr-defined]
+        idle = sum(conn is not None for conn in list(queue))
+        return PoolGauges(idle=idle, in_use=self.in_use)
+
+
+class KeepAliveHTTPConnectionPool(_KeepAliveMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class KeepAliveHTTPSConnectionPool(_KeepAliveMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class _KeepAlivePoolsMixin:
+    """Create per-host pools that honor `PoolLimits.keepalive_expiry`"""
+
+    keepalive_expiry: typing.Optional[float] = None
+
+    def _use_keepalive_pools(self, limits: PoolLimits) -> None:
+        self.keepalive_expiry = limits.keepalive_expiry
+        self.pool_classes_by_scheme = {
+            "http": KeepAliveHTTPConnectionPool,
+            "https": KeepAliveHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(  # type: ignore[misc]
+            scheme, host, port, request_context=request_context
+        )
+        pool.keepalive_expiry = self.keepalive_expiry
+        return pool
+
+
+def pool_manager_gauges(manager: PoolManager) -> typing.Dict[str, PoolGauges]:
+    """Connection gauges of each per-host pool of `manager`, by `host:port`"""
+    gauges: typing.Dict[str, PoolGauges] = {}
+    # Looking pools up through the container would make them recently used
+    for pool in list(manager.pools._container.values()):  # type: ignore[attr-defined]
+        if isinstance(pool, _KeepAliveMixin):
+            key = "%s:%d" % (pool.host, pool.port)  # type: ignore[attr-defined]
+            gauges[key] = pool.gauges() + gauges.get(key, PoolGauges())
+    return gauges
+
+
+class KeepAlivePoolManager(_KeepAlivePoolsMixin, PoolManager):
+    """`PoolManager` whose per-host pools honor `PoolLimits.keepalive_expiry`"""
+
+    def __init__(self, limits: PoolLimits, **connection_pool_kw: typing.Any):
+        super().__init__(
+            num_pools=limits.max_hosts,
+            maxsize=limits.max_connections_per_host,
+            block=limits.block,
+            **connection_pool_kw,
+        )
+        self._use_keepalive_pools(limits)
+
+
+class KeepAliveProxyManager(_KeepAlivePoolsMixin, ProxyManager):
+    """`ProxyManager` counterpart of `KeepAlivePoolManager`"""
+
+    def __init__(
+        self, proxy_url: str, limits: PoolLimits, **connection_pool_kw: typing.Any
+    ):
+        super().__init__(
+            proxy_url,
+            num_pools=limits.max_hosts,
+            maxsize=limits.max_connections_per_host,
+            block=limits.block,
+            **connection_pool_kw,
+        )
+        self._use_keepalive_pools(limits)
@@ -1,16 +1,38 @@
+import copy
+import os
 import re
+import sys
 import typing
 
+from ._dispatch import adispatch
+from ._dispatch import dispatch
+from ._dns import Resolver
 from ._engines import ENGINE_LITERAL
+from ._engines import HTTP_2
+from ._engines import HTTP_2_PRIOR_KNOWLEDGE
 from ._engines import RESPONSES
 from ._engines import Engine
 from ._engines import engines
+from ._engines import get_engine
+from ._exceptions import DownloadError
 from ._exceptions import IncompatibleTypeError
 from ._exceptions import RepeatedAliasesError
+from ._headers import EMPTY_HEADERS
+from ._headers import HEADER_ITEMS
+from ._headers import Headers
+from ._json import get_json_codec
+from ._json import iter_json_lines
+from ._json import split_lines
+from ._ratelimit import Throttle
+from ._ratelimit import parse_rate
+from ._ratelimit import throttled_chunk_size
+from ._timings import Timings
 from ._types import CREDENTIALS
 from ._types import FORM_DATA
 from ._types import HEADERS
+from ._types import HOST_MAPPINGS
 from ._types import METHOD
+from ._types import OUTPUT
 
 OPTIONS = [
     ("_d", "__data"),
@@ -21,10 +43,52 @@ OPTIONS = [
     ("_H", "__header"),
     ("_L", "__location"),
     ("_X", "__request"),
+    ("_o", "__output"),
+    ("_N", "__no_buffer"),
+    ("_T", "__upload_file"),
+    ("_w", "__write_out"),
+    ("_r", "__range"),
+    ("_C", "__continue_at"),
 ]
 
+DEFAULT_CHUNK_SIZE = 64 * 1024
+_UNDECODED = object()
+
 
 class CurlRequest:
+    __slots__ = (
+        "url",
+        "data",
+        "form",
+        "auth",
+        "user_agent",
+        "verbose",
+        "_headers",
+        "follow_redirects",
+        "method",
+        "http_version",
+        "output",
+        "no_buffer",
+        "data_binary",
+        "upload_file",
+        "etag_save",
+        "compressed",
+        "compress_request",
+        "retry",
+        "retry_delay",
+        "retry_max_time",
+        "retry_all_errors",
+        "retry_connrefused",
+        "hedge",
+        "coalesce",
+        "coalesce_timeout",
+        "write_out",
+        "resolver",
+        "limit_rate",
+        "continue_at",
+        "segments",
+    )
+
     def __init__(
         self,
         url: str,
@@ -35,9 +99,30 @@ class CurlRequest:
         auth: typing.Optional[typing.Tuple[str, str]],
         user_agent: typing.Optional[str],
         verbose: typing.Optional[bool],
-        headers: typing.Optional[typing.Dict[str, str]],
+        headers: typing.Optional[HEADER_ITEMS],
         method: typing.Optional[METHOD],
         follow_redirects: bool = False,
+        http_version: typing.Optional[str] = None,
+        output: typing.Optional[OUTPUT] = None,
+        no_buffer: bool = False,
+        data_binary: typing.Optional[typing.Union[str, bytes]] = None,
+        upload_file: typing.Optional[str] = None,
+        etag_save: typing.Optional[str] = None,
+        compressed: bool = False,
+        compress_request: bool = False,
+        retry: int = 0,
+        retry_delay: typing.Optional[float] = None,
+        retry_max_time: typing.Optional[float] = None,
+        retry_all_errors: bool = False,
+        retry_connrefused: bool = False,
+        hedge: typing.Optional[float] = None,
+        coalesce: bool = False,
+        coalesce_timeout: typing.Optional[float] = None,
+        write_out: typing.Optional[str] = None,
+        resolver: typing.Optional[Resolver] = None,
+        limit_rate: typing.Optional[float] = None,
+        continue_at: typing.Optional[int] = None,
+        segments: typing.Optional[int] = None,
     ):
         self.url = url
         self.data = data
@@ -48,20 +133,334 @@ class CurlRequest:
         self.headers = headers
         self.follow_redirects = follow_redirects
         self.method = method
+        self.http_version = http_version
+        self.output = output
+        self.no_buffer = no_buffer
+        self.data_binary = data_binary
+        self.upload_file = upload_file
+        self.etag_save = etag_save
+        self.compressed = compressed
+        self.compress_request = compress_request
+        self.retry = retry
+        self.retry_delay = retry_delay
+        self.retry_max_time = retry_max_time
+        self.retry_all_errors = retry_all_errors
+        self.retry_connrefused = retry_connrefused
+        self.hedge = hedge
+        self.coalesce = coalesce
+        self.coalesce_timeout = coalesce_timeout
+        self.write_out = write_out
+        self.resolver = resolver
+        self.limit_rate = limit_rate
+        self.continue_at = continue_at
+        self.segments = segments
+
+    @property
+    def headers(self) -> typing.Optional[Headers]:
+        return self._headers
+
+    @headers.setter
+    def headers(self, headers: typing.Optional[HEADER_ITEMS]) -> None:
+        self._headers = None if headers is None else Headers(headers)
+
+    @property
+    def stream(self) -> bool:
+        """Whether the engine should leave the body unread for streaming
+
+        `--limit-rate` bodies are streamed too, so they can be paced.
+        """
+        return self.output is not None or self.no_buffer or bool(self.limit_rate)
+
+    def replace(self, **changes: typing.Any) -> "CurlRequest":
+        """Shallow copy of the request with some attributes replaced"""
+        curl_request = copy.copy(self)
+        for name, value in changes.items():
+            setattr(curl_request, name, value)
+        return curl_request
 
 
 class CurlResponse:
+    __slots__ = (
+        "status_code",
+        "reason",
+        "raw",
+        "request",
+        "_stream",
+        "_close",
+        "_astream",
+        "_aclose",
+        "_chunks",
+        "_pending",
+        "closed",
+        "cache_status",
+        "timings",
+        "_downloaded",
+        "_json",
+        "on_finish",
+        "_reports",
+    )
+
     def __init__(
         self,
         status_code: int,
         reason: str,
         raw_response: RESPONSES,
         request: CurlRequest,
+        stream: typing.Optional[typing.Callable[[int], typing.Iterator[bytes]]] = None,
+        close: typing.Optional[typing.Callable[[], typing.Any]] = None,
+        astream: typing.Optional[
+            typing.Callable[[int], typing.AsyncIterator[bytes]]
+        ] = None,
+        aclose: typing.Optional[typing.Callable[[], typing.Awaitable]] = None,
+        timings: typing.Optional[Timings] = None,
     ):
         self.status_code = status_code
         self.reason = reason
         self.raw = raw_response
         self.request = request
+        self._stream = stream
+        self._close = close
+        self._astream = astream
+        self._aclose = aclose
+        self._chunks: typing.Optional[typing.Iterator[bytes]] = None
+        self._pending = memoryview(b"")
+        self.closed = False
+        self.cache_status: typing.Optional[str] = None
+        self.timings = timings or Timings()
+        self._downloaded = 0
+        self._json: typing.Any = _UNDECODED
+        # Called once with the response when `finish_transfer` runs
+        self.on_finish: typing.Optional[
+            typing.Callable[["CurlResponse"], typing.Any]
+        ] = None
+        # Set on the response `dispatch` returns, the one that prints `-w`
+        self._reports = False
+
+    def _iter_chunks(self, chunk_size: int) -> typing.Iterator[bytes]:
+        if self._chunks is None:
+            if self._stream is not None:
+                rate = self.request.limit_rate
+                if rate:
+                    chunk_size = throttled_chunk_size(rate, chunk_size)
+                self._chunks = self._count(self._stream(chunk_size))
+            else:
+                content = self.content
+                self._chunks = (
+                    content[i : i + chunk_size]
+                    for i in range(0, len(content), chunk_size)
+                )
+        return self._chunks
+
+    def _count(self, chunks: typing.Iterable[bytes]) -> typing.Iterator[bytes]:
+        rate = self.request.limit_rate
+        throttle = Throttle(rate) if rate else None
+        for chunk in chunks:
+            self._downloaded += len(chunk)
+            yield chunk
+            if throttle is not None:
+                throttle.wait(len(chunk))
+
+    def iter_bytes(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.Iterator[bytes]:
+        """Iterate over the body, releasing the connection once it is exhausted"""
+        try:
+            if self._pending:
+                pending, self._pending = self._pending, memoryview(b"")
+                yield pending.tobytes()
+            for chunk in self._iter_chunks(chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            self.close()
+
+    def readinto(self, buffer: typing.Any) -> int:
+        """Read the next body bytes into `buffer`, returning 0 once exhausted"""
+        view = memoryview(buffer).cast("B")
+        if not self._pending:
+            chunks = self._iter_chunks(len(view) or DEFAULT_CHUNK_SIZE)
+            chunk = next(chunks, None)
+            while chunk == b"":
+                chunk = next(chunks, None)
+            if chunk is None:
+                self.close()
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(view), len(self._pending))
+        view[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    async def aiter_bytes(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.AsyncIterator[bytes]:
+        """Asynchronous `iter_bytes`"""
+        try:
+            if self._astream is not None:
+                rate = self.request.limit_rate
+                throttle = None
+                if rate:
+                    throttle = Throttle(rate)
+                    chunk_size = throttled_chunk_size(rate, chunk_size)
+                async for chunk in self._astream(chunk_size):
+                    self._downloaded += len(chunk)
+                    if chunk:
+                        yield chunk
+                    if throttle is not None:
+                        await throttle.await_(len(chunk))
+                return
+            # Blocking streams are pulled from the loop's default executor
+            import asyncio
+
+            loop = asyncio.get_running_loop()
+            chunks = self.iter_bytes(chunk_size)
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await self.aclose()
+
+    def save(self, output: OUTPUT, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Write the body to `output` (a path, `"-"` for stdout or a binary file)"""
+        if output == "-":
+            return self._write_to(sys.stdout.buffer, chunk_size)
+        if hasattr(output, "write"):
+            return self._write_to(typing.cast(typing.BinaryIO, output), chunk_size)
+        file = self._open_output(typing.cast(str, output))
+        if file is None:
+            self.close()
+            return 0
+        with file:
+            return self._write_to(file, chunk_size)
+
+    def _open_output(self, path: str) -> typing.Optional[typing.BinaryIO]:
+        """Open `path` for the body, resuming at the `-C` offset if there is one
+
+        Returns `None` when the server answers that nothing is left to resume.
+        """
+        offset = self.request.continue_at
+        if not offset:
+            return open(path, "wb")
+        if self.status_code == 416:
+            return None
+        if self.status_code != 206:
+            self.close()
+            raise DownloadError(
+                "The server doesn't support byte ranges, can't resume %s" % path
+            )
+        file = open(path, "r+b" if os.path.exists(path) else "wb")
+        file.seek(offset)
+        file.truncate()
+        return file
+
+    def _write_to(self, file: typing.BinaryIO, chunk_size: int) -> int:
+        written = 0
+        for chunk in self.iter_bytes(chunk_size):
+            written += file.write(chunk) or len(chunk)
+            if self.request.no_buffer:
+                file.flush()
+        return written
+
+    async def asave(
+        self, output: OUTPUT, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> int:
+        """Asynchronous `save`; file writes stay blocking as curl's do"""
+        if output == "-":
+            return await self._awrite_to(sys.stdout.buffer, chunk_size)
+        if hasattr(output, "write"):
+            file = typing.cast(typing.BinaryIO, output)
+            return await self._awrite_to(file, chunk_size)
+        file = self._open_output(typing.cast(str, output))
+        if file is None:
+            await self.aclose()
+            return 0
+        with file:
+            return await self._awrite_to(file, chunk_size)
+
+    async def _awrite_to(self, file: typing.BinaryIO, chunk_size: int) -> int:
+        written = 0
+        async for chunk in self.aiter_bytes(chunk_size):
+            written += file.write(chunk) or len(chunk)
+            if self.request.no_buffer:
+                file.flush()
+        return written
+
+    def close(self) -> None:
+        """Release the connection back to the engine's pool"""
+        if not self.closed:
+            self.closed = True
+            if self._close is not None:
+                self._close()
+            self.finish_transfer()
+
+    async def aclose(self) -> None:
+        if not self.closed:
+            self.closed = True
+            if self._aclose is not None:
+                await self._aclose()
+            elif self._close is not None:
+                self._close()
+            self.finish_transfer()
+
+    def finish_transfer(self) -> None:
+        """Stop the clock once the body has been received, then print `-w`
+        if the response was handed to the caller
+
+        Engines call this for buffered responses; streamed ones finish when
+        they are exhausted or closed.
+        """
+        if self.timings.time_total:
+            return
+        if self.request.stream:
+            self.timings.finish(self._downloaded)
+        else:
+            self.timings.finish(len(self.content))
+        if self._reports:
+            self._print_write_out()
+        if self.on_finish is not None:
+            on_finish, self.on_finish = self.on_finish, None
+            on_finish(self)
+
+    def report_write_out(self) -> "CurlResponse":
+        """Print `-w` for this response once its transfer is finished
+
+        Only the response returned to the caller reports, not the attempts
+        that retries and hedging discard, so `-w` is printed once like curl.
+        """
+        if self.request.write_out is not None:
+            if self.timings.time_total:
+                self._print_write_out()
+            else:
+                self._reports = True
+        return self
+
+    def _print_write_out(self) -> None:
+        sys.stdout.write(self.write_out(typing.cast(str, self.request.write_out)))
+        sys.stdout.flush()
+
+    def write_out(self, format: str) -> str:
+        """Render a curl `-w` format string such as `"%{time_total}\\n"`"""
+        return self.timings.render(
+            format,
+            http_code=self.status_code,
+            response_code=self.status_code,
+            url_effective=str(getattr(self.raw, "url", None) or self.request.url),
+            num_redirects=len(getattr(self.raw, "history", ())),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
 
     def ok(self) -> bool:
         return self.status_code // 100 == 2
@@ -70,14 +469,43 @@ class CurlResponse:
     def text(self) -> str:
         return self.raw.text
 
-    def json(self) -> str:
-        return self.raw.json()
+    def json(self) -> typing.Any:
+        """The decoded body, decoded once with the configured JSON codec"""
+        if self._json is _UNDECODED:
+            self._json = get_json_codec().loads(self.content)
+        return self._json
+
+    def iter_json(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.Iterator[typing.Any]:
+        """Decode a newline-delimited JSON body one value at a time, as it arrives"""
+        return iter_json_lines(self.iter_bytes(chunk_size))
+
+    async def aiter_json(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.AsyncIterator[typing.Any]:
+        """Asynchronous `iter_json`"""
+        loads = get_json_codec().loads
+        buffer = bytearray()
+        async for chunk in self.aiter_bytes(chunk_size):
+            for line in split_lines(buffer, chunk):
+                if line.strip():
+                    yield loads(line)
+        if buffer.strip():
+            yield loads(bytes(buffer))
 
     def raise_for_status(self) -> None:
-        return self.raw.raise_for_status()
+        self.raw.raise_for_status()
 
-    def iter_lines(self):
-        yield from self.raw.iter_lines()
+    def iter_lines(self) -> typing.Iterator[bytes]:
+        for line in self.raw.iter_lines():
+            if isinstance(line, str):
+                line = line.encode(self.encoding or "utf-8")
+            yield line
+
+    @property
+    def headers(self) -> typing.Mapping[str, str]:
+        return self.raw.headers
 
     @property
     def encoding(self):
@@ -94,6 +522,16 @@ class CurlResponse:
 def normalize_header_and_form(
     header_or_form: typing.Union[HEADERS, FORM_DATA], seperator: str
 ) -> typing.Dict[str, str]:
+    pairs = _normalize_pairs(header_or_form, seperator)
+    return pairs if isinstance(pairs, dict) else dict(pairs)
+
+
+def _normalize_pairs(
+    header_or_form: typing.Union[HEADERS, FORM_DATA], seperator: str
+) -> typing.Union[typing.Dict[str, str], typing.List[typing.Tuple[str, str]]]:
+    """Validate `header_or_form`, returning dictionaries as they are and
+    anything else as a list of pairs that keeps repeated names
+    """
     if isinstance(header_or_form, dict):
         for header, header_value in header_or_form.items():
             for value in (header, header_value):
@@ -113,15 +551,13 @@ def normalize_header_and_form(
         )
         raise IncompatibleTypeError(msg)
 
-    final_dict: typing.Dict[str, str] = {}
+    pairs: typing.List[typing.Tuple[str, str]] = []
 
     for single_header_or_form in iterator:
         if isinstance(single_header_or_form, str):
-            key, value = single_header_or_form.split(seperator)
-            final_dict[key] = value
+            key, value = single_header_or_form.split(seperator, 1)
         elif isinstance(single_header_or_form, tuple):
             key, value = single_header_or_form
-            final_dict[key] = value
         else:
             msg = (
                 "The iterable object must be of the type `Tuple[str, str]` "
@@ -135,12 +571,18 @@ def normalize_header_and_form(
                     "must be instances of `str` not `%s`" % val.__class__.__name__
                 )
                 raise IncompatibleTypeError(msg)
-    return final_dict
+        pairs.append((key, value))
+    return pairs
 
 
-def normalize_headers(headers: HEADERS) -> typing.Dict[str, str]:
-    """Convert any header-compatible type to `typing.Dict[str, str]` type"""
-    return normalize_header_and_form(header_or_form=headers, seperator=": ")
+def normalize_headers(headers: HEADERS) -> Headers:
+    """Convert any header-compatible type to `Headers`
+
+    Repeated names are kept, as curl sends every `-H` it is given.
+    """
+    if isinstance(headers, Headers):
+        return headers
+    return Headers(_normalize_pairs(header_or_form=headers, seperator=": "))
 
 
 def normalize_forms(forms: FORM_DATA) -> typing.Dict[str, str]:
@@ -182,6 +624,49 @@ def normalize_auth(auth: CREDENTIALS) -> typing.Tuple[str, str]:
         raise IncompatibleTypeError(msg)
 
 
+def read_etag(path: str) -> typing.Optional[str]:
+    """Read an ETag saved by `--etag-save`, a missing file means no ETag"""
+    try:
+        with open(path) as file:
+            return file.readline().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_continue_at(
+    continue_at: typing.Optional[typing.Union[str, int]],
+    output: typing.Optional[OUTPUT],
+) -> typing.Optional[int]:
+    """Offset `-C` resumes at; `-C -` picks the size of the `-o` file"""
+    if continue_at is None:
+        return None
+    if continue_at != "-":
+        return int(continue_at)
+    if output is None or output == "-" or hasattr(output, "write"):
+        raise IncompatibleTypeError("`-C -` needs an output file path in `-o`")
+    path = typing.cast(str, output)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def resolve_aliases(
+    options: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    """Fold every `__long_option` value into its `_short` alias"""
+    resolved = dict(options)
+    for option, option_alias in OPTIONS:
+        alias_value = resolved.pop(option_alias, None)
+        if alias_value is None:
+            continue
+        if resolved.get(option) is not None:
+            msg = (
+                "Because options '%s' and '%s' are "
+                "aliases, only one of them can be used." % (option, option_alias)
+            )
+            raise RepeatedAliasesError(msg)
+        resolved[option] = alias_value
+    return resolved
+
+
 def create_curl_request(
     url: str,
     /,
@@ -200,17 +685,114 @@ def create_curl_request(
     __header: typing.Optional[HEADERS] = None,
     _L: typing.Optional[bool] = None,
     __location: typing.Optional[bool] = None,
-    _X: METHOD = "GET",
+    _X: typing.Optional[METHOD] = None,
     __request: typing.Optional[METHOD] = None,
+    __http2: typing.Optional[bool] = None,
+    __http2_prior_knowledge: typing.Optional[bool] = None,
+    _o: typing.Optional[OUTPUT] = None,
+    __output: typing.Optional[OUTPUT] = None,
+    _N: typing.Optional[bool] = None,
+    __no_buffer: typing.Optional[bool] = None,
+    __data_binary: typing.Optional[str] = None,
+    _T: typing.Optional[str] = None,
+    __upload_file: typing.Optional[str] = None,
+    __etag_save: typing.Optional[str] = None,
+    __etag_compare: typing.Optional[str] = None,
+    __compressed: typing.Optional[bool] = None,
+    compress_request: bool = False,
+    __retry: typing.Optional[int] = None,
+    __retry_delay: typing.Optional[float] = None,
+    __retry_max_time: typing.Optional[float] = None,
+    __retry_all_errors: typing.Optional[bool] = None,
+    __retry_connrefused: typing.Optional[bool] = None,
+    _w: typing.Optional[str] = None,
+    __write_out: typing.Optional[str] = None,
+    hedge: typing.Optional[float] = None,
+    coalesce: bool = False,
+    coalesce_timeout: typing.Optional[float] = None,
+    __resolve: typing.Optional[HOST_MAPPINGS] = None,
+    __connect_to: typing.Optional[HOST_MAPPINGS] = None,
+    __limit_rate: typing.Optional[typing.Union[str, int]] = None,
+    _r: typing.Optional[str] = None,
+    __range: typing.Optional[str] = None,
+    _C: typing.Optional[typing.Union[str, int]] = None,
+    __continue_at: typing.Optional[typing.Union[str, int]] = None,
+    segments: typing.Optional[int] = None,
+    __json: typing.Optional[typing.Any] = None,
+    __unix_socket: typing.Optional[str] = None,
+    __abstract_unix_socket: typing.Optional[str] = None,
 ) -> CurlRequest:
-    headers = normalize_headers(headers=_H) if _H else None
-    forms = normalize_forms(forms=_F) if _F else None
-    auth = normalize_auth(_u) if _u else None
-    data = _d
-    user_agent = _A
-    verbose = bool(_v)
-    follow_redirects = bool(_L)
-    method = _X
+    options = resolve_aliases(locals())
+    headers = normalize_headers(headers=options["_H"]) if options["_H"] else None
+    forms = normalize_forms(forms=options["_F"]) if options["_F"] else None
+    auth = normalize_auth(options["_u"]) if options["_u"] else None
+    data = options["_d"]
+    user_agent = options["_A"]
+    verbose = bool(options["_v"])
+    follow_redirects = bool(options["_L"])
+    method = options["_X"] or "GET"
+    http_version = None
+    if options["__http2_prior_knowledge"]:
+        http_version = HTTP_2_PRIOR_KNOWLEDGE
+    elif options["__http2"]:
+        http_version = HTTP_2
+    output = options["_o"]
+    no_buffer = bool(options["_N"])
+    data_binary = options["__data_binary"]
+    upload_file = options["_T"]
+    if options["__json"] is not None:
+        # curl --json posts the data as is with JSON headers; objects are encoded
+        json_data = options["__json"]
+        if not isinstance(json_data, (str, bytes)):
+            json_data = get_json_codec().dumps(json_data)
+        data_binary = json_data
+        method = options["_X"] or "POST"
+        headers = (
+            (headers or EMPTY_HEADERS)
+            .with_default("Content-Type", "application/json")
+            .with_default("Accept", "application/json")
+        )
+    if options["__etag_compare"] is not None:
+        etag = read_etag(options["__etag_compare"])
+        if etag:
+            headers = (headers or EMPTY_HEADERS).with_header("If-None-Match", etag)
+    byte_range = options["_r"]
+    continue_at = resolve_continue_at(options["_C"], output)
+    if continue_at:
+        byte_range = "%d-" % continue_at
+    if byte_range:
+        if not byte_range.startswith("bytes="):
+            byte_range = "bytes=" + byte_range
+        headers = (headers or EMPTY_HEADERS).with_header("Range", byte_range)
+    if upload_file is not None:
+        # curl -T uploads with PUT and names the target after the file
+        method = options["_X"] or "PUT"
+        if url.endswith("/"):
+            url += os.path.basename(upload_file)
+    # Values coming from a command line are strings
+    retry = int(options["__retry"] or 0)
+    retry_delay = options["__retry_delay"]
+    retry_max_time = options["__retry_max_time"]
+    hedge = options["hedge"]
+    resolve = options["__resolve"]
+    connect_to = options["__connect_to"]
+    unix_socket = options["__unix_socket"]
+    if options["__abstract_unix_socket"] is not None:
+        if unix_socket is not None:
+            raise IncompatibleTypeError(
+                "--unix-socket and --abstract-unix-socket can't be used together"
+            )
+        # Abstract socket names are paths starting with a NUL byte
+        unix_socket = "\0" + options["__abstract_unix_socket"]
+    resolver = None
+    if resolve or connect_to or unix_socket:
+        resolver = Resolver(
+            resolve=[resolve] if isinstance(resolve, str) else resolve or (),
+            connect_to=(
+                [connect_to] if isinstance(connect_to, str) else connect_to or ()
+            ),
+            unix_socket=unix_socket,
+        )
 
     curl_request: CurlRequest = CurlRequest(
         url,
@@ -222,6 +804,35 @@ def create_curl_request(
         follow_redirects=follow_redirects,
         headers=headers,
         method=method,
+        http_version=http_version,
+        output=output,
+        no_buffer=no_buffer,
+        data_binary=data_binary,
+        upload_file=upload_file,
+        etag_save=options["__etag_save"],
+        compressed=bool(options["__compressed"]),
+        compress_request=options["compress_request"],
+        retry=retry,
+        retry_delay=float(retry_delay) if retry_delay is not None else None,
+        retry_max_time=float(retry_max_time) if retry_max_time is not None else None,
+        retry_all_errors=bool(options["__retry_all_errors"]),
+        retry_connrefused=bool(options["__retry_connrefused"]),
+        hedge=float(hedge) if hedge is not None else None,
+        coalesce=bool(options["coalesce"]),
+        coalesce_timeout=(
+            float(options["coalesce_timeout"])
+            if options["coalesce_timeout"] is not None
+            else None
+        ),
+        write_out=options["_w"],
+        resolver=resolver,
+        limit_rate=(
+            parse_rate(options["__limit_rate"])
+            if options["__limit_rate"] is not None
+            else None
+        ),
+        continue_at=continue_at,
+        segments=int(options["segments"]) if options["segments"] else None,
     )
 
     return curl_request
@@ -245,34 +856,112 @@ def curl(
     __header: typing.Optional[HEADERS] = None,
     _L: typing.Optional[bool] = None,
     __location: typing.Optional[bool] = None,
-    _X: METHOD = "GET",
+    _X: typing.Optional[METHOD] = None,
     __request: typing.Optional[METHOD] = None,
-    engine: typing.Union[engines, ENGINE_LITERAL] = engines.requests,
+    __http2: typing.Optional[bool] = None,
+    __http2_prior_knowledge: typing.Optional[bool] = None,
+    _o: typing.Optional[OUTPUT] = None,
+    __output: typing.Optional[OUTPUT] = None,
+    _N: typing.Optional[bool] = None,
+    __no_buffer: typing.Optional[bool] = None,
+    __data_binary: typing.Optional[str] = None,
+    _T: typing.Optional[str] = None,
+    __upload_file: typing.Optional[str] = None,
+    __etag_save: typing.Optional[str] = None,
+    __etag_compare: typing.Optional[str] = None,
+    __compressed: typing.Optional[bool] = None,
+    compress_request: bool = False,
+    __retry: typing.Optional[int] = None,
+    __retry_delay: typing.Optional[float] = None,
+    __retry_max_time: typing.Optional[float] = None,
+    __retry_all_errors: typing.Optional[bool] = None,
+    __retry_connrefused: typing.Optional[bool] = None,
+    _w: typing.Optional[str] = None,
+    __write_out: typing.Optional[str] = None,
+    hedge: typing.Optional[float] = None,
+    coalesce: bool = False,
+    coalesce_timeout: typing.Optional[float] = None,
+    __resolve: typing.Optional[HOST_MAPPINGS] = None,
+    __connect_to: typing.Optional[HOST_MAPPINGS] = None,
+    __limit_rate: typing.Optional[typing.Union[str, int]] = None,
+    _r: typing.Optional[str] = None,
+    __range: typing.Optional[str] = None,
+    _C: typing.Optional[typing.Union[str, int]] = None,
+    __continue_at: typing.Optional[typing.Union[str, int]] = None,
+    segments: typing.Optional[int] = None,
+    __json: typing.Optional[typing.Any] = None,
+    __unix_socket: typing.Optional[str] = None,
+    __abstract_unix_socket: typing.Optional[str] = None,
+    engine: typing.Union[Engine, engines, ENGINE_LITERAL] = engines.requests,
 ) -> CurlResponse:
-    for option, option_alias in OPTIONS:
-        if locals()[option] is not None and locals()[option_alias] is not None:
-            msg = (
-                "Because options '%s' and '%s' are "
-                "aliases, only one of them can be used." % (option, option_alias)
-            )
-            raise RepeatedAliasesError(msg)
-        locals()[option] = locals()[option_alias] or locals()[option]
+    options = dict(locals())
+    del options["url"], options["engine"]
 
-    curl_request = create_curl_request(
-        url,
-        _d=_d,
-        _F=_F,
-        _u=_u,
-        _A=_A,
-        _v=_v,
-        _H=_H,
-        _L=_L,
-        _X=_X,
-    )
-    if isinstance(engine, str):
-        engine_enum = getattr(engines, engine)
-    else:
-        engine_enum = engine
-    engine_class = typing.cast(Engine, engine_enum.value())
-    response = engine_class.handle_curl(curl_request)
+    curl_request = create_curl_request(url, **options)
+    response = dispatch(get_engine(engine), curl_request)
+    return response
+
+
+async def acurl(
+    url: str,
+    /,
+    *,
+    _d: typing.Optional[str] = None,
+    __data: typing.Optional[str] = None,
+    _F: typing.Optional[FORM_DATA] = None,
+    __form: typing.Optional[FORM_DATA] = None,
+    _u: typing.Optional[CREDENTIALS] = None,
+    __user: typing.Optional[CREDENTIALS] = None,
+    _A: typing.Optional[str] = None,
+    __user_agent: typing.Optional[str] = None,
+    _v: typing.Optional[bool] = None,
+    __verbose: typing.Optional[bool] = None,
+    _H: typing.Optional[HEADERS] = None,
+    __header: typing.Optional[HEADERS] = None,
+    _L: typing.Optional[bool] = None,
+    __location: typing.Optional[bool] = None,
+    _X: typing.Optional[METHOD] = None,
+    __request: typing.Optional[METHOD] = None,
+    __http2: typing.Optional[bool] = None,
+    __http2_prior_knowledge: typing.Optional[bool] = None,
+    _o: typing.Optional[OUTPUT] = None,
+    __output: typing.Optional[OUTPUT] = None,
+    _N: typing.Optional[bool] = None,
+    __no_buffer: typing.Optional[bool] = None,
+    __data_binary: typing.Optional[str] = None,
+    _T: typing.Optional[str] = None,
+    __upload_file: typing.Optional[str] = None,
+    __etag_save: typing.Optional[str] = None,
+    __etag_compare: typing.Optional[str] = None,
+    __compressed: typing.Optional[bool] = None,
+    compress_request: bool = False,
+    __retry: typing.Optional[int] = None,
+    __retry_delay: typing.Optional[float] = None,
+    __retry_max_time: typing.Optional[float] = None,
+    __retry_all_errors: typing.Optional[bool] = None,
+    __retry_connrefused: typing.Optional[bool] = None,
+    _w: typing.Optional[str] = None,
+    __write_out: typing.Optional[str] = None,
+    hedge: typing.Optional[float] = None,
+    coalesce: bool = False,
+    coalesce_timeout: typing.Optional[float] = None,
+    __resolve: typing.Optional[HOST_MAPPINGS] = None,
+    __connect_to: typing.Optional[HOST_MAPPINGS] = None,
+    __limit_rate: typing.Optional[typing.Union[str, int]] = None,
+    _r: typing.Optional[str] = None,
+    __range: typing.Optional[str] = None,
+    _C: typing.Optional[typing.Union[str, int]] = None,
+    __continue_at: typing.Optional[typing.Union[str, int]] = None,
+    segments: typing.Optional[int] = None,
+    __json: typing.Optional[typing.Any] = None,
+    __unix_socket: typing.Optional[str] = None,
+    __abstract_unix_socket: typing.Optional[str] = None,
+    engine: typing.Union[Engine, engines, ENGINE_LITERAL] = engines.httpx,
+) -> CurlResponse:
+    """Asynchronous `curl`, served natively by engines with an asyncio backend"""
+    options = dict(locals())
+    del options["url"], options["engine"]
+
+    curl_request = create_curl_request(url, **options)
+    response = await adispatch(get_engine(engine), curl_request)
     return response
@@ -0,0 +1,305 @@
+import threading
+import time
+import typing
+from urllib.parse import urlsplit
+
+from . import config
+from ._engines import Engine
+from ._metrics import metrics
+from ._ratelimit import rate_limiter
+from ._retry import can_hedge
+from ._retry import latencies
+from ._retry import retry_delay
+from ._retry import should_retry_error
+from ._retry import should_retry_response
+
+if typing.TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Future
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+_hedge_executor: typing.Optional["ThreadPoolExecutor"] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> "ThreadPoolExecutor":
+    global _hedge_executor
+    if _hedge_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=config.HEDGE_MAX_WORKERS,
+                    thread_name_prefix="httpalchemy-hedge",
+                )
+    return _hedge_executor
+
+
+def _handle(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    if not metrics.active:
+        return engine.handle_curl(curl_request)
+    started = metrics.request_started(curl_request)
+    try:
+        response = engine.handle_curl(curl_request)
+    except Exception as exc:
+        metrics.request_failed(curl_request, exc, started)
+        raise
+    metrics.response_received(response, started)
+    return response
+
+
+def _send(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    # Every attempt counts against the host's rate limit, retries included
+    rate_limiter.acquire(curl_request.url)
+    return _handle(engine, curl_request)
+
+
+def _timed_send(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    # Time spent waiting for the rate limit isn't the host's latency
+    rate_limiter.acquire(curl_request.url)
+    started = time.monotonic()
+    response = _handle(engine, curl_request)
+    latencies.record(urlsplit(curl_request.url).netloc, time.monotonic() - started)
+    return response
+
+
+def _close_response(future: "Future") -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _hedged_send(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    """Send a duplicate if the first attempt outlives the latency percentile
+
+    Whichever attempt succeeds first wins, the other one is closed once it
+    completes.
+    """
+    from concurrent.futures import FIRST_COMPLETED
+    from concurrent.futures import wait
+
+    threshold = latencies.percentile(
+        urlsplit(curl_request.url).netloc, typing.cast(float, curl_request.hedge)
+    )
+    if threshold is None:
+        return _timed_send(engine, curl_request)
+
+    executor = _get_hedge_executor()
+    pending = {executor.submit(_timed_send, engine, curl_request)}
+    done, pending = wait(pending, timeout=threshold)
+    if not done:
+        pending.add(executor.submit(_timed_send, engine, curl_request))
+
+    error: typing.Optional[BaseException] = None
+    while pending or done:
+        if not done:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        future = done.pop()
+        if future.exception() is None:
+            for other in done | pending:
+                other.add_done_callback(_close_response)
+            return future.result()
+        error = error or future.exception()
+    raise typing.cast(BaseException, error)
+
+
+def _send_once(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    if can_hedge(curl_request):
+        return _hedged_send(engine, curl_request)
+    return _send(engine, curl_request)
+
+
+def dispatch(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    """Send `curl_request` through `engine`, applying coalescing, `--retry`,
+    hedging, the per-host rate limits and `metrics`, and print its `-w`
+    """
+    return _send_request(engine, curl_request).report_write_out()
+
+
+def _send_request(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    if curl_request.segments:
+        from ._segmented import can_segment
+        from ._segmented import download
+
+        if can_segment(curl_request):
+            return download(_send_request, engine, curl_request)
+    if curl_request.coalesce:
+        from ._coalesce import coalesce_key
+        from ._coalesce import single_flight
+
+        key = coalesce_key(engine, curl_request)
+        if key is not None:
+            return single_flight.call(
+                key, curl_request, lambda: _dispatch(engine, curl_request)
+            )
+    return _dispatch(engine, curl_request)
+
+
+def _dispatch(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    if not curl_request.retry:
+        return _send_once(engine, curl_request)
+
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            response = _send_once(engine, curl_request)
+        except Exception as exc:
+            if attempt >= curl_request.retry or not should_retry_error(
+                curl_request, exc
+            ):
+                raise
+            delay = retry_delay(curl_request, attempt)
+            if _out_of_time(curl_request, started, delay):
+                raise
+        else:
+            if attempt >= curl_request.retry or not should_retry_response(response):
+                return response
+            delay = retry_delay(curl_request, attempt, response)
+            if _out_of_time(curl_request, started, delay):
+                return response
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def _out_of_time(curl_request: "CurlRequest", started: float, delay: float) -> bool:
+    max_time = curl_request.retry_max_time
+    return bool(max_time) and time.monotonic() - started + delay > max_time
+
+
+async def _ahandle(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    if not metrics.active:
+        return await engine.ahandle_curl(curl_request)
+    started = metrics.request_started(curl_request)
+    try:
+        response = await engine.ahandle_curl(curl_request)
+    except Exception as exc:
+        metrics.request_failed(curl_request, exc, started)
+        raise
+    metrics.response_received(response, started)
+    return response
+
+
+async def _asend(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    await rate_limiter.aacquire(curl_request.url)
+    return await _ahandle(engine, curl_request)
+
+
+async def _atimed_send(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    await rate_limiter.aacquire(curl_request.url)
+    started = time.monotonic()
+    response = await _ahandle(engine, curl_request)
+    latencies.record(urlsplit(curl_request.url).netloc, time.monotonic() - started)
+    return response
+
+
+async def _aclose_when_done(task: "asyncio.Task") -> None:
+    try:
+        response = await task
+    except Exception:
+        return
+    await response.aclose()
+
+
+async def _ahedged_send(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    import asyncio
+
+    threshold = latencies.percentile(
+        urlsplit(curl_request.url).netloc, typing.cast(float, curl_request.hedge)
+    )
+    if threshold is None:
+        return await _atimed_send(engine, curl_request)
+
+    pending = {asyncio.ensure_future(_atimed_send(engine, curl_request))}
+    done, pending = await asyncio.wait(pending, timeout=threshold)
+    if not done:
+        pending.add(asyncio.ensure_future(_atimed_send(engine, curl_request)))
+
+    error: typing.Optional[BaseException] = None
+    while pending or done:
+        if not done:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+        task = done.pop()
+        if task.exception() is None:
+            for other in done:
+                await _aclose_when_done(other)
+            for other in pending:
+                other.cancel()
+            return task.result()
+        error = error or task.exception()
+    raise typing.cast(BaseException, error)
+
+
+async def _asend_once(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    if can_hedge(curl_request):
+        return await _ahedged_send(engine, curl_request)
+    return await _asend(engine, curl_request)
+
+
+async def adispatch(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    """Asynchronous `dispatch`"""
+    response = await _asend_request(engine, curl_request)
+    return response.report_write_out()
+
+
+async def _asend_request(
+    engine: Engine, curl_request: "CurlRequest"
+) -> "CurlResponse":
+    import asyncio
+
+    if curl_request.segments:
+        from ._segmented import can_segment
+        from ._segmented import download
+
+        if can_segment(curl_request):
+            # Segments are written from threads, sending them synchronously
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, download, _send_request, engine, curl_request
+            )
+    if curl_request.coalesce:
+        from ._coalesce import coalesce_key
+        from ._coalesce import single_flight
+
+        key = coalesce_key(engine, curl_request)
+        if key is not None:
+            return await single_flight.acall(
+                key, curl_request, lambda: _adispatch(engine, curl_request)
+            )
+    return await _adispatch(engine, curl_request)
+
+
+async def _adispatch(engine: Engine, curl_request: "CurlRequest") -> "CurlResponse":
+    import asyncio
+
+    if not curl_request.retry:
+        return await _asend_once(engine, curl_request)
+
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            response = await _asend_once(engine, curl_request)
+        except Exception as exc:
+            if attempt >= curl_request.retry or not should_retry_error(
+                curl_request, exc
+            ):
+                raise
+            delay = retry_delay(curl_request, attempt)
+            if _out_of_time(curl_request, started, delay):
+                raise
+        else:
+            if attempt >= curl_request.retry or not should_retry_response(response):
+                return response
+            delay = retry_delay(curl_request, attempt, response)
+            if _out_of_time(curl_request, started, delay):
+                return response
+            await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,252 @@
+import collections
+import contextlib
+import contextvars
+import re
+import socket
+import threading
+import time
+import typing
+
+from . import config
+from ._exceptions import InvalidOptionError
+from ._timings import current_timings
+
+ADDRESS_INFO = typing.Tuple[
+    socket.AddressFamily, socket.SocketKind, int, str, typing.Tuple[typing.Any, ...]
+]
+CACHE_ENTRY = typing.Tuple[float, typing.List[ADDRESS_INFO]]
+CONNECT_TO = re.compile(r"^(\[[^\]]*\]|[^:]*):(\d*):(\[[^\]]*\]|[^:]*):(\d*)$")
+
+_resolver: contextvars.ContextVar[typing.Optional["Resolver"]] = contextvars.ContextVar(
+    "httpalchemy_resolver", default=None
+)
+
+
+class DNSCache:
+    """Addresses returned by `getaddrinfo`, kept for `config.DNS_CACHE_TTL`
+
+    The cache is shared by every engine and is disabled while the TTL is
+    `None`. Once it holds `config.DNS_CACHE_SIZE` entries, the least recently
+    used ones are evicted. Failed lookups aren't cached.
+    """
+
+    def __init__(self):
+        self._entries: typing.Dict[typing.Hashable, CACHE_ENTRY] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: typing.Hashable) -> typing.Optional[typing.List[ADDRESS_INFO]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, addresses = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)  # type: ignore[attr-defined]
+            return addresses
+
+    def set(self, key: typing.Hashable, addresses: typing.List[ADDRESS_INFO]) -> None:
+        ttl = config.DNS_CACHE_TTL
+        if not ttl:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, addresses)
+            self._entries.move_to_end(key)  # type: ignore[attr-defined]
+            while len(self._entries) > config.DNS_CACHE_SIZE:
+                self._entries.popitem(last=False)  # type: ignore[call-arg]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+dns_cache = DNSCache()
+
+
+def _strip_brackets(host: str) -> str:
+    return host[1:-1] if host.startswith("[") and host.endswith("]") else host
+
+
+def _parse_resolve(entry: str) -> typing.Tuple[str, int, typing.Tuple[str, ...]]:
+    parts = entry.lstrip("+").split(":", 2)
+    if len(parts) != 3 or not parts[1].isdigit() or not parts[2]:
+        raise InvalidOptionError("Invalid --resolve entry '%s'" % entry)
+    host, port, addresses = parts
+    return (
+        host.lower(),
+        int(port),
+        tuple(_strip_brackets(address) for address in addresses.split(",")),
+    )
+
+
+def _parse_connect_to(
+    entry: str,
+) -> typing.Tuple[str, typing.Optional[int], str, typing.Optional[int]]:
+    match = CONNECT_TO.match(entry)
+    if match is None:
+        raise InvalidOptionError("Invalid --connect-to entry '%s'" % entry)
+    host, port, to_host, to_port = match.groups()
+    return (
+        _strip_brackets(host).lower(),
+        int(port) if port else None,
+        _strip_brackets(to_host),
+        int(to_port) if to_port else None,
+    )
+
+
+class Resolver:
+    """Where the connections of a request go
+
+    `--connect-to` entries pick the host and port to connect to, then
+    `--resolve` entries pin the addresses of that host, and other names go
+    through `dns_cache` and `getaddrinfo`. With `unix_socket` set, every
+    connection goes to that Unix domain socket instead (a path, or a name
+    starting with a NUL byte for the abstract namespace). The host name sent
+    in requests and checked against certificates never changes, like in
+    curl.
+    """
+
+    __slots__ = ("resolve", "connect_to", "unix_socket")
+
+    def __init__(
+        self,
+        resolve: typing.Iterable[str] = (),
+        connect_to: typing.Iterable[str] = (),
+        unix_socket: typing.Optional[str] = None,
+    ):
+        # `-host:port` entries only clear curl's own cache, there is nothing to pin
+        self.resolve = tuple(
+            _parse_resolve(entry) for entry in resolve if not entry.startswith("-")
+        )
+        self.connect_to = tuple(_parse_connect_to(entry) for entry in connect_to)
+        self.unix_socket = unix_socket
+
+    def route(self, host: str, port: int) -> typing.Tuple[str, int]:
+        """The host and port that a connection to `host:port` should use"""
+        name = _strip_brackets(host).lower()
+        for from_host, from_port, to_host, to_port in self.connect_to:
+            if from_host and from_host != name:
+                continue
+            if from_port is not None and from_port != port:
+                continue
+            return to_host or host, to_port or port
+        return host, port
+
+    def _pinned(
+        self, host: str, port: int, family: int
+    ) -> typing.Optional[typing.List[ADDRESS_INFO]]:
+        name = host.lower()
+        for pinned_host, pinned_port, addresses in self.resolve:
+            if pinned_port == port and pinned_host in (name, "*"):
+                infos = [
+                    (
+                        socket.AF_INET6 if ":" in address else socket.AF_INET,
+                        socket.SOCK_STREAM,
+                        socket.IPPROTO_TCP,
+                        "",
+                        (address, port, 0, 0) if ":" in address else (address, port),
+                    )
+                    for address in addresses
+                ]
+                return [info for info in infos if family in (socket.AF_UNSPEC, info[0])]
+        return None
+
+    def _cached(
+        self, host: str, port: int, family: int
+    ) -> typing.Tuple[typing.Hashable, typing.Optional[typing.List[ADDRESS_INFO]]]:
+        addresses = self._pinned(host, port, family)
+        key = (host.lower(), port, family)
+        if addresses is None:
+            addresses = dns_cache.get(key)
+        timings = current_timings()
+        if timings is not None:
+            timings.num_dns_lookups += 1
+            if addresses is not None:
+                timings.num_dns_cache_hits += 1
+        return key, addresses
+
+    def getaddrinfo(
+        self, host: str, port: int, family: int = socket.AF_UNSPEC
+    ) -> typing.List[ADDRESS_INFO]:
+        """TCP addresses for `host:port`, raising `socket.gaierror` on failure"""
+        host = _strip_brackets(host)
+        key, addresses = self._cached(host, port, family)
+        if addresses is None:
+            addresses = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+            dns_cache.set(key, addresses)
+        return addresses
+
+    async def agetaddrinfo(
+        self, host: str, port: int, family: int = socket.AF_UNSPEC
+    ) -> typing.List[ADDRESS_INFO]:
+        """Asynchronous `getaddrinfo`, resolving in the loop's default executor"""
+        import asyncio
+
+        host = _strip_brackets(host)
+        key, addresses = self._cached(host, port, family)
+        if addresses is None:
+            loop = asyncio.get_running_loop()
+            addresses = await loop.getaddrinfo(
+                host, port, family=family, type=socket.SOCK_STREAM
+            )
+            dns_cache.set(key, addresses)
+        return addresses
+
+    def connect_unix_socket(
+        self, timeout: typing.Optional[float] = None
+    ) -> socket.socket:
+        """A socket connected to `unix_socket`"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(typing.cast(str, self.unix_socket))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return (self.resolve, self.connect_to, self.unix_socket)
+
+    def __bool__(self) -> bool:
+        return bool(self.resolve or self.connect_to or self.unix_socket)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Resolver):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self):
+        if self.unix_socket is not None:
+            return "<Resolver [unix_socket=%r]>" % self.unix_socket
+        return "<Resolver [resolve=%d connect_to=%d]>" % (
+            len(self.resolve),
+            len(self.connect_to),
+        )
+
+
+DEFAULT_RESOLVER = Resolver()
+
+
+@contextlib.contextmanager
+def resolving(resolver: typing.Optional[Resolver]) -> typing.Iterator[Resolver]:
+    """Let connections opened by this thread or task use `resolver`"""
+    resolver = resolver or DEFAULT_RESOLVER
+    token = _resolver.set(resolver)
+    try:
+        yield resolver
+    finally:
+        _resolver.reset(token)
+
+
+def current_resolver() -> Resolver:
+    return _resolver.get() or DEFAULT_RESOLVER
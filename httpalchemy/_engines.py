@@ -1,36 +1,57 @@
-import io
+import base64
+import importlib
+import os
+import threading
+import time
 import typing
+import weakref
 from abc import ABC
 from abc import abstractmethod
 from enum import Enum
-from enum import auto
-from . import config
 
-import requests
+from . import config
+from ._exceptions import UnknownEngineError
 
-from .config import DEFAULT_USER_AGENT
+if typing.TYPE_CHECKING:
+    import asyncio
 
-try:
-    from requests import Request as RequestsRequest
-    from requests import Response as RequestsResponse
-except Exception:
-    ...
-try:
     from httpx import Request as HttpxRequest
     from httpx import Response as HttpxResponse
-except Exception:
-    ...
+    from requests import Request as RequestsRequest
+    from requests import Response as RequestsResponse
 
-if typing.TYPE_CHECKING:
     from ._curl import CurlRequest
     from ._curl import CurlResponse
+    from ._metrics import PoolGauges
 
-ENGINE_LITERAL = typing.Literal["requests", "httpx"]
+ENGINE_LITERAL = typing.Literal["requests", "httpx", "urllib3", "replay"]
+HTTP_2 = "2"
+HTTP_2_PRIOR_KNOWLEDGE = "2-prior-knowledge"
 REQUESTS = typing.Union["RequestsRequest", "HttpxRequest"]
 RESPONSES = typing.Union["HttpxResponse", "RequestsResponse"]
 
 
+def basic_auth_header(auth: typing.Tuple[str, str]) -> str:
+    credentials = ("%s:%s" % auth).encode("latin-1")
+    return "Basic " + base64.b64encode(credentials).decode("ascii")
+
+
 class Engine(ABC):
+    def __init__(
+        self,
+        max_concurrency: typing.Optional[int] = None,
+        proxies: typing.Optional[typing.Mapping[str, str]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.proxies = proxies
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    def get_proxies(self, url: str) -> typing.Dict[str, str]:
+        """Proxies for `url`: the engine's own, otherwise `resolve_proxies`"""
+        if self.proxies is not None:
+            return dict(self.proxies)
+        return resolve_proxies(url)
 
     @abstractmethod
     def _convert_request(self, curl_request: "CurlRequest") -> typing.Tuple[REQUESTS, typing.Dict[str, str]]:
@@ -46,86 +67,285 @@ class Engine(ABC):
     def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
         ...
 
+    async def ahandle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        """Asynchronous `handle_curl`, bounded by `max_concurrency` per event loop"""
+        semaphore = self._get_semaphore()
+        if semaphore is None:
+            return await self._ahandle_curl(request)
+        async with semaphore:
+            return await self._ahandle_curl(request)
+
+    async def _ahandle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        # Engines without an asyncio backend run in the loop's default executor
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.handle_curl, request)
+
+    def _get_semaphore(self) -> typing.Optional["asyncio.Semaphore"]:
+        import asyncio
+
+        if self.max_concurrency is None:
+            return None
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            with self._semaphores_lock:
+                semaphore = self._semaphores.get(loop)
+                if semaphore is None:
+                    semaphore = asyncio.Semaphore(self.max_concurrency)
+                    self._semaphores[loop] = semaphore
+        return semaphore
 
-class requestsEngine(Engine):
-    DEFAULT_HEADERS = {
-        "Accept": "*/*",
-    }
-
-    def _convert_request(self, curl_request: "CurlRequest") -> typing.Tuple["RequestsRequest", typing.Dict[str, str]]:
-        from requests import Request
-
-        url = curl_request.url
-        method = curl_request.method
-        data = curl_request.data
-        headers = curl_request.headers
-        form = curl_request.form
-        user_agent = curl_request.user_agent
-        cleaned_form: typing.Dict[
-            str, typing.Union[str, typing.Tuple[str, io.BufferedReader]]
-        ] = {}
-
-        if headers is None:
-            headers = {}
-        if data is not None and "Content-Type" not in headers:
-            headers["Content-Type"] = "application/x-www-form-urlencoded"
-
-        if form is None:
-            form = {}
-
-        proxies = {}
-        if config.HTTPS_PROXY:
-            proxies['https'] = config.HTTPS_PROXY
-        if config.HTTP_PROXY:
-            proxies['http'] = config.HTTP_PROXY
-
-        for key, value in form.items():
-            if value[0] == "@":
-                filename = value[1:]
-                cleaned_form[key] = (filename, open(filename, "rb"))
-
-        headers["User-Agent"] = user_agent or DEFAULT_USER_AGENT
-
-        merged_headers = self.DEFAULT_HEADERS
-        merged_headers.update(headers)
-
-        req = Request(
-            url=url,
-            method=method,
-            data=data,
-            files=cleaned_form,
-            headers=merged_headers,
+    def pool_gauges(self) -> typing.Dict[str, "PoolGauges"]:
+        """Connections the engine holds per `host:port`, for engines that pool"""
+        return {}
+
+    def build_response(
+        self,
+        curl_request: "CurlRequest",
+        *,
+        status_code: int,
+        reason: str,
+        headers: typing.List[typing.Tuple[str, str]],
+        content: bytes,
+    ) -> "CurlResponse":
+        """Build a response that wasn't received from the network, e.g. a cached one
+
+        Engines without a response type of their own get a urllib3 one, the
+        cheapest to build around a body that is already decoded.
+        """
+        return get_engine(engines.urllib3).build_response(
+            curl_request,
+            status_code=status_code,
+            reason=reason,
+            headers=headers,
+            content=content,
         )
-        return req, proxies
 
-    def _send(
-            self, request: "RequestsRequest", curl_request: "CurlRequest", proxies: typing.Dict[str, str]
-    ) -> "RequestsResponse":
+    @staticmethod
+    def _save_etag(response: "CurlResponse") -> None:
+        etag_save = response.request.etag_save
+        if etag_save is not None:
+            with open(etag_save, "w") as file:
+                file.write((response.headers.get("ETag") or "") + "\n")
 
-        with requests.Session() as s:
-            response = s.send(
-                request.prepare(),
-                allow_redirects=curl_request.follow_redirects,
-                proxies=proxies
-            )
+    @staticmethod
+    def _store_content(response: "CurlResponse", content: bytes) -> None:
+        """Keep `content` as the body of a response that was read as a stream"""
+        response.raw._content = content  # type: ignore[union-attr]
 
+    @classmethod
+    def _finish_response(cls, response: "CurlResponse") -> "CurlResponse":
+        cls._save_etag(response)
+        request = response.request
+        # `-o` writes the body out as it arrives, like curl does
+        if request.output is not None:
+            response.save(request.output)
+        elif request.limit_rate and not request.no_buffer:
+            # The body is read at the `--limit-rate` pace, then kept as usual
+            cls._store_content(response, b"".join(response.iter_bytes()))
+        elif not request.stream:
+            response.finish_transfer()
         return response
 
-    def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
-        from ._curl import CurlResponse
-
-        requests_request, proxies = self._convert_request(curl_request=request)
-        response = self._send(request=requests_request, curl_request=request, proxies=proxies)
-        return CurlResponse(
-            status_code=response.status_code,
-            reason=response.reason,
-            raw_response=response,
-            request=request,
-        )
+    @classmethod
+    async def _afinish_response(cls, response: "CurlResponse") -> "CurlResponse":
+        cls._save_etag(response)
+        request = response.request
+        if request.output is not None:
+            await response.asave(request.output)
+        elif request.limit_rate and not request.no_buffer:
+            chunks = [chunk async for chunk in response.aiter_bytes()]
+            cls._store_content(response, b"".join(chunks))
+        elif not request.stream:
+            response.finish_transfer()
+        return response
+
+    def close(self) -> None:
+        """Release the pooled connections held by the engine"""
+
+    async def aclose(self) -> None:
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+
+def resolve_proxies(url: str) -> typing.Dict[str, str]:
+    """Proxies to use for `url`, looked up when the request is made
+
+    `config.HTTP_PROXY`/`config.HTTPS_PROXY` win when set, otherwise the
+    `http_proxy`, `https_proxy`, `all_proxy` and `no_proxy` environment
+    variables are read, so changing them affects the next call.
+    """
+    proxies: typing.Dict[str, str] = {}
+    if config.HTTP_PROXY:
+        proxies["http"] = config.HTTP_PROXY
+    if config.HTTPS_PROXY:
+        proxies["https"] = config.HTTPS_PROXY
+    if proxies or not any("proxy" in name.lower() for name in os.environ):
+        return proxies
+
+    from urllib.parse import urlsplit
+    from urllib.request import getproxies_environment
+    from urllib.request import proxy_bypass_environment
+
+    environment = getproxies_environment()
+    host = urlsplit(url).netloc.rpartition("@")[2]
+    if environment and proxy_bypass_environment(host, environment):
+        return proxies
+    for scheme in ("http", "https"):
+        proxy = environment.get(scheme) or environment.get("all")
+        if proxy:
+            proxies[scheme] = proxy
+    return proxies
+
+
+class _EngineName(str):
+    """Engine name that creates the engine when called
+
+    The members of `engines` used to hold the engine classes, so
+    `engines.requests.value()` keeps returning a new engine, imported on use.
+    """
+
+    def __call__(self, *args: typing.Any, **kwargs: typing.Any) -> Engine:
+        return load_engine(self)(*args, **kwargs)
 
 
 class engines(Enum):
-    requests: typing.Type[Engine] = requestsEngine
+    requests = _EngineName("requests")
+    httpx = _EngineName("httpx")
+    urllib3 = _EngineName("urllib3")
+    replay = _EngineName("replay")
+
+
+ENGINE_LITERALS = typing.Literal["requests", "httpx", "urllib3", "replay"]
+ENTRY_POINT_GROUP = "httpalchemy.engines"
+
+# Engine name -> "module:class", imported the first time the engine is used
+_registry: typing.Dict[str, typing.Union[str, typing.Type[Engine]]] = {
+    "requests": "httpalchemy._requests_engine:requestsEngine",
+    "httpx": "httpalchemy._httpx_engine:httpxEngine",
+    "urllib3": "httpalchemy._urllib3_engine:urllib3Engine",
+    "replay": "httpalchemy._replay:replayEngine",
+}
+_registry_lock = threading.Lock()
+_entry_points_loaded = False
+_shared_engines: typing.Dict[str, Engine] = {}
+_shared_engines_lock = threading.Lock()
+_cold_starts: typing.Dict[str, float] = {}
+
+
+def register_engine(name: str, engine: typing.Union[str, typing.Type[Engine]]) -> None:
+    """Make `engine` selectable as `engine=name`
+
+    `engine` is an `Engine` subclass or a `"module:class"` string that is
+    imported only when the engine is first used. Installed packages can do
+    the same through the `httpalchemy.engines` entry point group.
+    """
+    with _registry_lock:
+        _registry[name] = engine
+
+
+def _load_entry_points() -> None:
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    from importlib.metadata import entry_points
+
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python < 3.10 returns a dictionary of groups
+        found = entry_points().get(ENTRY_POINT_GROUP, ())  # type: ignore[attr-defined]
+    with _registry_lock:
+        for entry_point in found:
+            _registry.setdefault(entry_point.name, entry_point.value)
+        _entry_points_loaded = True
+
+
+def load_engine(name: str) -> typing.Type[Engine]:
+    """Import the engine class registered as `name`"""
+    engine = _registry.get(name)
+    if engine is None:
+        _load_entry_points()
+        engine = _registry.get(name)
+    if engine is None:
+        raise UnknownEngineError(
+            "Unknown engine '%s', available engines are: %s"
+            % (name, ", ".join(sorted(_registry)))
+        )
+    if isinstance(engine, str):
+        module_name, _, class_name = engine.partition(":")
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as exc:
+            raise UnknownEngineError(
+                "The '%s' engine can't be imported (%s), is its package installed?"
+                % (name, exc)
+            ) from exc
+        engine = typing.cast(typing.Type[Engine], getattr(module, class_name))
+        with _registry_lock:
+            _registry[name] = engine
+    return engine
+
+
+def get_engine(engine: typing.Union[Engine, engines, ENGINE_LITERAL]) -> Engine:
+    """Return `engine` itself or the process-wide shared instance of its kind
+
+    Shared instances live for the whole process so that every `curl()` call
+    reuses their warm connection pools. Backends are imported on first use.
+    """
+    if isinstance(engine, Engine):
+        return engine
+    name = engine.value if isinstance(engine, engines) else engine
+    instance = _shared_engines.get(name)
+    if instance is not None:
+        return instance
+    with _shared_engines_lock:
+        instance = _shared_engines.get(name)
+        if instance is None:
+            started = time.perf_counter()
+            instance = _shared_engines[name] = load_engine(name)()
+            _cold_starts.setdefault(name, time.perf_counter() - started)
+    return instance
+
+
+def shared_engines() -> typing.Dict[str, Engine]:
+    """The shared engine instances created so far, by name"""
+    return dict(_shared_engines)
+
+
+def cold_start_times() -> typing.Dict[str, float]:
+    """Seconds each shared engine took to import and create the first time"""
+    return dict(_cold_starts)
+
+
+def close_engines() -> None:
+    """Close every shared engine instance created by `get_engine`"""
+    with _shared_engines_lock:
+        instances = list(_shared_engines.values())
+        _shared_engines.clear()
+    for instance in instances:
+        instance.close()
+
 
+def __getattr__(name: str) -> typing.Any:
+    # The bundled engines used to live here, they are imported on access
+    if name in ("requestsEngine", "httpxEngine", "urllib3Engine"):
+        return load_engine(name[: -len("Engine")])
+    if name == "PooledHTTPAdapter":
+        from ._requests_engine import PooledHTTPAdapter
 
-ENGINE_LITERALS = typing.Literal["requests"]
+        return PooledHTTPAdapter
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -8,3 +8,31 @@ class RepeatedAliasesError(HttpAlchemy):
 
 class IncompatibleTypeError(HttpAlchemy):
     ...
+
+
+class UnsupportedOptionError(HttpAlchemy):
+    ...
+
+
+class InvalidOptionError(HttpAlchemy):
+    ...
+
+
+class UnknownEngineError(HttpAlchemy):
+    ...
+
+
+class HTTPStatusError(HttpAlchemy):
+    ...
+
+
+class DownloadError(HttpAlchemy):
+    ...
+
+
+class RecordNotFoundError(HttpAlchemy):
+    ...
+
+
+class OperationTimeoutError(HttpAlchemy):
+    ...
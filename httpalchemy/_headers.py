@@ -0,0 +1,109 @@
+import typing
+
+HEADER_ITEMS = typing.Union[
+    "Headers", typing.Mapping[str, str], typing.Iterable[typing.Tuple[str, str]]
+]
+
+
+class Headers(typing.Mapping[str, str]):
+    """Immutable, case-insensitive headers that keep repeated names
+
+    Looking a name up joins its values with `", "`, `get_list` and
+    `multi_items` return them one by one, the way curl sends them. Instances
+    never change, so they are shared between requests and threads as they
+    are; the `with_*` methods return new instances.
+    """
+
+    __slots__ = ("_items", "_index")
+
+    def __init__(self, headers: typing.Optional[HEADER_ITEMS] = None):
+        if isinstance(headers, Headers):
+            items = headers._items
+        elif headers is None:
+            items = ()
+        elif isinstance(headers, typing.Mapping):
+            items = tuple(headers.items())
+        else:
+            items = tuple(headers)
+        index: typing.Dict[str, typing.Tuple[str, typing.Tuple[str, ...]]] = {}
+        for name, value in items:
+            key = name.lower()
+            if key in index:
+                index[key] = (index[key][0], index[key][1] + (value,))
+            else:
+                index[key] = (name, (value,))
+        self._items: typing.Tuple[typing.Tuple[str, str], ...] = items
+        self._index = index
+
+    def __getitem__(self, name: str) -> str:
+        return ", ".join(self._index[name.lower()][1])
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and name.lower() in self._index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        for name, _ in self._index.values():
+            yield name
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_list(self, name: str) -> typing.List[str]:
+        entry = self._index.get(name.lower())
+        return list(entry[1]) if entry is not None else []
+
+    def multi_items(self) -> typing.Tuple[typing.Tuple[str, str], ...]:
+        """Every `(name, value)` pair in order, repeated names included"""
+        return self._items
+
+    def with_header(self, name: str, value: str) -> "Headers":
+        """Copy with `name` set to `value`, replacing every previous value"""
+        return self.with_headers({name: value})
+
+    def with_default(self, name: str, value: str) -> "Headers":
+        """Copy with `name` set to `value` unless it is already present"""
+        if name in self:
+            return self
+        return Headers(self._items + ((name, value),))
+
+    def with_headers(self, headers: HEADER_ITEMS) -> "Headers":
+        """Copy where the names in `headers` replace the ones present here"""
+        other = headers if isinstance(headers, Headers) else Headers(headers)
+        if not other:
+            return self
+        if not self:
+            return other
+        kept = tuple(
+            (name, value)
+            for name, value in self._items
+            if name.lower() not in other._index
+        )
+        return Headers(kept + other._items)
+
+    def without(self, name: str) -> "Headers":
+        if name not in self:
+            return self
+        key = name.lower()
+        return Headers(
+            tuple((item, value) for item, value in self._items if item.lower() != key)
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, typing.Mapping):
+            return NotImplemented
+        if not isinstance(other, Headers):
+            other = Headers(other)
+        return self._normalized() == other._normalized()
+
+    def __hash__(self) -> int:
+        return hash(frozenset(self._normalized().items()))
+
+    def _normalized(self) -> typing.Dict[str, str]:
+        # Repeated values compare equal to their comma-joined form
+        return {key: ", ".join(values) for key, (_, values) in self._index.items()}
+
+    def __repr__(self):
+        return "Headers(%r)" % (list(self._items),)
+
+
+EMPTY_HEADERS = Headers()
@@ -0,0 +1,412 @@
+import asyncio
+import socket
+import threading
+import typing
+import weakref
+
+import httpcore
+import httpx
+
+from ._compression import accept_encoding
+from ._dns import DEFAULT_RESOLVER
+from ._dns import Resolver
+from ._engines import HTTP_2
+from ._engines import HTTP_2_PRIOR_KNOWLEDGE
+from ._engines import Engine
+from ._engines import basic_auth_header
+from ._headers import EMPTY_HEADERS
+from ._headers import Headers
+from ._metrics import PoolGauges
+from ._timings import Timings
+from ._timings import current_timings
+from ._timings import recording
+from ._uploads import UploadBody
+from ._uploads import prepare_body
+from .config import DEFAULT_POOL_LIMITS
+from .config import DEFAULT_USER_AGENT
+from .config import PoolLimits
+
+if typing.TYPE_CHECKING:
+    from httpx import Request as HttpxRequest
+    from httpx import Response as HttpxResponse
+
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+
+class ResolvingBackend(httpcore.NetworkBackend):
+    """httpcore network backend connecting through a `Resolver`
+
+    Wraps the backend httpx created, so the DNS cache, `--resolve`,
+    `--connect-to` and `--unix-socket` apply to httpx connections as they
+    do to urllib3 ones.
+    """
+
+    def __init__(self, backend: httpcore.NetworkBackend, resolver: Resolver):
+        self.backend = backend
+        self.resolver = resolver
+
+    def connect_tcp(
+        self, host: str, port: int, **kwargs: typing.Any
+    ) -> httpcore.NetworkStream:
+        unix_socket = self.resolver.unix_socket
+        if unix_socket is not None:
+            return self.backend.connect_unix_socket(
+                unix_socket, timeout=kwargs.get("timeout")
+            )
+        host, port = self.resolver.route(host, port)
+        try:
+            addresses = self.resolver.getaddrinfo(host, port)
+        except socket.gaierror as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        timings = current_timings()
+        if timings is not None:
+            timings.mark("namelookup")
+        error: typing.Optional[Exception] = None
+        for *_, sockaddr in addresses:
+            try:
+                return self.backend.connect_tcp(sockaddr[0], port, **kwargs)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        raise typing.cast(Exception, error)
+
+    def connect_unix_socket(self, *args: typing.Any, **kwargs: typing.Any):
+        return self.backend.connect_unix_socket(*args, **kwargs)
+
+    def sleep(self, seconds: float) -> None:
+        self.backend.sleep(seconds)
+
+
+class AsyncResolvingBackend(httpcore.AsyncNetworkBackend):
+    """Asynchronous `ResolvingBackend`"""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, resolver: Resolver):
+        self.backend = backend
+        self.resolver = resolver
+
+    async def connect_tcp(
+        self, host: str, port: int, **kwargs: typing.Any
+    ) -> httpcore.AsyncNetworkStream:
+        unix_socket = self.resolver.unix_socket
+        if unix_socket is not None:
+            return await self.backend.connect_unix_socket(
+                unix_socket, timeout=kwargs.get("timeout")
+            )
+        host, port = self.resolver.route(host, port)
+        try:
+            addresses = await self.resolver.agetaddrinfo(host, port)
+        except socket.gaierror as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        timings = current_timings()
+        if timings is not None:
+            timings.mark("namelookup")
+        error: typing.Optional[Exception] = None
+        for *_, sockaddr in addresses:
+            try:
+                return await self.backend.connect_tcp(sockaddr[0], port, **kwargs)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        raise typing.cast(Exception, error)
+
+    async def connect_unix_socket(self, *args: typing.Any, **kwargs: typing.Any):
+        return await self.backend.connect_unix_socket(*args, **kwargs)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.backend.sleep(seconds)
+
+
+class httpxEngine(Engine):
+    """Engine backed by shared `httpx.Client` instances
+
+    One client is kept per HTTP version, proxy setup and `--resolve`/
+    `--connect-to` entries, so concurrent `--http2` requests to the same
+    origin are multiplexed over a single connection.
+    """
+
+    DEFAULT_HEADERS = Headers({"Accept": "*/*"})
+
+    def __init__(
+        self,
+        limits: typing.Optional[PoolLimits] = None,
+        max_concurrency: typing.Optional[int] = None,
+        proxies: typing.Optional[typing.Mapping[str, str]] = None,
+    ):
+        super().__init__(max_concurrency=max_concurrency, proxies=proxies)
+        self.limits = limits or DEFAULT_POOL_LIMITS
+        self._clients: typing.Dict[typing.Hashable, "httpx.Client"] = {}
+        # Async clients are bound to the event loop that created them
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _transport_options(
+        self, curl_request: "CurlRequest"
+    ) -> typing.Dict[str, typing.Any]:
+        http_version = curl_request.http_version
+        return {
+            "http1": http_version != HTTP_2_PRIOR_KNOWLEDGE,
+            "http2": http_version in (HTTP_2, HTTP_2_PRIOR_KNOWLEDGE),
+            "limits": httpx.Limits(
+                # httpx has no per-host cap, see `PoolLimits`
+                max_connections=None,
+                max_keepalive_connections=self.limits.max_idle_connections,
+                keepalive_expiry=self.limits.keepalive_expiry,
+            ),
+        }
+
+    def _create_client(
+        self,
+        curl_request: "CurlRequest",
+        proxies: typing.Dict[str, str],
+        asynchronous: bool = False,
+    ) -> typing.Union["httpx.Client", "httpx.AsyncClient"]:
+        if asynchronous:
+            client_class, transport_class = httpx.AsyncClient, httpx.AsyncHTTPTransport
+            backend_class: typing.Any = AsyncResolvingBackend
+        else:
+            client_class, transport_class = httpx.Client, httpx.HTTPTransport
+            backend_class = ResolvingBackend
+
+        options = self._transport_options(curl_request)
+        mounts = {
+            "%s://" % scheme: transport_class(proxy=httpx.Proxy(proxy), **options)
+            for scheme, proxy in proxies.items()
+        }
+        transport = transport_class(**options)
+        # httpx doesn't take a network backend, so the pool's one is wrapped.
+        # Connections through a proxy aren't rerouted, like in curl.
+        pool = transport._pool  # type: ignore[union-attr]
+        pool._network_backend = backend_class(
+            pool._network_backend, curl_request.resolver or DEFAULT_RESOLVER
+        )
+        client = client_class(
+            transport=transport,
+            mounts=mounts,
+            trust_env=False,
+        )
+        client.headers.clear()
+        return client
+
+    @staticmethod
+    def _client_key(
+        curl_request: "CurlRequest", proxies: typing.Dict[str, str]
+    ) -> typing.Hashable:
+        return (
+            curl_request.http_version,
+            tuple(sorted(proxies.items())),
+            curl_request.resolver,
+        )
+
+    def get_client(
+        self, curl_request: "CurlRequest", proxies: typing.Dict[str, str]
+    ) -> "httpx.Client":
+        key = self._client_key(curl_request, proxies)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self._create_client(
+                        curl_request, proxies
+                    )
+        return client
+
+    def get_async_client(
+        self, curl_request: "CurlRequest", proxies: typing.Dict[str, str]
+    ) -> "httpx.AsyncClient":
+        """Return the `httpx.AsyncClient` bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        key = self._client_key(curl_request, proxies)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = self._create_client(
+                    curl_request, proxies, asynchronous=True
+                )
+        return client
+
+    def pool_gauges(self) -> typing.Dict[str, PoolGauges]:
+        with self._lock:
+            clients: typing.List[typing.Any] = list(self._clients.values())
+            for loop_clients in list(self._async_clients.values()):
+                clients.extend(loop_clients.values())
+        gauges: typing.Dict[str, PoolGauges] = {}
+        for client in clients:
+            for transport in [client._transport, *client._mounts.values()]:
+                pool = getattr(transport, "_pool", None)
+                for connection in pool.connections if pool is not None else ():
+                    # Connections through a proxy are counted for the proxy
+                    origin = getattr(connection, "_origin", None) or getattr(
+                        connection, "_proxy_origin", None
+                    )
+                    if origin is None:
+                        continue
+                    key = "%s:%d" % (origin.host.decode("ascii"), origin.port)
+                    idle = connection.is_idle()
+                    in_use = not idle and not connection.is_closed()
+                    state = PoolGauges(idle=int(idle), in_use=int(in_use))
+                    gauges[key] = state + gauges.get(key, PoolGauges())
+        return gauges
+
+    def close(self) -> None:
+        """Close the clients, the async ones on the event loop they belong to
+
+        Async clients of a loop that is already closed can't be awaited
+        anymore and are dropped.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            async_clients = [
+                (loop, list(loop_clients.values()))
+                for loop, loop_clients in self._async_clients.items()
+            ]
+            self._async_clients.clear()
+        for client in clients:
+            client.close()
+        for loop, loop_clients in async_clients:
+            if loop.is_closed():
+                continue
+            for async_client in loop_clients:
+                asyncio.run_coroutine_threadsafe(async_client.aclose(), loop)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
+        self.close()
+
+    def _convert_request(
+        self, curl_request: "CurlRequest", asynchronous: bool = False
+    ) -> typing.Tuple["HttpxRequest", typing.Dict[str, str]]:
+        headers = httpx.Headers(
+            self.DEFAULT_HEADERS.with_headers(
+                curl_request.headers or EMPTY_HEADERS
+            ).multi_items()
+        )
+        data = prepare_body(curl_request, headers)
+        if curl_request.compressed:
+            headers.setdefault("Accept-Encoding", accept_encoding("httpx"))
+        headers["User-Agent"] = curl_request.user_agent or DEFAULT_USER_AGENT
+
+        content: typing.Any = data
+        if isinstance(data, UploadBody):
+            if hasattr(data, "__len__"):
+                headers["Content-Length"] = str(len(data))
+            if asynchronous:
+                content = data.__aiter__()
+
+        proxies = self.get_proxies(curl_request.url)
+
+        if curl_request.auth is not None:
+            headers.setdefault("Authorization", basic_auth_header(curl_request.auth))
+
+        req = httpx.Request(
+            method=curl_request.method or "GET",
+            url=curl_request.url,
+            content=content,
+            headers=headers,
+        )
+        return req, proxies
+
+    def _send(
+        self,
+        request: "HttpxRequest",
+        curl_request: "CurlRequest",
+        proxies: typing.Dict[str, str],
+    ) -> "HttpxResponse":
+        client = self.get_client(curl_request, proxies)
+        return client.send(
+            request,
+            follow_redirects=curl_request.follow_redirects,
+            stream=curl_request.stream,
+        )
+
+    async def _asend(
+        self,
+        request: "HttpxRequest",
+        curl_request: "CurlRequest",
+        proxies: typing.Dict[str, str],
+    ) -> "HttpxResponse":
+        client = self.get_async_client(curl_request, proxies)
+        return await client.send(
+            request,
+            follow_redirects=curl_request.follow_redirects,
+            stream=curl_request.stream,
+        )
+
+    def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        from ._curl import CurlResponse
+
+        timings = Timings()
+        with recording(timings):
+            httpx_request, proxies = self._convert_request(curl_request=request)
+            httpx_request.extensions["trace"] = timings.trace
+            response = self._send(
+                request=httpx_request, curl_request=request, proxies=proxies
+            )
+        return self._finish_response(
+            CurlResponse(
+                status_code=response.status_code,
+                reason=response.reason_phrase,
+                raw_response=response,
+                request=request,
+                stream=response.iter_bytes,
+                close=response.close,
+                timings=timings,
+            )
+        )
+
+    async def _ahandle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        from ._curl import CurlResponse
+
+        timings = Timings()
+        with recording(timings):
+            httpx_request, proxies = self._convert_request(
+                curl_request=request, asynchronous=True
+            )
+            httpx_request.extensions["trace"] = timings.atrace
+            response = await self._asend(
+                request=httpx_request, curl_request=request, proxies=proxies
+            )
+        return await self._afinish_response(
+            CurlResponse(
+                status_code=response.status_code,
+                reason=response.reason_phrase,
+                raw_response=response,
+                request=request,
+                astream=response.aiter_bytes,
+                aclose=response.aclose,
+                timings=timings,
+            )
+        )
+
+    def build_response(
+        self,
+        curl_request: "CurlRequest",
+        *,
+        status_code: int,
+        reason: str,
+        headers: typing.List[typing.Tuple[str, str]],
+        content: bytes,
+    ) -> "CurlResponse":
+        from ._curl import CurlResponse
+
+        response = httpx.Response(
+            status_code,
+            headers=headers,
+            content=content,
+            request=httpx.Request(curl_request.method or "GET", curl_request.url),
+        )
+        return CurlResponse(
+            status_code=status_code,
+            reason=reason,
+            raw_response=response,
+            request=curl_request,
+            stream=response.iter_bytes,
+            close=response.close,
+            astream=response.aiter_bytes,
+            aclose=response.aclose,
+        )
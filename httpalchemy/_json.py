@@ -0,0 +1,115 @@
+import typing
+
+from . import config
+from ._exceptions import InvalidOptionError
+
+
+class JSONCodec:
+    """How JSON bodies are encoded and decoded
+
+    `loads` takes `bytes` or `str`, `dumps` returns `bytes`.
+    """
+
+    __slots__ = ("name", "loads", "dumps")
+
+    def __init__(
+        self,
+        name: str,
+        loads: typing.Callable[[typing.Union[bytes, str]], typing.Any],
+        dumps: typing.Callable[[typing.Any], bytes],
+    ):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return "<JSONCodec [%s]>" % self.name
+
+
+def _orjson() -> JSONCodec:
+    import orjson
+
+    return JSONCodec("orjson", orjson.loads, orjson.dumps)
+
+
+def _ujson() -> JSONCodec:
+    import ujson
+
+    return JSONCodec("ujson", ujson.loads, lambda value: ujson.dumps(value).encode())
+
+
+def _stdlib() -> JSONCodec:
+    import json
+
+    def dumps(value: typing.Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    return JSONCodec("json", json.loads, dumps)
+
+
+# Fastest first: the first one that imports is used unless `config.JSON_CODEC` says
+CODECS: typing.Dict[str, typing.Callable[[], JSONCodec]] = {
+    "orjson": _orjson,
+    "ujson": _ujson,
+    "json": _stdlib,
+}
+
+_codec: typing.Optional[JSONCodec] = None
+
+
+def load_json_codec(name: typing.Optional[str] = None) -> JSONCodec:
+    """The codec called `name`, or the fastest one installed for `None`"""
+    if name is not None:
+        if name not in CODECS:
+            raise InvalidOptionError(
+                "Unknown JSON codec '%s', pick one of %s" % (name, ", ".join(CODECS))
+            )
+        return CODECS[name]()
+    for load in CODECS.values():
+        try:
+            return load()
+        except ImportError:
+            continue
+    return _stdlib()
+
+
+def get_json_codec() -> JSONCodec:
+    global _codec
+    if _codec is None:
+        _codec = load_json_codec(config.JSON_CODEC)
+    return _codec
+
+
+def set_json_codec(codec: typing.Union[str, JSONCodec, None]) -> None:
+    """Encode and decode JSON bodies with `codec`
+
+    `codec` is the name of a codec (`"orjson"`, `"ujson"` or `"json"`), a
+    `JSONCodec` wrapping other functions, or `None` to go back to the
+    fastest one installed.
+    """
+    global _codec
+    _codec = codec if isinstance(codec, JSONCodec) else load_json_codec(codec)
+
+
+def split_lines(buffer: bytearray, chunk: bytes) -> typing.List[bytes]:
+    """Add `chunk` to `buffer` and take out the lines it completes"""
+    start = len(buffer)
+    buffer += chunk
+    end = buffer.rfind(b"\n", start)
+    if end < 0:
+        return []
+    lines = bytes(buffer[:end]).split(b"\n")
+    del buffer[: end + 1]
+    return lines
+
+
+def iter_json_lines(chunks: typing.Iterable[bytes]) -> typing.Iterator[typing.Any]:
+    """Decode newline-delimited JSON values as their lines arrive in `chunks`"""
+    loads = get_json_codec().loads
+    buffer = bytearray()
+    for chunk in chunks:
+        for line in split_lines(buffer, chunk):
+            if line.strip():
+                yield loads(line)
+    if buffer.strip():
+        yield loads(bytes(buffer))
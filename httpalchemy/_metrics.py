@@ -0,0 +1,353 @@
+import bisect
+import threading
+import time
+import typing
+from urllib.parse import urlsplit
+
+from . import config
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+    from ._engines import Engine
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+START_HOOK = typing.Callable[["CurlRequest"], typing.Any]
+END_HOOK = typing.Callable[
+    ["CurlRequest", typing.Optional["CurlResponse"], typing.Optional[BaseException]],
+    typing.Any,
+]
+
+
+def host_key(url: str) -> str:
+    """`host:port` of `url`, the key metrics and pool gauges are kept under"""
+    parts = urlsplit(url)
+    port = parts.port or DEFAULT_PORTS.get(parts.scheme, 0)
+    return "%s:%d" % ((parts.hostname or "").lower(), port)
+
+
+class PoolGauges:
+    """Connections of an engine to one host, by state"""
+
+    __slots__ = ("idle", "in_use")
+
+    def __init__(self, idle: int = 0, in_use: int = 0):
+        self.idle = idle
+        self.in_use = in_use
+
+    @property
+    def open(self) -> int:
+        return self.idle + self.in_use
+
+    def __add__(self, other: "PoolGauges") -> "PoolGauges":
+        return PoolGauges(self.idle + other.idle, self.in_use + other.in_use)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PoolGauges):
+            return NotImplemented
+        return (self.idle, self.in_use) == (other.idle, other.in_use)
+
+    def __repr__(self):
+        return "<PoolGauges [idle=%d in_use=%d]>" % (self.idle, self.in_use)
+
+
+class Histogram:
+    """Counts of observed values below each of `bounds`, like Prometheus'"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: typing.Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * len(self.bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> typing.List[typing.Tuple[float, int]]:
+        """`(bound, count of values <= bound)` pairs, ending with `+Inf`"""
+        pairs = []
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            pairs.append((bound, total))
+        pairs.append((float("inf"), self.count))
+        return pairs
+
+
+class HostMetrics:
+    """Counters of the requests sent to one host, retries included"""
+
+    __slots__ = (
+        "requests",
+        "in_flight",
+        "responses",
+        "errors",
+        "bytes_sent",
+        "bytes_received",
+        "new_connections",
+        "reused_connections",
+        "latency",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        # By status class ("2xx") and by exception type name
+        self.responses: typing.Dict[str, int] = {}
+        self.errors: typing.Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.latency = Histogram(config.METRICS_LATENCY_BUCKETS)
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "responses": dict(self.responses),
+            "errors": dict(self.errors),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "latency": {
+                "buckets": self.latency.cumulative(),
+                "sum": self.latency.sum,
+                "count": self.latency.count,
+            },
+        }
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Per-host request metrics and request hooks around every engine call
+
+    Nothing is recorded until `enable()` is called or a hook is added, and
+    until then the only cost per request is checking `active`. Latency is
+    the time `Engine.handle_curl` takes: up to the end of the body for
+    buffered responses, up to the headers for streamed ones. The end hooks
+    and byte counts wait for the end of the body.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.active = False
+        self._hosts: typing.Dict[str, HostMetrics] = {}
+        self._start_hooks: typing.List[START_HOOK] = []
+        self._end_hooks: typing.List[END_HOOK] = []
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._update()
+
+    def disable(self) -> None:
+        self.enabled = False
+        self._update()
+
+    def add_hook(
+        self,
+        on_start: typing.Optional[START_HOOK] = None,
+        on_end: typing.Optional[END_HOOK] = None,
+    ) -> None:
+        """Call `on_start(request)` before each request is sent and
+        `on_end(request, response, error)` once it is over
+        """
+        with self._lock:
+            if on_start is not None:
+                self._start_hooks.append(on_start)
+            if on_end is not None:
+                self._end_hooks.append(on_end)
+        self._update()
+
+    def remove_hook(self, hook: typing.Callable) -> None:
+        with self._lock:
+            for hooks in (self._start_hooks, self._end_hooks):
+                while hook in hooks:
+                    hooks.remove(hook)  # type: ignore[arg-type]
+        self._update()
+
+    def _update(self) -> None:
+        self.active = self.enabled or bool(self._start_hooks or self._end_hooks)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+    def _host(self, url: str) -> HostMetrics:
+        key = host_key(url)
+        host = self._hosts.get(key)
+        if host is None:
+            with self._lock:
+                host = self._hosts.setdefault(key, HostMetrics())
+        return host
+
+    def request_started(self, curl_request: "CurlRequest") -> float:
+        if self.enabled:
+            host = self._host(curl_request.url)
+            with self._lock:
+                host.requests += 1
+                host.in_flight += 1
+        try:
+            # Hooks may be added or removed by other threads meanwhile
+            for hook in tuple(self._start_hooks):
+                hook(curl_request)
+        except BaseException as exc:
+            # The request isn't sent, it ends here for `in_flight` and hooks
+            self.request_failed(curl_request, exc, time.monotonic())
+            raise
+        return time.monotonic()
+
+    def request_failed(
+        self, curl_request: "CurlRequest", error: BaseException, started: float
+    ) -> None:
+        if self.enabled:
+            host = self._host(curl_request.url)
+            name = type(error).__name__
+            with self._lock:
+                host.in_flight -= 1
+                host.errors[name] = host.errors.get(name, 0) + 1
+                host.latency.observe(time.monotonic() - started)
+        for hook in tuple(self._end_hooks):
+            hook(curl_request, None, error)
+
+    def response_received(self, response: "CurlResponse", started: float) -> None:
+        if self.enabled:
+            timings = response.timings
+            host = self._host(response.request.url)
+            status = "%dxx" % (response.status_code // 100)
+            with self._lock:
+                host.responses[status] = host.responses.get(status, 0) + 1
+                host.latency.observe(time.monotonic() - started)
+                host.bytes_sent += timings.size_upload
+                if timings.num_connects:
+                    host.new_connections += timings.num_connects
+                else:
+                    host.reused_connections += 1
+        if response.timings.time_total:
+            self.transfer_finished(response)
+        else:
+            response.on_finish = self.transfer_finished
+
+    def transfer_finished(self, response: "CurlResponse") -> None:
+        if self.enabled:
+            host = self._host(response.request.url)
+            with self._lock:
+                host.in_flight -= 1
+                host.bytes_received += response.timings.size_download
+        for hook in tuple(self._end_hooks):
+            hook(response.request, response, None)
+
+    def snapshot(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """Metrics of each `host:port` as plain values, e.g. for OpenTelemetry
+        observable instruments
+        """
+        with self._lock:
+            return {key: host.as_dict() for key, host in self._hosts.items()}
+
+    def pool_gauges(
+        self, engines: typing.Optional[typing.Mapping[str, "Engine"]] = None
+    ) -> typing.Dict[typing.Tuple[str, str], PoolGauges]:
+        """Connections of `engines` (the shared ones by default) per
+        `(engine, host:port)`
+        """
+        if engines is None:
+            from ._engines import shared_engines
+
+            engines = shared_engines()
+        gauges = {}
+        for name, engine in engines.items():
+            for key, pool in engine.pool_gauges().items():
+                gauges[name, key] = pool
+        return gauges
+
+    def cold_starts(self) -> typing.Dict[str, float]:
+        """Seconds each shared engine took to import and create, by name"""
+        from ._engines import cold_start_times
+
+        return cold_start_times()
+
+    def render_prometheus(
+        self, engines: typing.Optional[typing.Mapping[str, "Engine"]] = None
+    ) -> str:
+        """Every metric, pool gauge and engine cold start in the Prometheus
+        text format
+        """
+        lines: typing.List[str] = []
+
+        def family(name: str, kind: str, help: str) -> None:
+            lines.append("# HELP httpalchemy_%s %s" % (name, help))
+            lines.append("# TYPE httpalchemy_%s %s" % (name, kind))
+
+        def sample(name: str, labels: typing.Dict[str, str], value: float) -> None:
+            rendered = ",".join('%s="%s"' % (k, _label(v)) for k, v in labels.items())
+            lines.append("httpalchemy_%s{%s} %s" % (name, rendered, _number(value)))
+
+        hosts = sorted(self.snapshot().items())
+        counters = (
+            ("requests_total", "requests", "Requests sent, retries included"),
+            ("requests_in_flight", "in_flight", "Requests without a complete response"),
+            ("sent_bytes_total", "bytes_sent", "Request body bytes sent"),
+            ("received_bytes_total", "bytes_received", "Response body bytes received"),
+        )
+        for name, field, help in counters:
+            family(name, "gauge" if field == "in_flight" else "counter", help)
+            for host, values in hosts:
+                sample(name, {"host": host}, values[field])
+
+        family("responses_total", "counter", "Responses received by status class")
+        for host, values in hosts:
+            for status, count in sorted(values["responses"].items()):
+                sample("responses_total", {"host": host, "status": status}, count)
+
+        family("errors_total", "counter", "Requests that failed, by exception type")
+        for host, values in hosts:
+            for error, count in sorted(values["errors"].items()):
+                sample("errors_total", {"host": host, "error": error}, count)
+
+        family("connections_total", "counter", "Connections opened or reused")
+        for host, values in hosts:
+            for kind in ("new", "reused"):
+                labels = {"host": host, "kind": kind}
+                sample("connections_total", labels, values[kind + "_connections"])
+
+        family("request_duration_seconds", "histogram", "Time to get a response")
+        for host, values in hosts:
+            latency = values["latency"]
+            for bound, count in latency["buckets"]:
+                labels = {"host": host, "le": _number(float(bound))}
+                sample("request_duration_seconds_bucket", labels, count)
+            sample("request_duration_seconds_sum", {"host": host}, latency["sum"])
+            sample("request_duration_seconds_count", {"host": host}, latency["count"])
+
+        pools = sorted(self.pool_gauges(engines).items())
+        for state in ("open", "idle", "in_use"):
+            name = "pool_%s_connections" % state
+            family(name, "gauge", "Pooled connections %s" % state.replace("_", " "))
+            for (engine, host), gauges in pools:
+                sample(name, {"engine": engine, "host": host}, getattr(gauges, state))
+
+        name = "engine_cold_start_seconds"
+        family(name, "gauge", "Time to import and create a shared engine")
+        for engine, seconds in sorted(self.cold_starts().items()):
+            sample(name, {"engine": engine}, seconds)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,175 @@
+import re
+import threading
+import time
+import typing
+from urllib.parse import urlsplit
+
+from ._exceptions import InvalidOptionError
+
+# curl's `--limit-rate` suffixes, in bytes
+RATE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+RATE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)b?\s*$", re.IGNORECASE)
+ANY_HOST = "*"
+# Small enough for `--limit-rate` to pace transfers smoothly
+THROTTLED_CHUNK_SIZE = 16 * 1024
+
+
+def parse_rate(value: typing.Union[str, int, float]) -> typing.Optional[float]:
+    """Bytes per second for a `--limit-rate` value such as `"100K"`
+
+    Returns `None` for 0, which curl takes as "no limit".
+    """
+    if isinstance(value, (int, float)):
+        rate = float(value)
+    else:
+        match = RATE.match(value)
+        if match is None:
+            raise InvalidOptionError("Invalid --limit-rate value '%s'" % value)
+        rate = float(match.group(1)) * RATE_UNITS[match.group(2).lower()]
+    return rate or None
+
+
+def throttled_chunk_size(rate: float, chunk_size: int = THROTTLED_CHUNK_SIZE) -> int:
+    """Chunk size for a transfer paced at `rate`, so no wait exceeds a second"""
+    return max(1, min(chunk_size, THROTTLED_CHUNK_SIZE, int(rate)))
+
+
+class Throttle:
+    """Pace a single transfer at `rate` bytes per second on average"""
+
+    __slots__ = ("rate", "started", "transferred")
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.transferred = 0
+
+    def delay(self, size: int) -> float:
+        """Seconds to wait after `size` more bytes went through"""
+        self.transferred += size
+        ahead = self.transferred / self.rate - (time.monotonic() - self.started)
+        return max(0.0, ahead)
+
+    def wait(self, size: int) -> None:
+        delay = self.delay(size)
+        if delay:
+            time.sleep(delay)
+
+    async def await_(self, size: int) -> None:
+        import asyncio
+
+        delay = self.delay(size)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average and bursts of `burst`
+
+    Callers reserve a token and wait until it is theirs, so concurrent
+    callers are served in the order they asked and never exceed the rate.
+    """
+
+    __slots__ = ("rate", "burst", "_tokens", "_updated", "_lock")
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Rate limits need a positive rate and a burst of 1+")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def __repr__(self):
+        return "<TokenBucket [rate=%s/s burst=%d]>" % (self.rate, self.burst)
+
+
+class HostRateLimiter:
+    """Request rate limits per host, shared by every thread and event loop
+
+    A limit set for `"*"` applies to every host without a limit of its own,
+    each host getting a bucket of its own.
+    """
+
+    def __init__(self):
+        self._limits: typing.Dict[str, typing.Tuple[float, int]] = {}
+        self._buckets: typing.Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def set_limit(
+        self, host: str, rate: typing.Optional[float], burst: int = 1
+    ) -> None:
+        host = host.lower()
+        with self._lock:
+            if rate is None:
+                self._limits.pop(host, None)
+            else:
+                TokenBucket(rate, burst)  # validates the limit
+                self._limits[host] = (rate, burst)
+            # Other hosts keep their buckets, and the tokens they've used
+            if host == ANY_HOST:
+                for name in list(self._buckets):
+                    if name not in self._limits:
+                        del self._buckets[name]
+            else:
+                self._buckets.pop(host, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._limits.clear()
+            self._buckets.clear()
+
+    def _bucket(self, url: str) -> typing.Optional[TokenBucket]:
+        if not self._limits:
+            return None
+        host = (urlsplit(url).hostname or "").lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                limit = self._limits.get(host) or self._limits.get(ANY_HOST)
+                if limit is None:
+                    return None
+                bucket = self._buckets.setdefault(host, TokenBucket(*limit))
+        return bucket
+
+    def acquire(self, url: str) -> None:
+        """Block until a request to `url` fits in its host's rate limit"""
+        bucket = self._bucket(url)
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay:
+                time.sleep(delay)
+
+    async def aacquire(self, url: str) -> None:
+        import asyncio
+
+        bucket = self._bucket(url)
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+
+
+rate_limiter = HostRateLimiter()
+
+
+def set_rate_limit(host: str, rate: typing.Optional[float], burst: int = 1) -> None:
+    """Send at most `rate` requests per second to `host`, in bursts of `burst`
+
+    The limit covers every request of the process, whatever engine, thread
+    or event loop sends it, retries and hedged duplicates included. `"*"`
+    sets a limit for each host that has none; `rate=None` removes a limit.
+    """
+    rate_limiter.set_limit(host, rate, burst)
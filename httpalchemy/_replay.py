@@ -0,0 +1,656 @@
+import base64
+import bisect
+import collections
+import functools
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import typing
+
+from . import config
+from .__version__ import __version__
+from ._engines import ENGINE_LITERAL
+from ._engines import Engine
+from ._engines import engines
+from ._engines import get_engine
+from ._exceptions import InvalidOptionError
+from ._exceptions import RecordNotFoundError
+from ._headers import EMPTY_HEADERS
+from ._timings import Timings
+from ._uploads import UPLOAD_CHUNK_SIZE
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+RECORDS_FILE = "records.bin"
+INDEX_FILE = "index.bin"
+RECORDS_MAGIC = b"HARECV01"
+INDEX_MAGIC = b"HAIDXV01"
+# Sizes of the record's metadata, request body and response body
+RECORD_HEADER = struct.Struct("!III")
+# Request key and offset of the record
+INDEX_ENTRY = struct.Struct("!16sQ")
+KEY_SIZE = 16
+LATENCY = typing.Union[None, float, str, typing.Callable[["Record"], float]]
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+@functools.lru_cache(maxsize=64)
+def _file_digest(path: str, size: int, mtime: int) -> bytes:
+    """sha256 of the file at `path`, `size` and `mtime` tell its versions apart"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def request_body(curl_request: "CurlRequest") -> bytes:
+    """The body `curl_request` sends, as far as matching requests goes"""
+    if curl_request.upload_file is not None:
+        return _read_file(curl_request.upload_file)
+    for data in (curl_request.data_binary, curl_request.data):
+        if isinstance(data, bytes):
+            return data
+        if data is not None:
+            return _read_file(data[1:]) if data.startswith("@") else data.encode()
+    if curl_request.form:
+        return repr(curl_request.form).encode()
+    return b""
+
+
+def request_body_digest(curl_request: "CurlRequest") -> bytes:
+    """sha256 of `request_body(curl_request)`, without reading `-T` files
+    again until they change
+    """
+    path = curl_request.upload_file
+    if path is None:
+        return hashlib.sha256(request_body(curl_request)).digest()
+    stat = os.stat(path)
+    return _file_digest(path, stat.st_size, stat.st_mtime_ns)
+
+
+class Record:
+    """A request and the response it got, as the store keeps them"""
+
+    __slots__ = (
+        "method",
+        "url",
+        "request_headers",
+        "request_body",
+        "status_code",
+        "reason",
+        "headers",
+        "content",
+        "elapsed",
+        "started_at",
+    )
+
+    def __init__(
+        self,
+        *,
+        method: str,
+        url: str,
+        request_headers: typing.List[typing.Tuple[str, str]],
+        request_body: bytes,
+        status_code: int,
+        reason: str,
+        headers: typing.List[typing.Tuple[str, str]],
+        content: bytes,
+        elapsed: float,
+        started_at: float,
+    ):
+        self.method = method
+        self.url = url
+        self.request_headers = request_headers
+        self.request_body = request_body
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+        self.started_at = started_at
+
+    @classmethod
+    def from_exchange(
+        cls, curl_request: "CurlRequest", response: "CurlResponse"
+    ) -> "Record":
+        elapsed = response.timings.time_total
+        return cls(
+            method=curl_request.method or "GET",
+            url=curl_request.url,
+            request_headers=list((curl_request.headers or EMPTY_HEADERS).multi_items()),
+            request_body=request_body(curl_request),
+            status_code=response.status_code,
+            reason=response.reason,
+            headers=list(response.headers.items()),
+            content=response.content,
+            elapsed=elapsed,
+            started_at=time.time() - elapsed,
+        )
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps(
+            {
+                "method": self.method,
+                "url": self.url,
+                "request_headers": self.request_headers,
+                "status_code": self.status_code,
+                "reason": self.reason,
+                "headers": self.headers,
+                "elapsed": self.elapsed,
+                "started_at": self.started_at,
+            }
+        ).encode()
+        return (
+            RECORD_HEADER.pack(len(meta), len(self.request_body), len(self.content))
+            + meta
+            + self.request_body
+            + self.content
+        )
+
+    @classmethod
+    def from_buffer(
+        cls, buffer: typing.Any, offset: int
+    ) -> typing.Tuple["Record", int]:
+        """The record at `offset` of `buffer` and the offset of the next one"""
+        meta_size, body_size, content_size = RECORD_HEADER.unpack_from(buffer, offset)
+        start = offset + RECORD_HEADER.size
+        body_start = start + meta_size
+        content_start = body_start + body_size
+        end = content_start + content_size
+        meta = json.loads(buffer[start:body_start])
+        record = cls(
+            method=meta["method"],
+            url=meta["url"],
+            request_headers=[tuple(header) for header in meta["request_headers"]],
+            request_body=buffer[body_start:content_start],
+            status_code=meta["status_code"],
+            reason=meta["reason"],
+            headers=[tuple(header) for header in meta["headers"]],
+            content=buffer[content_start:end],
+            elapsed=meta["elapsed"],
+            started_at=meta["started_at"],
+        )
+        return record, end
+
+    def __repr__(self):
+        return "<Record [%s %s %d]>" % (self.method, self.url, self.status_code)
+
+
+class _Keys:
+    """The keys of a memory-mapped index, as a sequence for `bisect`"""
+
+    __slots__ = ("index", "start", "size")
+
+    def __init__(self, index: mmap.mmap, start: int):
+        self.index = index
+        self.start = start
+        self.size = (len(index) - start) // INDEX_ENTRY.size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, position: int) -> bytes:
+        offset = self.start + position * INDEX_ENTRY.size
+        return self.index[offset : offset + KEY_SIZE]
+
+    def offset(self, position: int) -> int:
+        return INDEX_ENTRY.unpack_from(
+            self.index, self.start + position * INDEX_ENTRY.size
+        )[1]
+
+
+def _map(path: str) -> typing.Optional[mmap.mmap]:
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+
+class ReplayStore:
+    """Recorded exchanges in a directory, indexed for memory-mapped lookups
+
+    `records.bin` holds the records one after the other and `index.bin` the
+    sorted keys of their requests, so finding a response is a binary search
+    in a mapped file. Requests match on their method, URL, body and headers,
+    or only the headers named in `match_headers`; an index built for other
+    `match_headers` is rebuilt on opening. Records are served once `flush()`
+    has indexed them, and a request recorded several times gets its
+    responses in turn. The last `config.REPLAY_DECODED_CACHE_SIZE` records
+    served are kept decoded.
+    """
+
+    def __init__(
+        self, path: str, match_headers: typing.Optional[typing.Iterable[str]] = None
+    ):
+        self.path = path
+        self.match_headers = (
+            None
+            if match_headers is None
+            else sorted({name.lower() for name in match_headers})
+        )
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer: typing.Optional[typing.BinaryIO] = None
+        self._pending: typing.List[typing.Tuple[bytes, int]] = []
+        self._records: typing.Optional[mmap.mmap] = None
+        self._keys: typing.Optional[_Keys] = None
+        self._decoded: "collections.OrderedDict[int, Record]" = (
+            collections.OrderedDict()
+        )
+        self._turns: typing.Dict[bytes, typing.Iterator[int]] = {}
+        self._open()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _settings(self) -> bytes:
+        return json.dumps({"match_headers": self.match_headers}).encode()
+
+    def _open(self) -> None:
+        self._records = _map(self._file(RECORDS_FILE))
+        self._decoded.clear()
+        self._keys = None
+        index = _map(self._file(INDEX_FILE))
+        if index is not None and index[: len(INDEX_MAGIC)] == INDEX_MAGIC:
+            (settings_size,) = struct.unpack_from("!I", index, len(INDEX_MAGIC))
+            start = len(INDEX_MAGIC) + 4
+            if index[start : start + settings_size] == self._settings():
+                keys = _Keys(index, start + settings_size)
+                # Records appended without a `flush()`, e.g. before a crash,
+                # aren't in the index yet
+                if self._indexed_end(keys) == self._records_size():
+                    self._keys = keys
+                    return
+        if self._records is not None:
+            self.rebuild_index()
+
+    def _records_size(self) -> int:
+        records = self._records
+        return len(records) if records is not None else len(RECORDS_MAGIC)
+
+    def _indexed_end(self, keys: _Keys) -> int:
+        """Where the last record of the index ends in `records.bin`"""
+        if not len(keys):
+            return len(RECORDS_MAGIC)
+        last = max(keys.offset(position) for position in range(len(keys)))
+        if last + RECORD_HEADER.size > self._records_size():
+            return -1
+        sizes = RECORD_HEADER.unpack_from(typing.cast(mmap.mmap, self._records), last)
+        return last + RECORD_HEADER.size + sum(sizes)
+
+    def key(
+        self,
+        method: str,
+        url: str,
+        headers: typing.Iterable[typing.Tuple[str, str]],
+        body_digest: bytes,
+    ) -> bytes:
+        """Index key of a request, `body_digest` is the sha256 of its body"""
+        digest = hashlib.blake2b(digest_size=KEY_SIZE)
+        digest.update(("%s %s\n" % (method, url)).encode())
+        for name, value in sorted((name.lower(), value) for name, value in headers):
+            if self.match_headers is None or name in self.match_headers:
+                digest.update(("%s: %s\n" % (name, value)).encode())
+        digest.update(body_digest)
+        return digest.digest()
+
+    def _record_key(self, record: Record) -> bytes:
+        return self.key(
+            record.method,
+            record.url,
+            record.request_headers,
+            hashlib.sha256(record.request_body).digest(),
+        )
+
+    def append(self, record: Record) -> None:
+        data = record.to_bytes()
+        key = self._record_key(record)
+        with self._lock:
+            if self._writer is None:
+                self._writer = open(self._file(RECORDS_FILE), "ab")
+                if self._writer.tell() == 0:
+                    self._writer.write(RECORDS_MAGIC)
+            offset = self._writer.tell()
+            self._writer.write(data)
+            self._pending.append((key, offset))
+
+    def __iter__(self) -> typing.Iterator[Record]:
+        """Every indexed record, in the order they were recorded"""
+        records = self._records
+        if records is None:
+            return
+        offset = len(RECORDS_MAGIC)
+        while offset < len(records):
+            record, offset = Record.from_buffer(records, offset)
+            yield record
+
+    def _entries(self) -> typing.List[typing.Tuple[bytes, int]]:
+        keys = self._keys
+        if keys is None:
+            return []
+        return [
+            (keys[position], keys.offset(position)) for position in range(len(keys))
+        ]
+
+    def _write_index(self, entries: typing.List[typing.Tuple[bytes, int]]) -> None:
+        entries.sort()
+        settings = self._settings()
+        path = self._file(INDEX_FILE)
+        temporary_path = "%s.%d.tmp" % (path, threading.get_ident())
+        with open(temporary_path, "wb") as file:
+            file.write(INDEX_MAGIC + struct.pack("!I", len(settings)) + settings)
+            for key, offset in entries:
+                file.write(INDEX_ENTRY.pack(key, offset))
+        os.replace(temporary_path, path)
+
+    def flush(self) -> None:
+        """Write out and index the records appended so far"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+            if not self._pending:
+                return
+            self._write_index(self._entries() + self._pending)
+            self._pending = []
+            # Readers still holding the previous maps keep them until they're done
+            self._open()
+
+    def rebuild_index(self) -> None:
+        """Index every record of `records.bin` again, e.g. for new `match_headers`"""
+        self._keys = None
+        entries = []
+        records = self._records
+        offset = len(RECORDS_MAGIC)
+        while records is not None and offset < len(records):
+            record, end = Record.from_buffer(records, offset)
+            entries.append((self._record_key(record), offset))
+            offset = end
+        self._write_index(entries)
+        index = _map(self._file(INDEX_FILE))
+        if index is not None:
+            self._keys = _Keys(index, len(INDEX_MAGIC) + 4 + len(self._settings()))
+
+    def lookup(self, curl_request: "CurlRequest") -> typing.Optional[Record]:
+        """The recorded response to `curl_request`, if there is one"""
+        keys, records = self._keys, self._records
+        if keys is None or records is None:
+            return None
+        key = self.key(
+            curl_request.method or "GET",
+            curl_request.url,
+            (curl_request.headers or EMPTY_HEADERS).multi_items(),
+            request_body_digest(curl_request),
+        )
+        first = bisect.bisect_left(keys, key)  # type: ignore[call-overload]
+        last = bisect.bisect_right(keys, key, lo=first)  # type: ignore[call-overload]
+        if first == last:
+            return None
+        turns = self._turns.get(key)
+        if turns is None:
+            turns = self._turns.setdefault(key, itertools.count())
+        offset = keys.offset(first + next(turns) % (last - first))
+        with self._lock:
+            record = self._decoded.get(offset)
+            if record is not None:
+                self._decoded.move_to_end(offset)
+                return record
+        record = Record.from_buffer(records, offset)[0]
+        with self._lock:
+            self._decoded[offset] = record
+            while len(self._decoded) > config.REPLAY_DECODED_CACHE_SIZE:
+                self._decoded.popitem(last=False)
+        return record
+
+    def export_har(self, path: str) -> None:
+        """Write every record to `path` as an HTTP Archive (HAR 1.2)"""
+        self.flush()
+        entries = [_har_entry(record) for record in self]
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    "log": {
+                        "version": "1.2",
+                        "creator": {"name": "httpalchemy", "version": __version__},
+                        "entries": entries,
+                    }
+                },
+                file,
+            )
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def __len__(self) -> int:
+        keys = self._keys
+        return len(keys) if keys is not None else 0
+
+    def __repr__(self):
+        return "<ReplayStore [%s records=%d]>" % (self.path, len(self))
+
+
+def _har_headers(
+    headers: typing.List[typing.Tuple[str, str]],
+) -> typing.List[typing.Dict[str, str]]:
+    return [{"name": name, "value": value} for name, value in headers]
+
+
+def _har_text(content: bytes) -> typing.Dict[str, str]:
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"text": base64.b64encode(content).decode("ascii"), "encoding": "base64"}
+
+
+def _header(headers: typing.List[typing.Tuple[str, str]], name: str) -> str:
+    name = name.lower()
+    return next((value for key, value in headers if key.lower() == name), "")
+
+
+def _har_entry(record: Record) -> typing.Dict[str, typing.Any]:
+    from datetime import datetime
+    from datetime import timezone
+    from urllib.parse import parse_qsl
+    from urllib.parse import urlsplit
+
+    milliseconds = record.elapsed * 1000
+    request: typing.Dict[str, typing.Any] = {
+        "method": record.method,
+        "url": record.url,
+        "httpVersion": "HTTP/1.1",
+        "cookies": [],
+        "headers": _har_headers(record.request_headers),
+        "queryString": [
+            {"name": name, "value": value}
+            for name, value in parse_qsl(urlsplit(record.url).query)
+        ],
+        "headersSize": -1,
+        "bodySize": len(record.request_body),
+    }
+    if record.request_body:
+        request["postData"] = {
+            "mimeType": _header(record.request_headers, "Content-Type"),
+            **_har_text(record.request_body),
+        }
+    return {
+        "startedDateTime": datetime.fromtimestamp(
+            record.started_at, timezone.utc
+        ).isoformat(),
+        "time": milliseconds,
+        "request": request,
+        "response": {
+            "status": record.status_code,
+            "statusText": record.reason,
+            "httpVersion": "HTTP/1.1",
+            "cookies": [],
+            "headers": _har_headers(record.headers),
+            "content": {
+                "size": len(record.content),
+                "mimeType": _header(record.headers, "Content-Type"),
+                **_har_text(record.content),
+            },
+            "redirectURL": _header(record.headers, "Location"),
+            "headersSize": -1,
+            "bodySize": len(record.content),
+        },
+        "cache": {},
+        "timings": {"send": 0, "wait": milliseconds, "receive": 0},
+    }
+
+
+class RecordingEngine(Engine):
+    """Engine wrapper that records the exchanges of `engine` in a `ReplayStore`
+
+    Streaming (`-o`/`-N`) requests go through without being recorded, their
+    body isn't kept. Closing the engine indexes the records and leaves
+    `engine` open, it's shared or owned by the caller.
+    """
+
+    def __init__(
+        self,
+        store: typing.Union[str, ReplayStore],
+        engine: typing.Union[Engine, engines, ENGINE_LITERAL] = engines.requests,
+        max_concurrency: typing.Optional[int] = None,
+    ):
+        super().__init__(max_concurrency=max_concurrency)
+        self.store = store if isinstance(store, ReplayStore) else ReplayStore(store)
+        self.engine = get_engine(engine)
+
+    def _convert_request(self, curl_request: "CurlRequest"):
+        return self.engine._convert_request(curl_request)
+
+    def _send(self, request, curl_request: "CurlRequest", proxies):
+        return self.engine._send(request, curl_request, proxies)
+
+    def build_response(self, *args, **kwargs) -> "CurlResponse":
+        return self.engine.build_response(*args, **kwargs)
+
+    def pool_gauges(self):
+        return self.engine.pool_gauges()
+
+    def _record(self, request: "CurlRequest", response: "CurlResponse") -> None:
+        if not request.stream:
+            self.store.append(Record.from_exchange(request, response))
+
+    def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        response = self.engine.handle_curl(request)
+        self._record(request, response)
+        return response
+
+    async def _ahandle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        response = await self.engine.ahandle_curl(request)
+        self._record(request, response)
+        return response
+
+    def close(self) -> None:
+        self.store.close()
+
+
+class replayEngine(Engine):
+    """Engine answering requests with the responses of a `ReplayStore`
+
+    `store` defaults to `config.REPLAY_STORE`. `latency` delays each
+    response by a number of seconds, by the time the recorded exchange took
+    with `"recorded"`, or by what a callable taking the `Record` returns;
+    by default responses come back as fast as they can be built. Requests
+    without a record raise `RecordNotFoundError`, or go to `fallback`.
+    """
+
+    def __init__(
+        self,
+        store: typing.Union[str, ReplayStore, None] = None,
+        latency: LATENCY = None,
+        fallback: typing.Union[Engine, engines, ENGINE_LITERAL, None] = None,
+        max_concurrency: typing.Optional[int] = None,
+    ):
+        super().__init__(max_concurrency=max_concurrency)
+        store = store if store is not None else config.REPLAY_STORE
+        if store is None:
+            raise InvalidOptionError(
+                "The replay engine needs a store, pass one or set config.REPLAY_STORE"
+            )
+        self.store = store if isinstance(store, ReplayStore) else ReplayStore(store)
+        self.latency = latency
+        self.fallback = get_engine(fallback) if fallback is not None else None
+
+    def _convert_request(self, curl_request: "CurlRequest"):
+        return curl_request, {}
+
+    def _send(self, request, curl_request: "CurlRequest", proxies):
+        return self.handle_curl(curl_request)
+
+    def _delay(self, record: Record) -> float:
+        if self.latency is None:
+            return 0.0
+        if self.latency == "recorded":
+            return record.elapsed
+        if callable(self.latency):
+            return self.latency(record)
+        return float(self.latency)  # type: ignore[arg-type]
+
+    def _lookup(self, request: "CurlRequest") -> typing.Optional[Record]:
+        record = self.store.lookup(request)
+        if record is None and self.fallback is None:
+            raise RecordNotFoundError(
+                "No recorded response for %s %s"
+                % (request.method or "GET", request.url)
+            )
+        return record
+
+    def _respond(
+        self, request: "CurlRequest", record: Record, timings: Timings
+    ) -> "CurlResponse":
+        response = self.build_response(
+            request,
+            status_code=record.status_code,
+            reason=record.reason,
+            headers=record.headers,
+            content=record.content,
+        )
+        timings.mark("starttransfer")
+        response.timings = timings
+        return response
+
+    def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        timings = Timings()
+        record = self._lookup(request)
+        if record is None:
+            return typing.cast(Engine, self.fallback).handle_curl(request)
+        delay = self._delay(record)
+        if delay:
+            time.sleep(delay)
+        return self._finish_response(self._respond(request, record, timings))
+
+    async def _ahandle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        import asyncio
+
+        timings = Timings()
+        record = self._lookup(request)
+        if record is None:
+            return await typing.cast(Engine, self.fallback).ahandle_curl(request)
+        delay = self._delay(record)
+        if delay:
+            await asyncio.sleep(delay)
+        return await self._afinish_response(self._respond(request, record, timings))
+
+    def close(self) -> None:
+        # `fallback` is shared or owned by the caller, only the store is ours
+        self.store.close()
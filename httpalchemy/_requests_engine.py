@@ -0,0 +1,206 @@
+import threading
+import typing
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from ._compression import accept_encoding
+from ._connection import KeepAlivePoolManager
+from ._connection import pool_manager_gauges
+from ._dns import resolving
+from ._engines import HTTP_2_PRIOR_KNOWLEDGE
+from ._engines import Engine
+from ._engines import basic_auth_header
+from ._exceptions import UnsupportedOptionError
+from ._headers import EMPTY_HEADERS
+from ._headers import Headers
+from ._metrics import PoolGauges
+from ._timings import Timings
+from ._timings import recording
+from ._uploads import prepare_body
+from .config import DEFAULT_POOL_LIMITS
+from .config import DEFAULT_USER_AGENT
+from .config import PoolLimits
+
+if typing.TYPE_CHECKING:
+    from requests import Request as RequestsRequest
+    from requests import Response as RequestsResponse
+
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """`HTTPAdapter` that sizes and expires its pools according to `PoolLimits`"""
+
+    def __init__(self, limits: PoolLimits):
+        self.limits = limits
+        super().__init__(
+            pool_connections=limits.max_hosts,
+            pool_maxsize=limits.max_connections_per_host,
+            pool_block=limits.block,
+        )
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = KeepAlivePoolManager(self.limits, **pool_kwargs)
+
+
+class requestsEngine(Engine):
+    DEFAULT_HEADERS = Headers({"Accept": "*/*"})
+
+    def __init__(
+        self,
+        limits: typing.Optional[PoolLimits] = None,
+        max_concurrency: typing.Optional[int] = None,
+        proxies: typing.Optional[typing.Mapping[str, str]] = None,
+    ):
+        super().__init__(max_concurrency=max_concurrency, proxies=proxies)
+        self.limits = limits or DEFAULT_POOL_LIMITS
+        self._session: typing.Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """Long-lived session whose connection pools are shared by every call"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        from http.cookiejar import DefaultCookiePolicy
+
+        session = requests.Session()
+        # curl doesn't carry cookies from one invocation to the next
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = PooledHTTPAdapter(self.limits)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def pool_gauges(self) -> typing.Dict[str, PoolGauges]:
+        session = self._session
+        if session is None:
+            return {}
+        gauges: typing.Dict[str, PoolGauges] = {}
+        for adapter in set(session.adapters.values()):
+            managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+            for manager in managers:
+                for key, pool in pool_manager_gauges(manager).items():
+                    gauges[key] = pool + gauges.get(key, PoolGauges())
+        return gauges
+
+    def close(self) -> None:
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def _convert_request(
+        self, curl_request: "CurlRequest"
+    ) -> typing.Tuple["RequestsRequest", typing.Dict[str, str]]:
+        url = curl_request.url
+        method = curl_request.method
+        # requests sends one line per name, so repeated headers are joined
+        headers = CaseInsensitiveDict(
+            self.DEFAULT_HEADERS.with_headers(curl_request.headers or EMPTY_HEADERS)
+        )
+        data = prepare_body(curl_request, headers)
+        user_agent = curl_request.user_agent
+
+        if curl_request.compressed:
+            headers.setdefault("Accept-Encoding", accept_encoding())
+
+        if curl_request.http_version == HTTP_2_PRIOR_KNOWLEDGE:
+            msg = "The `requests` engine can't speak HTTP/2, use the `httpx` engine"
+            raise UnsupportedOptionError(msg)
+
+        proxies = self.get_proxies(curl_request.url)
+
+        headers["User-Agent"] = user_agent or DEFAULT_USER_AGENT
+        if curl_request.auth is not None:
+            headers.setdefault("Authorization", basic_auth_header(curl_request.auth))
+
+        req = requests.Request(
+            url=url,
+            method=method,
+            data=data,
+            headers=headers,
+        )
+        return req, proxies
+
+    def _send(
+        self,
+        request: "RequestsRequest",
+        curl_request: "CurlRequest",
+        proxies: typing.Dict[str, str],
+    ) -> "RequestsResponse":
+
+        response = self.session.send(
+            request.prepare(),
+            allow_redirects=curl_request.follow_redirects,
+            proxies=proxies,
+            stream=curl_request.stream,
+        )
+
+        return response
+
+    def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        timings = Timings()
+        # The pooled connections report their phases to `timings`
+        with recording(timings), resolving(request.resolver):
+            requests_request, proxies = self._convert_request(curl_request=request)
+            response = self._send(
+                request=requests_request, curl_request=request, proxies=proxies
+            )
+        return self._finish_response(self._wrap_response(request, response, timings))
+
+    @staticmethod
+    def _store_content(response: "CurlResponse", content: bytes) -> None:
+        raw = typing.cast("RequestsResponse", response.raw)
+        raw._content = content
+        raw._content_consumed = True
+
+    def _wrap_response(
+        self,
+        request: "CurlRequest",
+        response: "RequestsResponse",
+        timings: typing.Optional[Timings] = None,
+    ) -> "CurlResponse":
+        from ._curl import CurlResponse
+
+        return CurlResponse(
+            status_code=response.status_code,
+            reason=response.reason,
+            raw_response=response,
+            request=request,
+            stream=response.iter_content,
+            close=response.close,
+            timings=timings,
+        )
+
+    def build_response(
+        self,
+        curl_request: "CurlRequest",
+        *,
+        status_code: int,
+        reason: str,
+        headers: typing.List[typing.Tuple[str, str]],
+        content: bytes,
+    ) -> "CurlResponse":
+        from requests.utils import get_encoding_from_headers
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = curl_request.url
+        response._content = content
+        response._content_consumed = True
+        return self._wrap_response(curl_request, response)
@@ -0,0 +1,125 @@
+import collections
+import random
+import threading
+import typing
+
+from . import config
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+# What curl considers a transient HTTP failure for `--retry`
+TRANSIENT_STATUS_CODES = frozenset([408, 429, 500, 502, 503, 504])
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+
+def caused_by(
+    exc: BaseException,
+    types: typing.Union[
+        typing.Type[BaseException], typing.Tuple[typing.Type[BaseException], ...]
+    ],
+) -> bool:
+    """Whether `exc` or any exception it wraps is an instance of `types`"""
+    seen = set()
+    current: typing.Optional[BaseException] = exc
+    while current is not None and id(current) not in seen:
+        if isinstance(current, types):
+            return True
+        seen.add(id(current))
+        reason = getattr(current, "reason", None)
+        wrapped = current.args[0] if current.args else None
+        current = (
+            current.__cause__
+            or current.__context__
+            or (reason if isinstance(reason, BaseException) else None)
+            or (wrapped if isinstance(wrapped, BaseException) else None)
+        )
+    return False
+
+
+def should_retry_error(curl_request: "CurlRequest", exc: BaseException) -> bool:
+    if curl_request.retry_all_errors:
+        return True
+    if curl_request.retry_connrefused and caused_by(exc, ConnectionRefusedError):
+        return True
+    # Timeouts as curl does, plus connections dropped by the peer
+    return caused_by(exc, (TimeoutError, ConnectionResetError, BrokenPipeError))
+
+
+def should_retry_response(response: "CurlResponse") -> bool:
+    return response.status_code in TRANSIENT_STATUS_CODES
+
+
+def retry_delay(
+    curl_request: "CurlRequest",
+    attempt: int,
+    response: typing.Optional["CurlResponse"] = None,
+) -> float:
+    """Seconds to wait before retry number `attempt` (starting at 0)
+
+    A `Retry-After` header in seconds wins, then `--retry-delay`, then
+    exponential backoff with jitter capped at `config.RETRY_MAX_DELAY`.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.strip().isdigit():
+            return float(retry_after)
+    if curl_request.retry_delay:
+        return curl_request.retry_delay
+    delay = min(config.RETRY_MAX_DELAY, config.RETRY_INITIAL_DELAY * 2**attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class LatencyTracker:
+    """Recent response latencies per host, used to decide when to hedge"""
+
+    def __init__(
+        self,
+        window: int = config.HEDGE_WINDOW,
+        min_samples: int = config.HEDGE_MIN_SAMPLES,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: typing.Dict[str, typing.Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, host: str, latency: float) -> None:
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = collections.deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, host: str, percentile: float) -> typing.Optional[float]:
+        with self._lock:
+            samples = list(self._samples.get(host, ()))
+        if len(samples) < self.min_samples:
+            return None
+        samples.sort()
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+latencies = LatencyTracker()
+
+
+def can_hedge(curl_request: "CurlRequest") -> bool:
+    """Whether a duplicate of `curl_request` may be sent
+
+    Requests with a body aren't hedged: the duplicate would upload it twice,
+    and a body read from standard input can't be read again.
+    """
+    return (
+        curl_request.hedge is not None
+        and (curl_request.method or "GET") in IDEMPOTENT_METHODS
+        and curl_request.output is None
+        and curl_request.upload_file is None
+        and curl_request.data is None
+        and curl_request.data_binary is None
+        and not curl_request.form
+    )
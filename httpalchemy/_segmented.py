@@ -0,0 +1,237 @@
+import mmap
+import os
+import re
+import typing
+
+from . import config
+from ._exceptions import DownloadError
+from ._headers import EMPTY_HEADERS
+from ._timings import TIME_VARIABLES
+from ._timings import Timings
+
+if typing.TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+    from ._engines import Engine
+
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+SEND = typing.Callable[["Engine", "CurlRequest"], "CurlResponse"]
+
+
+def can_segment(curl_request: "CurlRequest") -> bool:
+    """Whether `curl_request` is a whole download into a file it may split"""
+    output = curl_request.output
+    return (
+        (curl_request.segments or 0) > 1
+        and curl_request.method == "GET"
+        and output is not None
+        and output != "-"
+        and not hasattr(output, "write")
+        and "Range" not in (curl_request.headers or EMPTY_HEADERS)
+    )
+
+
+def split_ranges(size: int, segments: int) -> typing.List[typing.Tuple[int, int]]:
+    """Inclusive byte ranges cutting `size` bytes in up to `segments` parts
+
+    Parts are at least `config.SEGMENT_MIN_SIZE` long, so small files aren't
+    split in requests that cost more than they save.
+    """
+    segments = max(1, min(segments, size // config.SEGMENT_MIN_SIZE))
+    step = max(1, -(-size // segments))
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def _content_range(
+    response: "CurlResponse",
+) -> typing.Optional[typing.Tuple[int, int, int]]:
+    match = CONTENT_RANGE.match(response.headers.get("Content-Range") or "")
+    if match is None:
+        return None
+    start, end, size = match.groups()
+    return int(start), int(end), int(size)
+
+
+def _with_range(
+    curl_request: "CurlRequest", byte_range: str, etag: typing.Optional[str] = None
+) -> "CurlRequest":
+    headers = (curl_request.headers or EMPTY_HEADERS).with_header(
+        "Range", "bytes=" + byte_range
+    )
+    if etag:
+        # A resource that changed since the first segment comes back whole
+        headers = headers.with_header("If-Range", etag)
+    return curl_request.replace(headers=headers)
+
+
+def _write_segment(
+    response: "CurlResponse", view: mmap.mmap, start: int, end: int
+) -> "CurlResponse":
+    position = start
+    try:
+        for chunk in response.iter_bytes():
+            chunk = chunk[: end + 1 - position]
+            view[position : position + len(chunk)] = chunk
+            position += len(chunk)
+            if position > end:
+                break
+    finally:
+        response.close()
+    if position != end + 1:
+        raise DownloadError(
+            "Bytes %d-%d of %s ended after %d bytes"
+            % (start, end, response.request.url, position - start)
+        )
+    return response
+
+
+def _fetch_segment(
+    send: SEND,
+    engine: "Engine",
+    curl_request: "CurlRequest",
+    view: mmap.mmap,
+    start: int,
+    end: int,
+) -> "CurlResponse":
+    response = send(engine, curl_request)
+    content_range = _content_range(response)
+    if response.status_code != 206 or content_range != (start, end, len(view)):
+        response.close()
+        raise DownloadError(
+            "Asked %s for bytes %d-%d/%d, got %d %s"
+            % (
+                curl_request.url,
+                start,
+                end,
+                len(view),
+                response.status_code,
+                response.headers.get("Content-Range") or "without a range",
+            )
+        )
+    return _write_segment(response, view, start, end)
+
+
+def _merge_timings(
+    timings: Timings, responses: typing.Sequence["CurlResponse"]
+) -> Timings:
+    # The phases are those of the first request, connections add up
+    first = responses[0].timings
+    offset = first.started - timings.started
+    for name in TIME_VARIABLES[:-1]:
+        value = getattr(first, name)
+        setattr(timings, name, value + offset if value else 0.0)
+    for response in responses:
+        timings.num_connects += response.timings.num_connects
+        timings.num_dns_lookups += response.timings.num_dns_lookups
+        timings.num_dns_cache_hits += response.timings.num_dns_cache_hits
+    return timings
+
+
+def _check_size(path: str, size: int) -> None:
+    written = os.path.getsize(path)
+    if written != size:
+        raise DownloadError("%s holds %d bytes instead of %d" % (path, written, size))
+
+
+def _written_size(
+    ranges: typing.Sequence[typing.Tuple[int, int]], written: typing.Sequence[bool]
+) -> int:
+    """Bytes from the start of the file covered by written segments"""
+    size = 0
+    for (_, end), done in zip(ranges, written):
+        if not done:
+            break
+        size = end + 1
+    return size
+
+
+def download(
+    send: SEND, engine: "Engine", curl_request: "CurlRequest"
+) -> "CurlResponse":
+    """Download `curl_request` into its `-o` file in parallel byte ranges
+
+    The first request asks for the whole file from byte 0 and tells its size.
+    When the server answers with a range, the file is preallocated and
+    memory-mapped, the first response fills the first segment and the
+    others are fetched in parallel, each through `send` with its own retries,
+    rate limit and pooled connection. Servers without byte ranges get a
+    plain download. When a segment fails, the file is cut back to the
+    segments written from its start, so `-C -` can resume it.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = typing.cast(str, curl_request.output)
+    timings = Timings()
+    segment_request = curl_request.replace(
+        output=None, no_buffer=True, write_out=None, etag_save=None, segments=None
+    )
+    response = send(engine, _with_range(segment_request, "0-"))
+    content_range = _content_range(response)
+    size = content_range[2] if content_range else 0
+    ranges: typing.List[typing.Tuple[int, int]] = []
+    if response.status_code == 206 and content_range and content_range[0] == 0:
+        ranges = split_ranges(size, curl_request.segments or 1)
+    if len(ranges) < 2:
+        response.request = curl_request
+        engine._finish_response(response)
+        if ranges:
+            _check_size(path, size)
+        return response
+
+    etag = response.headers.get("ETag")
+    if etag and etag.startswith("W/"):
+        etag = None  # If-Range only takes strong validators
+    with open(path, "w+b") as file:
+        file.truncate(size)
+        first_written = False
+        futures: typing.List["Future[CurlResponse]"] = []
+        try:
+            with mmap.mmap(file.fileno(), size) as view:
+                with ThreadPoolExecutor(
+                    max_workers=len(ranges) - 1,
+                    thread_name_prefix="httpalchemy-segment",
+                ) as executor:
+                    futures = [
+                        executor.submit(
+                            _fetch_segment,
+                            send,
+                            engine,
+                            _with_range(segment_request, "%d-%d" % (start, end), etag),
+                            view,
+                            start,
+                            end,
+                        )
+                        for start, end in ranges[1:]
+                    ]
+                    try:
+                        responses = [_write_segment(response, view, *ranges[0])]
+                        first_written = True
+                        responses.extend(future.result() for future in futures)
+                    except BaseException:
+                        for future in futures:
+                            future.cancel()
+                        raise
+                view.flush()
+        except BaseException:
+            # Zeros past the written segments would pass for data with `-C -`
+            written = [first_written] + [
+                future.done()
+                and not future.cancelled()
+                and future.exception() is None
+                for future in futures
+            ]
+            file.truncate(_written_size(ranges, written))
+            raise
+    _check_size(path, size)
+
+    # The file holds the whole resource, as a plain GET would have
+    response.request = curl_request
+    response.status_code = 200
+    response.reason = "OK"
+    response.timings = _merge_timings(timings, responses)
+    response._downloaded = size
+    engine._save_etag(response)
+    response.finish_transfer()
+    return response
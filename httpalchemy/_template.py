@@ -0,0 +1,120 @@
+import typing
+from urllib.parse import urlencode
+
+from ._curl import CurlRequest
+from ._curl import CurlResponse
+from ._curl import create_curl_request
+from ._curl import resolve_aliases
+from ._dispatch import adispatch
+from ._dispatch import dispatch
+from ._engines import ENGINE_LITERAL
+from ._engines import Engine
+from ._engines import basic_auth_header
+from ._engines import engines
+from ._engines import get_engine
+from ._exceptions import IncompatibleTypeError
+from ._headers import EMPTY_HEADERS
+
+QUERY = typing.Union[
+    typing.Mapping[str, str], typing.Sequence[typing.Tuple[str, str]], str
+]
+
+
+class CurlTemplate:
+    """Curl request whose options are normalized once and reused by every call
+
+    Only the option parsing is done once: the engine still converts the
+    request to its library's own on every call. The URL may contain
+    `str.format` placeholders, filled in per call along with the query
+    string and the body:
+
+        template = CurlTemplate("http://example.com/items/{id}", _H=[...], _u="a:b")
+        template.curl(id=1, params={"page": "2"})
+        template.curl(id=2, data="key=value")
+
+    `data` replaces the `-d`, `--data-binary` or `--json` body of the
+    template. Templates with `-T`, `-C -` or `--etag-compare` are built anew
+    on every call, since those depend on the URL or on files. The URL is
+    formatted only when fields are given, so it may hold literal braces.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        /,
+        *,
+        engine: typing.Union[Engine, engines, ENGINE_LITERAL] = engines.requests,
+        **options: typing.Any,
+    ):
+        self.url = url
+        self.engine = get_engine(engine)
+        self._options = resolve_aliases(options)
+        self.base = self._create(url)
+        # Options depending on the URL or on files at the time of the call
+        self._per_call = (
+            self._options.get("_T") is not None
+            or self._options.get("_C") == "-"
+            or self._options.get("__etag_compare") is not None
+        )
+
+    def _create(self, url: str) -> CurlRequest:
+        base = create_curl_request(url, **self._options)
+        if base.auth is not None:
+            headers = (base.headers or EMPTY_HEADERS).with_default(
+                "Authorization", basic_auth_header(base.auth)
+            )
+            base = base.replace(headers=headers, auth=None)
+        return base
+
+    def build(
+        self,
+        *,
+        params: typing.Optional[QUERY] = None,
+        data: typing.Optional[str] = None,
+        **url_fields: typing.Any,
+    ) -> CurlRequest:
+        # Only formatted when asked to, URLs may contain literal braces
+        url = self.url.format(**url_fields) if url_fields else self.url
+        if params:
+            query = params if isinstance(params, str) else urlencode(params)
+            url += ("&" if "?" in url else "?") + query
+        if self._per_call:
+            curl_request = self._create(url)
+            changes: typing.Dict[str, typing.Any] = {}
+        else:
+            curl_request = self.base
+            changes = {"url": url}
+        if data is not None:
+            # The data replaces the body the template was given
+            if curl_request.form or curl_request.upload_file is not None:
+                raise IncompatibleTypeError(
+                    "`data` can't replace the `-F`/`-T` body of a template"
+                )
+            if curl_request.data_binary is not None:
+                changes["data_binary"] = data
+            else:
+                changes["data"] = data
+        return curl_request.replace(**changes)
+
+    def curl(
+        self,
+        *,
+        params: typing.Optional[QUERY] = None,
+        data: typing.Optional[str] = None,
+        **url_fields: typing.Any,
+    ) -> CurlResponse:
+        curl_request = self.build(params=params, data=data, **url_fields)
+        return dispatch(self.engine, curl_request)
+
+    async def acurl(
+        self,
+        *,
+        params: typing.Optional[QUERY] = None,
+        data: typing.Optional[str] = None,
+        **url_fields: typing.Any,
+    ) -> CurlResponse:
+        curl_request = self.build(params=params, data=data, **url_fields)
+        return await adispatch(self.engine, curl_request)
+
+    def __repr__(self):
+        return "<CurlTemplate [%s %s]>" % (self.base.method, self.url)
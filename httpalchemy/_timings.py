@@ -0,0 +1,149 @@
+import contextlib
+import contextvars
+import re
+import time
+import typing
+
+# Variables of curl's `-w/--write-out` that `Timings` records
+TIME_VARIABLES = (
+    "time_namelookup",
+    "time_connect",
+    "time_appconnect",
+    "time_pretransfer",
+    "time_starttransfer",
+    "time_total",
+)
+WRITE_OUT_VARIABLE = re.compile(r"%\{(\w+)\}")
+WRITE_OUT_ESCAPES = {"\\n": "\n", "\\r": "\r", "\\t": "\t"}
+
+_timings: contextvars.ContextVar[typing.Optional["Timings"]] = contextvars.ContextVar(
+    "httpalchemy_timings", default=None
+)
+
+
+class Timings:
+    """Where the time of a transfer went, as curl's `-w` variables report it
+
+    Every `time_*` value is in seconds since the request started. Phases that
+    didn't happen stay at 0, e.g. `time_connect` when a pooled connection was
+    reused, in which case `num_connects` is 0 as well. `size_upload` is 0
+    for bodies whose size isn't known upfront. `num_dns_cache_hits`
+    counts the lookups among `num_dns_lookups` answered by the DNS cache or
+    `--resolve`.
+    """
+
+    __slots__ = (
+        "started",
+        "time_namelookup",
+        "time_connect",
+        "time_appconnect",
+        "time_pretransfer",
+        "time_starttransfer",
+        "time_total",
+        "size_download",
+        "size_upload",
+        "num_connects",
+        "num_dns_lookups",
+        "num_dns_cache_hits",
+    )
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.time_namelookup = 0.0
+        self.time_connect = 0.0
+        self.time_appconnect = 0.0
+        self.time_pretransfer = 0.0
+        self.time_starttransfer = 0.0
+        self.time_total = 0.0
+        self.size_download = 0
+        self.size_upload = 0
+        self.num_connects = 0
+        self.num_dns_lookups = 0
+        self.num_dns_cache_hits = 0
+
+    def mark(self, phase: str) -> None:
+        """Record that `phase` (e.g. `"connect"`) has just completed"""
+        setattr(self, "time_" + phase, time.monotonic() - self.started)
+
+    def finish(self, size_download: int) -> None:
+        if not self.time_total:
+            self.mark("total")
+            self.size_download = size_download
+
+    @property
+    def speed_download(self) -> float:
+        """Average download speed in bytes per second"""
+        if not self.time_total:
+            return 0.0
+        return self.size_download / self.time_total
+
+    def as_dict(self) -> typing.Dict[str, typing.Union[int, float]]:
+        values: typing.Dict[str, typing.Union[int, float]] = {
+            name: getattr(self, name) for name in TIME_VARIABLES
+        }
+        values["size_download"] = self.size_download
+        values["speed_download"] = self.speed_download
+        values["size_upload"] = self.size_upload
+        values["num_connects"] = self.num_connects
+        values["num_dns_lookups"] = self.num_dns_lookups
+        values["num_dns_cache_hits"] = self.num_dns_cache_hits
+        return values
+
+    def render(self, format: str, **variables: typing.Any) -> str:
+        """Expand `%{variable}` and `\\n` in `format` the way curl's `-w` does
+
+        Unknown variables expand to an empty string, like in curl.
+        """
+        values: typing.Dict[str, typing.Any] = self.as_dict()
+        values.update(variables)
+
+        def expand(match: typing.Match) -> str:
+            value = values.get(match.group(1))
+            if value is None:
+                return ""
+            if isinstance(value, float):
+                return "%.6f" % value
+            return str(value)
+
+        for escape, character in WRITE_OUT_ESCAPES.items():
+            format = format.replace(escape, character)
+        return WRITE_OUT_VARIABLE.sub(expand, format)
+
+    def trace(self, event: str, info: typing.Dict[str, typing.Any]) -> None:
+        """httpcore `trace` extension hook
+
+        Host names are resolved by the engine's network backend, which
+        marks `time_namelookup` itself.
+        """
+        if event == "connection.connect_tcp.complete":
+            self.mark("connect")
+            self.num_connects += 1
+        elif event == "connection.start_tls.complete":
+            self.mark("appconnect")
+        elif event.endswith(".send_request_headers.started"):
+            self.mark("pretransfer")
+        elif event.endswith(".receive_response_headers.complete"):
+            self.mark("starttransfer")
+
+    async def atrace(self, event: str, info: typing.Dict[str, typing.Any]) -> None:
+        self.trace(event, info)
+
+    def __repr__(self):
+        return "<Timings [total=%.6fs connects=%d]>" % (
+            self.time_total,
+            self.num_connects,
+        )
+
+
+@contextlib.contextmanager
+def recording(timings: Timings) -> typing.Iterator[Timings]:
+    """Let connection hooks running in this thread or task report into `timings`"""
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def current_timings() -> typing.Optional[Timings]:
+    return _timings.get()
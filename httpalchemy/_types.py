@@ -1,3 +1,4 @@
+import os
 import typing
 
 CREDENTIALS = typing.Union[str, typing.Tuple[str, str]]
@@ -7,6 +8,9 @@ FORM_DATA = typing.Union[
 HEADERS = typing.Union[
     typing.Iterable[typing.Union[str, typing.Tuple[str, str]]], typing.Dict[str, str]
 ]
+# `--resolve`/`--connect-to` entries, one string or several
+HOST_MAPPINGS = typing.Union[str, typing.Iterable[str]]
 METHOD = typing.Literal[
     "GET", "POST", "PUT", "DELETE", "PATCH", "CONNECT", "LINK", "UNLINK"
 ]
+OUTPUT = typing.Union[str, "os.PathLike[str]", typing.BinaryIO]
@@ -0,0 +1,322 @@
+import mimetypes
+import mmap
+import os
+import sys
+import typing
+import uuid
+from abc import ABC
+from abc import abstractmethod
+
+from ._compression import compress_body
+from ._ratelimit import Throttle
+from ._ratelimit import throttled_chunk_size
+from ._timings import current_timings
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadBody(ABC):
+    """Request body that is read from its source only while it is being sent
+
+    Bodies are re-iterable, so redirects that resend the body work, and every
+    file they touch is closed as soon as its part of the body has been sent.
+    Asynchronous iteration reads in the loop's default executor, so file
+    reads don't block the event loop.
+    """
+
+    @abstractmethod
+    def __iter__(self) -> typing.Iterator[typing.Union[bytes, memoryview]]:
+        ...
+
+    async def __aiter__(self) -> typing.AsyncIterator[typing.Union[bytes, memoryview]]:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        chunks = iter(self)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+
+class FileBody(UploadBody):
+    """Stream a file verbatim, as `--data-binary @file` and `-T file` do
+
+    The file is memory-mapped and sent as `memoryview` slices, so its content
+    goes from the page cache to the socket without intermediate copies.
+    """
+
+    def __init__(self, path: str, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(path)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> typing.Iterator[typing.Union[bytes, memoryview]]:
+        if not self.size:
+            return
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, self.size, self.chunk_size):
+                    yield view[offset : offset + self.chunk_size]
+            finally:
+                # Slices handed out keep the mapping, not this view
+                view.release()
+                try:
+                    mapped.close()
+                except BufferError:
+                    # The transport still holds a slice, the mapping goes
+                    # away once it is garbage collected
+                    ...
+
+    async def __aiter__(self) -> typing.AsyncIterator[bytes]:
+        # The pages of a mapping would be read from the loop as they are sent
+        import asyncio
+
+        if not self.size:
+            return
+        loop = asyncio.get_running_loop()
+        file = await loop.run_in_executor(None, open, self.path, "rb")
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, file.read, self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            file.close()
+
+
+class StrippedFileBody(UploadBody):
+    """Stream a file without carriage returns and newlines, as `-d @file` does
+
+    The final size isn't known upfront, so the body is sent chunked.
+    `@-` reads standard input.
+    """
+
+    def __init__(self, path: str, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def __iter__(self) -> typing.Iterator[bytes]:
+        if self.path == "-":
+            yield from self._strip(sys.stdin.buffer)
+            return
+        with open(self.path, "rb") as file:
+            yield from self._strip(file)
+
+    def _strip(self, file: typing.BinaryIO) -> typing.Iterator[bytes]:
+        while True:
+            chunk = file.read(self.chunk_size)
+            if not chunk:
+                break
+            chunk = chunk.replace(b"\r", b"").replace(b"\n", b"")
+            if chunk:
+                yield chunk
+
+
+class MultipartEncoder(UploadBody):
+    """Streaming `multipart/form-data` body for `-F` fields
+
+    `name=value` adds a text field, `name=@path` a file part, optionally
+    followed by `;type=` and `;filename=` like curl. The total length is
+    computed upfront, so the body is sent with a `Content-Length`.
+    """
+
+    def __init__(
+        self,
+        fields: typing.Mapping[str, str],
+        boundary: typing.Optional[str] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.parts: typing.List[
+            typing.Tuple[bytes, typing.Union[bytes, FileBody]]
+        ] = []
+        for name, value in fields.items():
+            if value.startswith("@"):
+                path, content_type, filename = self._parse_file_field(value[1:])
+                header = (
+                    'Content-Disposition: form-data; name="%s"; filename="%s"\r\n'
+                    "Content-Type: %s\r\n\r\n"
+                ) % (_quote(name), _quote(filename), content_type)
+                self.parts.append((header.encode(), FileBody(path, chunk_size)))
+            else:
+                header = 'Content-Disposition: form-data; name="%s"\r\n\r\n' % _quote(
+                    name
+                )
+                self.parts.append((header.encode(), value.encode()))
+        self._closing = ("--%s--\r\n" % self.boundary).encode()
+
+    @staticmethod
+    def _parse_file_field(value: str) -> typing.Tuple[str, str, str]:
+        path, *parameters = value.split(";")
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        filename = os.path.basename(path)
+        for parameter in parameters:
+            key, _, parameter_value = parameter.partition("=")
+            if key.strip() == "type":
+                content_type = parameter_value.strip()
+            elif key.strip() == "filename":
+                filename = parameter_value.strip()
+        return path, content_type, filename
+
+    @property
+    def content_type(self) -> str:
+        return "multipart/form-data; boundary=%s" % self.boundary
+
+    def _part_start(self, header: bytes) -> bytes:
+        return b"--" + self.boundary.encode() + b"\r\n" + header
+
+    def __len__(self) -> int:
+        size = len(self._closing)
+        for header, body in self.parts:
+            size += len(self._part_start(header)) + len(body) + 2
+        return size
+
+    def __iter__(self) -> typing.Iterator[typing.Union[bytes, memoryview]]:
+        for header, body in self.parts:
+            yield self._part_start(header)
+            if isinstance(body, bytes):
+                yield body
+            else:
+                yield from body
+            yield b"\r\n"
+        yield self._closing
+
+    async def __aiter__(self) -> typing.AsyncIterator[typing.Union[bytes, memoryview]]:
+        for header, body in self.parts:
+            yield self._part_start(header)
+            if isinstance(body, bytes):
+                yield body
+            else:
+                async for chunk in body:
+                    yield chunk
+            yield b"\r\n"
+        yield self._closing
+
+
+class ThrottledBody(UploadBody):
+    """Send another body at most at `rate` bytes per second, for `--limit-rate`"""
+
+    def __init__(self, body: typing.Union[str, bytes, UploadBody], rate: float):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.rate = rate
+        self.chunk_size = throttled_chunk_size(rate)
+
+    def _split(
+        self, chunk: typing.Union[bytes, memoryview]
+    ) -> typing.Iterator[typing.Union[bytes, memoryview]]:
+        if len(chunk) <= self.chunk_size:
+            yield chunk
+            return
+        view = memoryview(chunk)
+        for offset in range(0, len(view), self.chunk_size):
+            yield view[offset : offset + self.chunk_size]
+
+    def __iter__(self) -> typing.Iterator[typing.Union[bytes, memoryview]]:
+        throttle = Throttle(self.rate)
+        chunks = [self.body] if isinstance(self.body, bytes) else self.body
+        for chunk in chunks:
+            for piece in self._split(chunk):
+                yield piece
+                throttle.wait(len(piece))
+
+    async def __aiter__(self) -> typing.AsyncIterator[typing.Union[bytes, memoryview]]:
+        throttle = Throttle(self.rate)
+        if isinstance(self.body, bytes):
+            for piece in self._split(self.body):
+                yield piece
+                await throttle.await_(len(piece))
+            return
+        async for chunk in self.body:
+            for piece in self._split(chunk):
+                yield piece
+                await throttle.await_(len(piece))
+
+
+class SizedThrottledBody(ThrottledBody):
+    """`ThrottledBody` of a body whose size is known, sent with a `Content-Length`"""
+
+    def __len__(self) -> int:
+        return len(self.body)  # type: ignore[arg-type]
+
+
+def throttle_body(
+    body: typing.Union[str, bytes, UploadBody], rate: float
+) -> ThrottledBody:
+    if isinstance(body, (str, bytes)) or hasattr(body, "__len__"):
+        return SizedThrottledBody(body, rate)
+    return ThrottledBody(body, rate)
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def open_body(
+    curl_request: "CurlRequest",
+) -> typing.Optional[typing.Union[str, bytes, UploadBody]]:
+    """Pick the request body out of `-T`, `--data-binary` and `-d`"""
+    if curl_request.upload_file is not None:
+        return FileBody(curl_request.upload_file)
+    if isinstance(curl_request.data_binary, bytes):
+        return curl_request.data_binary
+    if curl_request.data_binary is not None:
+        if curl_request.data_binary.startswith("@"):
+            return FileBody(curl_request.data_binary[1:])
+        return curl_request.data_binary
+    if curl_request.data is not None:
+        if curl_request.data.startswith("@"):
+            return StrippedFileBody(curl_request.data[1:])
+        return curl_request.data
+    return None
+
+
+def prepare_body(
+    curl_request: "CurlRequest", headers: typing.MutableMapping[str, str]
+) -> typing.Optional[typing.Union[str, bytes, UploadBody]]:
+    """Build the request body, adding the headers it implies to `headers`"""
+    body: typing.Optional[typing.Union[str, bytes, UploadBody]] = open_body(
+        curl_request
+    )
+    if curl_request.form:
+        body = MultipartEncoder(curl_request.form)
+        headers["Content-Type"] = body.content_type
+    elif (
+        curl_request.upload_file is None
+        and body is not None
+        and "Content-Type" not in headers
+    ):
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    if curl_request.compress_request and isinstance(body, (str, bytes)):
+        body = compress_body(body, headers)
+    if curl_request.limit_rate and body is not None:
+        body = throttle_body(body, curl_request.limit_rate)
+    timings = current_timings()
+    if timings is not None:
+        timings.size_upload = body_size(body)
+    return body
+
+
+def body_size(body: typing.Optional[typing.Union[str, bytes, UploadBody]]) -> int:
+    """Bytes that `body` sends, 0 if that isn't known before sending it"""
+    if isinstance(body, str):
+        return len(body.encode())
+    if body is not None and hasattr(body, "__len__"):
+        return len(body)  # type: ignore[arg-type]
+    return 0
@@ -0,0 +1,342 @@
+import re
+import threading
+import typing
+from urllib.parse import urljoin
+
+import urllib3
+from urllib3 import HTTPHeaderDict
+from urllib3 import PoolManager
+from urllib3.util import SKIP_HEADER
+from urllib3.util.retry import Retry
+
+from ._compression import accept_encoding
+from ._connection import KeepAlivePoolManager
+from ._connection import KeepAliveProxyManager
+from ._connection import pool_manager_gauges
+from ._dns import resolving
+from ._engines import HTTP_2_PRIOR_KNOWLEDGE
+from ._engines import Engine
+from ._engines import basic_auth_header
+from ._exceptions import HTTPStatusError
+from ._exceptions import UnsupportedOptionError
+from ._headers import EMPTY_HEADERS
+from ._headers import Headers
+from ._json import get_json_codec
+from ._metrics import PoolGauges
+from ._timings import Timings
+from ._timings import recording
+from ._uploads import UploadBody
+from ._uploads import prepare_body
+from .config import DEFAULT_POOL_LIMITS
+from .config import DEFAULT_USER_AGENT
+from .config import PoolLimits
+
+if typing.TYPE_CHECKING:
+    from ._curl import CurlRequest
+    from ._curl import CurlResponse
+
+# Same limit as requests, curl's own default is 50
+MAX_REDIRECTS = 30
+CHARSET = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+class RedirectsOnly(Retry):
+    """Follow redirects, but raise errors as they are
+
+    Failed attempts are retried by the dispatch layer, not by urllib3.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, **kwargs):
+        if error is not None:
+            raise error.with_traceback(kwargs.get("_stacktrace"))
+        return super().increment(method, url, response=response, **kwargs)
+
+
+class Urllib3Request:
+    __slots__ = ("method", "url", "headers", "body")
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        headers: HTTPHeaderDict,
+        body: typing.Optional[typing.Union[str, bytes, UploadBody]],
+    ):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+
+class Urllib3Response:
+    """The parts of `requests.Response` that `CurlResponse` relies on,
+    on top of a `urllib3.HTTPResponse`
+    """
+
+    __slots__ = ("raw", "request", "url", "_content")
+
+    def __init__(
+        self,
+        raw: urllib3.HTTPResponse,
+        url: str,
+        request: typing.Optional[Urllib3Request] = None,
+    ):
+        self.raw = raw
+        self.request = request
+        # urllib3 records redirect locations as the server sent them
+        for redirect in self.history:
+            if redirect.redirect_location:
+                url = urljoin(url, redirect.redirect_location)
+        self.url = url
+        self._content: typing.Optional[bytes] = None
+
+    @property
+    def status_code(self) -> int:
+        return self.raw.status
+
+    @property
+    def reason(self) -> str:
+        return self.raw.reason or ""
+
+    @property
+    def headers(self) -> HTTPHeaderDict:
+        return self.raw.headers
+
+    @property
+    def history(self) -> typing.Tuple[typing.Any, ...]:
+        retries = self.raw.retries
+        return tuple(retries.history) if retries is not None else ()
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self.raw.data or b""
+        return self._content
+
+    @property
+    def encoding(self) -> typing.Optional[str]:
+        content_type = self.headers.get("Content-Type")
+        if not content_type:
+            return None
+        match = CHARSET.search(content_type)
+        if match is not None:
+            return match.group(1)
+        if content_type.startswith("text/"):
+            return "ISO-8859-1"
+        if content_type.startswith("application/json"):
+            return "utf-8"
+        return None
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self) -> typing.Any:
+        return get_json_codec().loads(self.content)
+
+    def raise_for_status(self) -> None:
+        kind = {4: "Client", 5: "Server"}.get(self.status_code // 100)
+        if kind is not None:
+            raise HTTPStatusError(
+                "%d %s Error: %s for url: %s"
+                % (self.status_code, kind, self.reason, self.url)
+            )
+
+    def iter_content(self, chunk_size: int) -> typing.Iterator[bytes]:
+        if self._content is not None or self.raw.closed:
+            content = self.content
+            for i in range(0, len(content), chunk_size):
+                yield content[i : i + chunk_size]
+            return
+        yield from self.raw.stream(chunk_size, decode_content=True)
+
+    def iter_lines(self, chunk_size: int = 512) -> typing.Iterator[bytes]:
+        pending = b""
+        for chunk in self.iter_content(chunk_size):
+            lines = (pending + chunk).splitlines(keepends=True)
+            pending = lines.pop() if lines and not lines[-1].endswith(b"\n") else b""
+            for line in lines:
+                yield line.rstrip(b"\r\n")
+        if pending:
+            yield pending
+
+    def close(self) -> None:
+        # A partially read connection can't be reused, so it's closed first
+        self.raw.close()
+        self.raw.release_conn()
+
+
+class urllib3Engine(Engine):
+    """Engine sending requests straight through a shared `urllib3.PoolManager`
+
+    It skips the `requests.Session` machinery (hooks, adapters, cookies),
+    none of which a single curl invocation needs, so each call costs less
+    CPU than with the `requests` engine.
+    """
+
+    DEFAULT_HEADERS = Headers({"Accept": "*/*"})
+
+    def __init__(
+        self,
+        limits: typing.Optional[PoolLimits] = None,
+        max_concurrency: typing.Optional[int] = None,
+        proxies: typing.Optional[typing.Mapping[str, str]] = None,
+    ):
+        super().__init__(max_concurrency=max_concurrency, proxies=proxies)
+        self.limits = limits or DEFAULT_POOL_LIMITS
+        self._pool_manager: typing.Optional[KeepAlivePoolManager] = None
+        self._proxy_managers: typing.Dict[str, KeepAliveProxyManager] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool_manager(self) -> KeepAlivePoolManager:
+        """Long-lived pool manager whose connections are shared by every call"""
+        if self._pool_manager is None:
+            with self._lock:
+                if self._pool_manager is None:
+                    self._pool_manager = KeepAlivePoolManager(self.limits)
+        return self._pool_manager
+
+    def proxy_manager(self, proxy: str) -> KeepAliveProxyManager:
+        manager = self._proxy_managers.get(proxy)
+        if manager is None:
+            with self._lock:
+                manager = self._proxy_managers.get(proxy)
+                if manager is None:
+                    manager = self._proxy_managers[proxy] = KeepAliveProxyManager(
+                        proxy, self.limits
+                    )
+        return manager
+
+    def pool_gauges(self) -> typing.Dict[str, PoolGauges]:
+        managers: typing.List[PoolManager] = list(self._proxy_managers.values())
+        if self._pool_manager is not None:
+            managers.append(self._pool_manager)
+        gauges: typing.Dict[str, PoolGauges] = {}
+        for manager in managers:
+            for key, pool in pool_manager_gauges(manager).items():
+                gauges[key] = pool + gauges.get(key, PoolGauges())
+        return gauges
+
+    def close(self) -> None:
+        with self._lock:
+            pool_manager, self._pool_manager = self._pool_manager, None
+            proxy_managers = list(self._proxy_managers.values())
+            self._proxy_managers.clear()
+        if pool_manager is not None:
+            pool_manager.clear()
+        for manager in proxy_managers:
+            manager.clear()
+
+    def _convert_request(
+        self, curl_request: "CurlRequest"
+    ) -> typing.Tuple[Urllib3Request, typing.Dict[str, str]]:
+        if curl_request.http_version == HTTP_2_PRIOR_KNOWLEDGE:
+            msg = "The `urllib3` engine can't speak HTTP/2, use the `httpx` engine"
+            raise UnsupportedOptionError(msg)
+
+        # Repeated headers are sent one line each, as curl does
+        headers = HTTPHeaderDict()
+        for name, value in self.DEFAULT_HEADERS.with_headers(
+            curl_request.headers or EMPTY_HEADERS
+        ).multi_items():
+            headers.add(name, value)
+        body = prepare_body(curl_request, headers)
+        # Without `--compressed` curl sends no `Accept-Encoding` at all
+        headers.setdefault(
+            "Accept-Encoding",
+            accept_encoding() if curl_request.compressed else SKIP_HEADER,
+        )
+        headers["User-Agent"] = curl_request.user_agent or DEFAULT_USER_AGENT
+        if isinstance(body, UploadBody) and hasattr(body, "__len__"):
+            headers["Content-Length"] = str(len(body))
+        if curl_request.auth is not None:
+            headers.setdefault("Authorization", basic_auth_header(curl_request.auth))
+
+        request = Urllib3Request(
+            method=curl_request.method or "GET",
+            url=curl_request.url,
+            headers=headers,
+            body=body,
+        )
+        return request, self.get_proxies(curl_request.url)
+
+    def _send(
+        self,
+        request: Urllib3Request,
+        curl_request: "CurlRequest",
+        proxies: typing.Dict[str, str],
+    ) -> urllib3.HTTPResponse:
+        scheme = request.url.partition(":")[0].lower()
+        proxy = proxies.get(scheme)
+        manager = self.proxy_manager(proxy) if proxy else self.pool_manager
+        retries = (
+            RedirectsOnly(total=None, redirect=MAX_REDIRECTS)
+            if curl_request.follow_redirects
+            else False
+        )
+        return manager.urlopen(
+            request.method,
+            request.url,
+            body=request.body,
+            headers=request.headers,
+            retries=retries,
+            redirect=curl_request.follow_redirects,
+            preload_content=not curl_request.stream,
+            decode_content=True,
+        )
+
+    def handle_curl(self, request: "CurlRequest") -> "CurlResponse":
+        timings = Timings()
+        with recording(timings), resolving(request.resolver):
+            urllib3_request, proxies = self._convert_request(curl_request=request)
+            response = self._send(
+                urllib3_request, curl_request=request, proxies=proxies
+            )
+        return self._finish_response(
+            self._wrap_response(
+                request,
+                Urllib3Response(response, request.url, urllib3_request),
+                timings,
+            )
+        )
+
+    def _wrap_response(
+        self,
+        request: "CurlRequest",
+        response: Urllib3Response,
+        timings: typing.Optional[Timings] = None,
+    ) -> "CurlResponse":
+        from ._curl import CurlResponse
+
+        return CurlResponse(
+            status_code=response.status_code,
+            reason=response.reason,
+            raw_response=response,
+            request=request,
+            stream=response.iter_content,
+            close=response.close,
+            timings=timings,
+        )
+
+    def build_response(
+        self,
+        curl_request: "CurlRequest",
+        *,
+        status_code: int,
+        reason: str,
+        headers: typing.List[typing.Tuple[str, str]],
+        content: bytes,
+    ) -> "CurlResponse":
+        response = urllib3.HTTPResponse(
+            body=content,
+            headers=HTTPHeaderDict(headers),
+            status=status_code,
+            reason=reason,
+            preload_content=True,
+            decode_content=False,
+            request_url=curl_request.url,
+        )
+        return self._wrap_response(
+            curl_request, Urllib3Response(response, curl_request.url)
+        )
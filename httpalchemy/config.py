@@ -1,5 +1,99 @@
-import os
+import typing
 
-HTTP_PROXY = os.getenv("http_proxy")
-HTTPS_PROXY = os.getenv("https_proxy")
+# Proxies for every engine; when unset, `http_proxy`, `https_proxy`,
+# `all_proxy` and `no_proxy` are read from the environment on each call
+HTTP_PROXY: typing.Optional[str] = None
+HTTPS_PROXY: typing.Optional[str] = None
 DEFAULT_USER_AGENT = "python/httpalchemy"
+
+
+class PoolLimits:
+    """Connection pool settings shared by the pooled engines.
+
+    * `max_connections_per_host` - connections kept open for a single host
+    * `max_idle_connections` - idle keep-alive connections kept across all hosts
+    * `keepalive_expiry` - seconds an idle connection may be reused, `None` for no limit
+    * `block` - wait for a free connection instead of opening an extra one
+      when a host already has `max_connections_per_host` connections in use
+
+    httpx pools only have a cap across all hosts, so the `httpx` engine and
+    `AppEngine` ignore `max_connections_per_host` and `block`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections_per_host: int = 10,
+        max_idle_connections: int = 100,
+        keepalive_expiry: typing.Optional[float] = 5.0,
+        block: bool = False,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_idle_connections = max_idle_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.block = block
+
+    @property
+    def max_hosts(self) -> int:
+        """Number of per-host pools needed to hold `max_idle_connections`"""
+        return max(1, -(-self.max_idle_connections // self.max_connections_per_host))
+
+    def __repr__(self):
+        return (
+            "PoolLimits(max_connections_per_host=%d, max_idle_connections=%d, "
+            "keepalive_expiry=%r, block=%r)"
+        ) % (
+            self.max_connections_per_host,
+            self.max_idle_connections,
+            self.keepalive_expiry,
+            self.block,
+        )
+
+
+DEFAULT_POOL_LIMITS = PoolLimits()
+
+# Request bodies smaller than this aren't worth compressing
+COMPRESS_REQUEST_MIN_SIZE = 1024
+COMPRESS_REQUEST_LEVEL = 6
+
+# `--retry` backoff starts at one second and doubles up to ten minutes, like curl
+RETRY_INITIAL_DELAY = 1.0
+RETRY_MAX_DELAY = 600.0
+
+# Hedging needs enough latency samples for a host before it kicks in
+HEDGE_WINDOW = 1000
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MAX_WORKERS = 32
+
+# Addresses resolved for new connections are cached for this many seconds by
+# every engine; `None` disables the cache
+DNS_CACHE_TTL: typing.Optional[float] = None
+DNS_CACHE_SIZE = 1024
+
+# `segments` downloads don't split files in parts smaller than this
+SEGMENT_MIN_SIZE = 1024 * 1024
+
+# Codec for JSON bodies: "orjson", "ujson" or "json"; `None` picks the fastest
+# one installed
+JSON_CODEC: typing.Optional[str] = None
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+METRICS_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Directory (or `ReplayStore`) the "replay" engine serves responses from when
+# it isn't given one
+REPLAY_STORE: typing.Optional[typing.Any] = None
+# Records a `ReplayStore` keeps decoded, the least recently served are dropped
+REPLAY_DECODED_CACHE_SIZE = 1024
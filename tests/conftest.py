@@ -29,3 +29,48 @@ def ECHO_HEADERS(SERVER_URL):
 @pytest.fixture
 def JSON_URL(SERVER_URL):
     return SERVER_URL + "/json_url"
+
+
+@pytest.fixture
+def BYTES_URL(SERVER_URL):
+    return SERVER_URL + "/bytes/"
+
+
+@pytest.fixture
+def ECHO_FORM_URL(SERVER_URL):
+    return SERVER_URL + "/echo_form"
+
+
+@pytest.fixture
+def CACHED_URL(SERVER_URL):
+    return SERVER_URL + "/cached"
+
+
+@pytest.fixture
+def FLAKY_URL(SERVER_URL):
+    return SERVER_URL + "/flaky/"
+
+
+@pytest.fixture
+def SLOW_URL(SERVER_URL):
+    return SERVER_URL + "/slow"
+
+
+@pytest.fixture
+def RANGE_URL(SERVER_URL):
+    return SERVER_URL + "/range/"
+
+
+@pytest.fixture
+def ECHO_JSON_URL(SERVER_URL):
+    return SERVER_URL + "/echo_json"
+
+
+@pytest.fixture
+def NDJSON_URL(SERVER_URL):
+    return SERVER_URL + "/ndjson/"
+
+
+@pytest.fixture
+def CONCURRENCY_URL(SERVER_URL):
+    return SERVER_URL + "/concurrency/"
@@ -1,6 +1,13 @@
+import asyncio
+import gzip
+import re
+import typing
+
 from fastapi import FastAPI
 from fastapi import Request
 from fastapi import UploadFile
+from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 
 app = FastAPI()
 
@@ -12,6 +19,8 @@ async def root():
 
 
 @app.post("/echo_body")
+@app.put("/echo_body")
+@app.put("/echo_body/{name}")
 async def echo_body(req: Request):
     return await req.body()
 
@@ -26,16 +35,164 @@ async def upload_files(file: UploadFile, file1: UploadFile):
     return file.size + file1.size
 
 
+@app.post("/echo_form")
+async def echo_form(req: Request):
+    form = await req.form()
+    fields = {}
+    for key, value in form.items():
+        if isinstance(value, str):
+            fields[key] = value
+        else:
+            fields[key] = [value.filename, value.content_type, len(await value.read())]
+    return fields
+
+
+@app.post("/echo_json")
+async def echo_json(req: Request):
+    return {
+        "body": await req.json(),
+        "content_type": req.headers.get("content-type"),
+        "accept": req.headers.get("accept"),
+    }
+
+
+@app.get("/ndjson/{count}")
+async def ndjson(count: int):
+    async def body():
+        lines = b"".join(b'{"id": %d}\n' % i for i in range(count))
+        # Odd chunk sizes, so that lines are split across chunks
+        for offset in range(0, len(lines), 7):
+            yield lines[offset : offset + 7]
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
 @app.get("/echo_headers")
 async def echo_headers(req: Request):
     return req.headers
 
 
+@app.get("/echo_raw_headers")
+async def echo_raw_headers(req: Request):
+    return [[name.decode(), value.decode()] for name, value in req.headers.raw]
+
+
 @app.get("/json_url")
 async def json(data: dict):
     return data
 
 
+@app.post("/echo_gzip_body")
+async def echo_gzip_body(req: Request):
+    body = await req.body()
+    if req.headers.get("content-encoding") == "gzip":
+        body = gzip.decompress(body)
+    return {"body": body.decode(), "received": int(req.headers["content-length"])}
+
+
+@app.get("/gzip/{size}")
+async def gzip_bytes(size: int):
+    body = gzip.compress(b"x" * size)
+    return Response(content=body, headers={"Content-Encoding": "gzip"})
+
+
+@app.get("/cached")
+async def cached(
+    req: Request, max_age: int = 0, etag: str = '"v1"', compress: bool = False
+):
+    headers = {"Cache-Control": "max-age=%d" % max_age, "ETag": etag}
+    if req.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    authorization = req.headers.get("authorization")
+    content = etag if authorization is None else "%s %s" % (etag, authorization)
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=gzip.compress((content * 30).encode()), headers=headers)
+    return Response(content=content, headers=headers)
+
+
+@app.get("/redirect/{count}")
+async def redirect(count: int):
+    location = "/redirect/%d" % (count - 1) if count > 1 else "/"
+    return Response(status_code=302, headers={"Location": location})
+
+
+@app.get("/bytes/{size}")
+async def stream_bytes(size: int):
+    async def body():
+        chunk = b"x" * 1024
+        for offset in range(0, size, len(chunk)):
+            yield chunk[: size - offset]
+
+    return StreamingResponse(body(), media_type="application/octet-stream")
+
+
+@app.get("/range/{size}")
+async def byte_range(req: Request, size: int, ranges: bool = True):
+    body = bytes(i % 251 for i in range(size))
+    if not ranges:
+        return Response(content=body)
+    headers = {"Accept-Ranges": "bytes", "ETag": '"%d"' % size}
+    match = re.match(r"^bytes=(\d+)-(\d*)$", req.headers.get("range", ""))
+    changed = req.headers.get("if-range", headers["ETag"]) != headers["ETag"]
+    if match is None or changed:
+        return Response(content=body, headers=headers)
+    start = int(match.group(1))
+    end = min(int(match.group(2) or size - 1), size - 1)
+    if start >= size:
+        headers["Content-Range"] = "bytes */%d" % size
+        return Response(status_code=416, headers=headers)
+    headers["Content-Range"] = "bytes %d-%d/%d" % (start, end, size)
+    return Response(status_code=206, content=body[start : end + 1], headers=headers)
+
+
+@app.put("/discard")
+@app.post("/discard")
+async def discard(req: Request):
+    received = 0
+    async for chunk in req.stream():
+        received += len(chunk)
+    return {"received": received}
+
+
+FLAKY_ATTEMPTS: typing.Dict[str, int] = {}
+
+
+@app.get("/flaky/{key}")
+async def flaky(
+    key: str,
+    failures: int = 1,
+    retry_after: typing.Optional[int] = None,
+    delay: float = 0,
+):
+    attempts = FLAKY_ATTEMPTS[key] = FLAKY_ATTEMPTS.get(key, 0) + 1
+    await asyncio.sleep(delay)
+    if attempts <= failures:
+        headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+        return Response(status_code=503, headers=headers)
+    return {"attempts": attempts}
+
+
+@app.get("/slow")
+async def slow(delay: float = 0):
+    await asyncio.sleep(delay)
+    return {"delay": delay}
+
+
+# Requests in flight and their peak, by key and Host header
+CONCURRENCY: typing.Dict[str, typing.List[int]] = {}
+
+
+@app.get("/concurrency/{key}")
+async def concurrency(req: Request, key: str, delay: float = 0.05):
+    counter = CONCURRENCY.setdefault("%s@%s" % (key, req.headers["host"]), [0, 0])
+    counter[0] += 1
+    counter[1] = max(counter[1], counter[0])
+    await asyncio.sleep(delay)
+    counter[0] -= 1
+    return {"peak": counter[1]}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,89 @@
+import asyncio
+import tempfile
+
+import pytest
+
+from httpalchemy import AppEngine
+from httpalchemy._app_engine import detect_interface
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._exceptions import InvalidOptionError
+
+from .server import app as asgi_app
+
+URL = "http://testserver"
+
+
+def wsgi_app(environ, start_response):
+    body = environ["wsgi.input"].read()
+    content = b"%s %s %s" % (
+        environ["REQUEST_METHOD"].encode(),
+        environ["PATH_INFO"].encode(),
+        body,
+    )
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [content]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    with AppEngine(asgi_app) as engine:
+        yield engine
+
+
+def test_detect_interface():
+    assert detect_interface(asgi_app) == "asgi"
+    assert detect_interface(wsgi_app) == "wsgi"
+    with pytest.raises(InvalidOptionError):
+        AppEngine(wsgi_app, interface="rsgi")
+
+
+def test_asgi_app(engine):
+    response = curl(URL + "/", engine=engine)
+    assert response.status_code == 200
+    assert response.text == "200"
+    assert engine.pool_gauges() == {}
+
+
+def test_asgi_options(engine):
+    assert curl(URL + "/redirect/3", _L=True, engine=engine).text == "200"
+    assert curl(URL + "/redirect/3", engine=engine).status_code == 302
+    headers = curl(URL + "/echo_headers", _u="user:pass", engine=engine).json()
+    assert headers["authorization"] == "Basic dXNlcjpwYXNz"
+    with tempfile.NamedTemporaryFile() as f, tempfile.NamedTemporaryFile() as f1:
+        f.write(b"a" * 100)
+        f1.write(b"b" * 50)
+        f.flush()
+        f1.flush()
+        response = curl(
+            URL + "/files_upload",
+            _F=["file=@%s" % f.name, "file1=@%s" % f1.name],
+            _X="POST",
+            engine=engine,
+        )
+    assert response.json() == 150
+
+
+def test_asgi_stream(engine):
+    with curl(URL + "/bytes/3000", _N=True, engine=engine) as response:
+        assert len(b"".join(response.iter_bytes())) == 3000
+
+
+def test_async_asgi_app(engine):
+    async def main():
+        requests = (acurl(URL + "/", engine=engine) for _ in range(10))
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(main())
+    assert {response.status_code for response in responses} == {200}
+
+
+def test_wsgi_app():
+    with AppEngine(wsgi_app) as engine:
+        response = curl(URL + "/path", _X="POST", _d="body", engine=engine)
+        assert response.text == "POST /path body"
+
+        async def main():
+            return await acurl(URL + "/", engine=engine)
+
+        assert asyncio.run(main()).text == "GET / "
@@ -0,0 +1,48 @@
+import uuid
+from urllib.parse import urlsplit
+
+from httpalchemy._batch import curl_many
+from httpalchemy._exceptions import IncompatibleTypeError
+
+
+def test_batch_ordered_results(SERVER_URL, ECHO_BODY_URL):
+    specs = [
+        SERVER_URL,
+        (ECHO_BODY_URL, {"_X": "POST", "_d": "first"}),
+        {"url": ECHO_BODY_URL, "_X": "POST", "__data": "second"},
+    ]
+    results = list(curl_many(specs, max_workers=3))
+    assert [result.index for result in results] == [0, 1, 2]
+    assert results[0].response.status_code == 200
+    assert results[1].response.text == '"first"'
+    assert results[2].response.text == '"second"'
+
+
+def test_batch_collects_errors(SERVER_URL):
+    specs = [SERVER_URL, 5, "http://127.0.0.1:1", SERVER_URL]
+    results = list(curl_many(specs, max_per_host=1))
+    assert [result.failed for result in results] == [False, True, True, False]
+    assert isinstance(results[1].error, IncompatibleTypeError)
+
+
+def test_batch_unordered_results(SERVER_URL):
+    results = list(curl_many([SERVER_URL] * 20, ordered=False, max_per_host=2))
+    assert sorted(result.index for result in results) == list(range(20))
+    assert all(result.response.ok() for result in results)
+
+
+def test_batch_max_per_host(CONCURRENCY_URL):
+    key = uuid.uuid4().hex
+    hosts = ["127.0.0.1", "localhost"]
+    specs = [
+        CONCURRENCY_URL.replace("127.0.0.1", host) + key
+        for _ in range(10)
+        for host in hosts
+    ]
+    results = list(curl_many(specs, max_workers=10, max_per_host=2))
+    peaks = {host: 0 for host in hosts}
+    for result in results:
+        host = urlsplit(result.response.request.url).hostname
+        peaks[host] = max(peaks[host], result.response.json()["peak"])
+    # Both hosts run their requests side by side, each at most 2 at a time
+    assert peaks == {"127.0.0.1": 2, "localhost": 2}
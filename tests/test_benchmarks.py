@@ -0,0 +1,29 @@
+from benchmarks.run import compare
+from benchmarks.run import metric
+from benchmarks.run import percentile
+
+
+def test_compare_reports_regressions():
+    baseline = {
+        "latency": metric(10, "ms"),
+        "throughput": metric(100, "req/s", better="higher"),
+        "memory": metric(1, "MiB"),
+    }
+    results = {
+        "latency": metric(14, "ms"),
+        "throughput": metric(70, "req/s", better="higher"),
+        "memory": metric(1.1, "MiB"),
+    }
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert [regression.split(":")[0] for regression in regressions] == [
+        "latency",
+        "throughput",
+    ]
+    assert compare(results, baseline, tolerance=0.5) == []
+
+
+def test_percentile():
+    samples = [float(sample) for sample in range(100)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert percentile(samples, 100) == 99
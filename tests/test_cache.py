@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+import pytest
+
+from httpalchemy._cache import CacheEngine
+from httpalchemy._cache import CacheEntry
+from httpalchemy._cache import CacheStorage
+from httpalchemy._cache import FileCache
+from httpalchemy._cache import MemoryCache
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._engines import get_engine
+
+
+def make_entry(content=b"body", **headers):
+    return CacheEntry(
+        status_code=200,
+        reason="OK",
+        headers=list(headers.items()),
+        content=content,
+        stored_at=time.time(),
+        vary={},
+    )
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_cache_hit(CACHED_URL, engine):
+    cache = CacheEngine(engine)
+    first = curl(CACHED_URL + "?max_age=60", engine=cache)
+    assert first.cache_status == "MISS"
+    second = curl(CACHED_URL + "?max_age=60", engine=cache)
+    assert second.cache_status == "HIT"
+    assert second.text == '"v1"'
+    assert second.headers["ETag"] == '"v1"'
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_compressed_cache_hit(CACHED_URL, engine):
+    cache = CacheEngine(engine)
+    url = CACHED_URL + "?max_age=60&compress=true"
+    first = curl(url, engine=cache)
+    second = curl(url, engine=cache)
+    assert second.cache_status == "HIT"
+    assert second.content == first.content == b'"v1"' * 30
+    assert "Content-Encoding" not in second.headers
+    assert second.headers["Content-Length"] == str(len(second.content))
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_cache_revalidation(CACHED_URL, engine):
+    cache = CacheEngine(engine)
+    assert curl(CACHED_URL, engine=cache).cache_status == "MISS"
+    revalidated = curl(CACHED_URL, engine=cache)
+    assert revalidated.cache_status == "REVALIDATED"
+    assert revalidated.status_code == 200
+    assert revalidated.content == b'"v1"'
+
+    no_store = curl(CACHED_URL, _H=["Cache-Control: no-store"], engine=cache)
+    assert no_store.cache_status == "MISS"
+
+
+def test_cache_entries_are_per_credentials(CACHED_URL):
+    cache = CacheEngine()
+    url = CACHED_URL + "?max_age=60"
+    alice = curl(url, _u="alice:pw", engine=cache)
+    assert alice.cache_status == "MISS"
+    bob = curl(url, _u="bob:pw", engine=cache)
+    assert bob.cache_status == "MISS"
+    assert bob.text != alice.text
+    assert curl(url, _u="alice:pw", engine=cache).text == alice.text
+    assert curl(url, engine=cache).cache_status == "MISS"
+    header = curl(url, _H=["Authorization: Bearer token"], engine=cache)
+    assert header.cache_status == "MISS"
+    assert curl(url, _H=["Authorization: Bearer token"], engine=cache).text == (
+        header.text
+    )
+    assert curl(url, _H=["Authorization: Bearer other"], engine=cache).cache_status == (
+        "MISS"
+    )
+
+
+def test_range_requests_bypass_the_cache(CACHED_URL):
+    cache = CacheEngine()
+    url = CACHED_URL + "?max_age=60"
+    assert curl(url, engine=cache).cache_status == "MISS"
+    assert curl(url, _r="0-3", engine=cache).cache_status == "MISS"
+    assert curl(url, _r="0-3", engine=cache).cache_status == "MISS"
+    assert curl(url, engine=cache).cache_status == "HIT"
+
+
+def test_async_cache(CACHED_URL):
+    async def main():
+        cache = CacheEngine("httpx")
+        await acurl(CACHED_URL + "?max_age=60", engine=cache)
+        return await acurl(CACHED_URL + "?max_age=60", engine=cache)
+
+    assert asyncio.run(main()).cache_status == "HIT"
+
+
+def test_freshness():
+    assert make_entry(**{"Cache-Control": "max-age=60"}).is_fresh()
+    assert not make_entry(**{"Cache-Control": "max-age=60, no-cache"}).is_fresh()
+    assert not make_entry(**{"Cache-Control": "max-age=60", "Age": "61"}).is_fresh()
+    assert make_entry(
+        Date="Mon, 01 Jan 2024 00:00:00 GMT", Expires="Mon, 01 Jan 2024 00:01:00 GMT"
+    ).freshness_lifetime() == 60
+
+
+def test_memory_cache_eviction():
+    storage = MemoryCache(max_size=20)
+    storage.set("a", make_entry(b"x" * 8))
+    storage.set("b", make_entry(b"x" * 8))
+    storage.get("a")
+    storage.set("c", make_entry(b"x" * 8))
+    assert storage.get("b") is None
+    assert storage.get("a") is not None
+    assert storage.size == 16
+
+
+def test_file_cache(tmp_path):
+    storage = FileCache(str(tmp_path), max_size=300)
+    storage.set("a", make_entry(b"x" * 50, ETag='"a"'))
+    entry = FileCache(str(tmp_path)).get("a")
+    assert entry.content == b"x" * 50
+    assert entry.header("etag") == '"a"'
+
+    storage.set("b", make_entry(b"x" * 50))
+    assert storage.get("a") is None
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_etag_save_and_compare(CACHED_URL, tmp_path):
+    etag_file = str(tmp_path / "etag")
+    resp = curl(CACHED_URL, __etag_compare=etag_file, __etag_save=etag_file)
+    assert resp.status_code == 200
+    resp = curl(CACHED_URL, __etag_compare=etag_file)
+    assert resp.status_code == 304
+
+
+def test_closing_the_cache_keeps_the_shared_engine(CACHED_URL):
+    shared = get_engine("urllib3")
+    with CacheEngine("urllib3") as cache:
+        curl(CACHED_URL, engine=cache)
+    assert shared.pool_gauges()["127.0.0.1:7575"].idle >= 1
+
+
+def test_cache_storage_is_abstract():
+    with pytest.raises(TypeError):
+        CacheStorage()
@@ -0,0 +1,192 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+from httpalchemy._coalesce import SingleFlight
+from httpalchemy._coalesce import coalesce_key
+from httpalchemy._coalesce import single_flight
+from httpalchemy._curl import acurl
+from httpalchemy._curl import create_curl_request
+from httpalchemy._curl import curl
+from httpalchemy._engines import get_engine
+from httpalchemy._exceptions import DownloadError
+from httpalchemy._exceptions import OperationTimeoutError
+
+
+def curl_in_threads(count, *args, **kwargs):
+    barrier = threading.Barrier(count)
+    responses = [None] * count
+
+    def run(index):
+        barrier.wait()
+        responses[index] = curl(*args, **kwargs)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def test_coalesce_key():
+    engine = get_engine("requests")
+
+    def key(**options):
+        return coalesce_key(engine, create_curl_request("http://a/", **options))
+
+    assert key() == key()
+    assert key(_H=["X-A: 1", "X-B: 2"]) == key(_H=["x-b: 2", "X-A: 1"])
+    assert key(_H=["X-A: 1"]) != key(_H=["X-A: 2"])
+    assert key(_u="a:b") != key()
+    assert key() != coalesce_key(get_engine("httpx"), create_curl_request("http://a/"))
+    for options in (
+        {"_X": "POST"},
+        {"_d": "body"},
+        {"_N": True},
+        {"_o": "out"},
+        {"_w": "%{http_code}"},
+    ):
+        assert key(**options) is None
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_coalesced_requests(FLAKY_URL, engine):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=0&delay=0.3"
+    responses = curl_in_threads(5, url, coalesce=True, engine=engine)
+    assert {response.json()["attempts"] for response in responses} == {1}
+    # Every caller gets a response of its own over one body
+    assert len({id(response) for response in responses}) == 5
+    assert len({id(response.content) for response in responses}) == 1
+    assert len({id(response.timings) for response in responses}) == 5
+    assert {response.request.url for response in responses} == {url}
+    assert len(single_flight) == 0
+    # Once the call is over, the next one goes upstream again
+    assert curl(url, coalesce=True, engine=engine).json()["attempts"] == 2
+
+
+def test_requests_are_not_coalesced_by_default(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=0&delay=0.2"
+    responses = curl_in_threads(3, url)
+    assert sorted(response.json()["attempts"] for response in responses) == [1, 2, 3]
+
+
+def test_different_requests_are_not_coalesced(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=0&delay=0.2"
+    barrier = threading.Barrier(2)
+    responses = {}
+
+    def run(name, headers):
+        barrier.wait()
+        responses[name] = curl(url, _H=headers, coalesce=True)
+
+    threads = [
+        threading.Thread(target=run, args=("a", ["X-Tenant: a"])),
+        threading.Thread(target=run, args=("b", ["X-Tenant: b"])),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {response.json()["attempts"] for response in responses.values()} == {
+        1,
+        2,
+    }
+
+
+def test_coalesced_errors():
+    responses = []
+    errors = []
+    barrier = threading.Barrier(3)
+
+    def run():
+        barrier.wait()
+        try:
+            responses.append(curl("http://127.0.0.1:1/", coalesce=True))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not responses
+    assert len(errors) == 3
+    assert len(single_flight) == 0
+
+
+def test_followers_get_errors_of_their_own():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def send():
+        release.wait()
+        raise DownloadError("lost")
+
+    def run():
+        try:
+            flight.call("key", create_curl_request("http://a/"), send)
+        except DownloadError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert [str(error) for error in errors] == ["lost"] * 3
+    assert len({id(error) for error in errors}) == 3
+
+
+def test_followers_wait_at_most_coalesce_timeout(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=0&delay=0.5"
+    leader = threading.Thread(target=curl, args=(url,), kwargs={"coalesce": True})
+    leader.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    with pytest.raises(OperationTimeoutError):
+        curl(url, coalesce=True, coalesce_timeout=0.1)
+    assert time.monotonic() - started < 0.35
+    leader.join()
+
+    async def main():
+        leader = asyncio.ensure_future(acurl(url, coalesce=True))
+        await asyncio.sleep(0.1)
+        with pytest.raises(OperationTimeoutError):
+            await acurl(url, coalesce=True, coalesce_timeout=0.1)
+        return await leader
+
+    assert asyncio.run(main()).json()["attempts"] == 2
+
+
+def test_asynchronous_coalescing(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=0&delay=0.3"
+
+    async def main():
+        requests = (acurl(url, coalesce=True) for _ in range(10))
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(main())
+    assert {response.json()["attempts"] for response in responses} == {1}
+    assert len({id(response.content) for response in responses}) == 1
+    assert len(single_flight) == 0
+
+
+def test_cancelled_caller_keeps_the_call(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=0&delay=0.3"
+
+    async def main():
+        first = asyncio.ensure_future(acurl(url, coalesce=True))
+        second = asyncio.ensure_future(acurl(url, coalesce=True))
+        await asyncio.sleep(0.1)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()).json()["attempts"] == 1
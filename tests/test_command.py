@@ -0,0 +1,42 @@
+import pytest
+
+from httpalchemy._command import curl_cmd
+from httpalchemy._command import parse_command
+from httpalchemy._exceptions import UnsupportedOptionError
+
+
+def test_command_parsing():
+    url, options = parse_command(
+        "curl -sSL -XPOST http://example.com -H 'A: 1' --header \"B: 2\" "
+        "-d a=1 --data b=2 --http2"
+    )
+    assert url == "http://example.com"
+    assert dict(options) == {
+        "_L": True,
+        "_X": "POST",
+        "_H": ("A: 1", "B: 2"),
+        "_d": "a=1&b=2",
+        "__http2": True,
+    }
+
+
+def test_command_cache():
+    parse_command.cache_clear()
+    parse_command("curl http://example.com")
+    parse_command("curl http://example.com")
+    assert parse_command.cache_info().hits == 1
+
+
+def test_command_errors():
+    with pytest.raises(UnsupportedOptionError):
+        parse_command("curl --no-such-option http://example.com")
+    with pytest.raises(UnsupportedOptionError):
+        parse_command("curl -X")
+    with pytest.raises(UnsupportedOptionError):
+        parse_command("curl -X POST")
+
+
+def test_curl_cmd(ECHO_BODY_URL):
+    resp = curl_cmd("curl -X POST %s \\\n  --data key=value" % ECHO_BODY_URL)
+    assert resp.status_code == 200
+    assert resp.text == '"key=value"'
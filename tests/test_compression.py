@@ -0,0 +1,52 @@
+import pytest
+
+from httpalchemy._compression import accept_encoding
+from httpalchemy._curl import curl
+
+
+@pytest.mark.parametrize(
+    "engine, library",
+    [("requests", "urllib3"), ("httpx", "httpx"), ("urllib3", "urllib3")],
+)
+def test_compressed_negotiation(ECHO_HEADERS, engine, library):
+    headers = curl(ECHO_HEADERS, __compressed=True, engine=engine).json()
+    assert headers["accept-encoding"] == accept_encoding(library)
+    assert accept_encoding(library).startswith("gzip, deflate")
+
+    headers = curl(ECHO_HEADERS, engine=engine).json()
+    assert headers.get("accept-encoding", "identity") == "identity"
+
+
+def test_accept_encoding_lists_decodable_encodings():
+    from httpx._decoders import SUPPORTED_DECODERS
+    from urllib3.util.request import ACCEPT_ENCODING
+
+    for library, decodable in (
+        ("urllib3", ACCEPT_ENCODING.split(",")),
+        ("httpx", SUPPORTED_DECODERS),
+    ):
+        encodings = accept_encoding(library).split(", ")
+        assert all(encoding in decodable for encoding in encodings)
+        assert ("zstd" in encodings) == ("zstd" in decodable)
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_compressed_streaming_decode(SERVER_URL, engine):
+    with curl(
+        SERVER_URL + "/gzip/200000", _N=True, __compressed=True, engine=engine
+    ) as resp:
+        chunks = list(resp.iter_bytes(chunk_size=8192))
+    assert b"".join(chunks) == b"x" * 200000
+    assert len(chunks) > 1
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_request_compression(SERVER_URL, engine):
+    url = SERVER_URL + "/echo_gzip_body"
+    body = "key=value&" * 1000
+    resp = curl(url, _X="POST", _d=body, compress_request=True, engine=engine)
+    assert resp.json()["body"] == body
+    assert resp.json()["received"] < len(body)
+
+    resp = curl(url, _X="POST", _d="small", compress_request=True, engine=engine)
+    assert resp.json() == {"body": "small", "received": 5}
@@ -88,3 +88,15 @@ def test_curl_request_generating():
     assert curl_request.follow_redirects
     assert curl_request.verbose
     assert curl_request.form == {"key1": "val1"}
+
+
+def test_long_option_aliases():
+    curl_request = create_curl_request(
+        "http://example.com", __request="POST", __data="key=value", __location=True
+    )
+    assert curl_request.method == "POST"
+    assert curl_request.data == "key=value"
+    assert curl_request.follow_redirects
+
+    with pytest.raises(RepeatedAliasesError):
+        create_curl_request("http://example.com", _X="PUT", __request="POST")
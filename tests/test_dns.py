@@ -0,0 +1,139 @@
+import asyncio
+import socket
+
+import pytest
+
+import httpalchemy.config
+from httpalchemy._command import curl_cmd
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._dns import Resolver
+from httpalchemy._dns import dns_cache
+from httpalchemy._engines import httpxEngine
+from httpalchemy._engines import requestsEngine
+from httpalchemy._engines import urllib3Engine
+from httpalchemy._exceptions import InvalidOptionError
+from httpalchemy.config import PoolLimits
+
+ENGINES = {
+    "requests": requestsEngine,
+    "httpx": httpxEngine,
+    "urllib3": urllib3Engine,
+}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(httpalchemy.config, "DNS_CACHE_TTL", 60.0)
+    dns_cache.clear()
+    yield dns_cache
+    dns_cache.clear()
+
+
+def test_parse_entries():
+    resolver = Resolver(
+        resolve=["Example.com:443:127.0.0.1,[::1]", "-gone.com:80"],
+        connect_to=["example.com:443:other.com:8443", "::[::1]:"],
+    )
+    assert resolver.resolve == (("example.com", 443, ("127.0.0.1", "::1")),)
+    assert resolver.route("example.com", 443) == ("other.com", 8443)
+    assert resolver.route("EXAMPLE.com", 80) == ("::1", 80)
+    assert resolver == Resolver(
+        resolve=["example.com:443:127.0.0.1,[::1]"],
+        connect_to=["example.com:443:other.com:8443", "::[::1]:"],
+    )
+    assert not Resolver()
+
+    addresses = resolver.getaddrinfo("example.com", 443, socket.AF_INET)
+    assert [address[4] for address in addresses] == [("127.0.0.1", 443)]
+
+
+@pytest.mark.parametrize("entry", ["example.com:443", "example.com:port:1.2.3.4"])
+def test_invalid_resolve(entry):
+    with pytest.raises(InvalidOptionError):
+        curl("http://example.com", __resolve=entry)
+
+
+def test_invalid_connect_to():
+    with pytest.raises(InvalidOptionError):
+        curl("http://example.com", __connect_to="example.com:80")
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_resolve(SERVER_URL, engine):
+    with ENGINES[engine]() as engine_instance:
+        response = curl(
+            "http://pinned.test:7575/echo_headers",
+            __resolve="pinned.test:7575:127.0.0.1",
+            engine=engine_instance,
+        )
+    assert response.json()["host"] == "pinned.test:7575"
+    assert response.timings.num_dns_cache_hits == 1
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_connect_to(SERVER_URL, engine):
+    with ENGINES[engine]() as engine_instance:
+        response = curl(
+            "http://rerouted.test/echo_headers",
+            __connect_to=["other.test::localhost:1", "rerouted.test:80:127.0.0.1:7575"],
+            engine=engine_instance,
+        )
+    assert response.json()["host"] == "rerouted.test"
+
+
+def test_async_connect_to():
+    async def main():
+        async with httpxEngine() as engine:
+            return await acurl(
+                "http://rerouted.test/echo_headers",
+                __connect_to="::127.0.0.1:7575",
+                engine=engine,
+            )
+
+    assert asyncio.run(main()).json()["host"] == "rerouted.test"
+
+
+def test_resolve_from_command(capsys):
+    response = curl_cmd(
+        "curl -w '%{num_dns_cache_hits}' --resolve pinned.test:7575:127.0.0.1 "
+        "--resolve other.test:7575:127.0.0.2 http://pinned.test:7575/echo_headers"
+    )
+    assert response.json()["host"] == "pinned.test:7575"
+    assert capsys.readouterr().out == "1"
+
+
+def test_connections_follow_the_resolver(SERVER_URL):
+    with requestsEngine() as engine:
+        assert curl(SERVER_URL, engine=engine).timings.num_connects == 1
+        pinned = curl(SERVER_URL, __resolve="127.0.0.1:7575:127.0.0.1", engine=engine)
+        assert pinned.timings.num_connects == 1
+        assert curl(SERVER_URL, engine=engine).timings.num_connects == 1
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_dns_cache(cache, engine):
+    url = "http://localhost:7575/"
+    # Without keep-alive every request opens a new connection
+    with ENGINES[engine](limits=PoolLimits(keepalive_expiry=0)) as engine_instance:
+        first = curl(url, engine=engine_instance).timings
+        second = curl(url, engine=engine_instance).timings
+    assert (first.num_dns_lookups, first.num_dns_cache_hits) == (1, 0)
+    assert (second.num_dns_lookups, second.num_dns_cache_hits) == (1, 1)
+
+
+def test_dns_cache_disabled():
+    dns_cache.set(("localhost", 80, 0), [])
+    assert len(dns_cache) == 0
+
+
+def test_dns_cache_eviction(cache, monkeypatch):
+    monkeypatch.setattr(httpalchemy.config, "DNS_CACHE_SIZE", 2)
+    for host in ("a", "b", "c"):
+        cache.set((host, 80, 0), [])
+    assert cache.get(("a", 80, 0)) is None
+    assert cache.get(("b", 80, 0)) == []
+
+    monkeypatch.setattr(httpalchemy.config, "DNS_CACHE_TTL", 1e-9)
+    cache.set(("d", 80, 0), [])
+    assert cache.get(("d", 80, 0)) is None
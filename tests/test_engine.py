@@ -1,4 +1,7 @@
 from tempfile import NamedTemporaryFile
+
+import pytest
+
 from httpalchemy._engines import requestsEngine
 from httpalchemy._curl import curl
 from httpalchemy._curl import create_curl_request
@@ -71,3 +74,299 @@ def test_requests_proxy(monkeypatch):
     assert proxies == {"http": "http://example.com",
                               "https": "https://example.com"}
 
+
+
+def pooled_connections(engine, url):
+    poolmanager = engine.session.get_adapter(url).poolmanager
+    pools = [poolmanager.pools[key] for key in poolmanager.pools.keys()]
+    return sum(pool.num_connections for pool in pools)
+
+
+def test_requests_session_reuse(SERVER_URL):
+    with requestsEngine() as engine:
+        session = engine.session
+        curl(SERVER_URL, engine=engine)
+        curl(SERVER_URL, engine=engine)
+        assert engine.session is session
+        assert pooled_connections(engine, SERVER_URL) == 1
+    assert engine._session is None
+
+
+def test_requests_pool_limits():
+    from httpalchemy.config import PoolLimits
+
+    limits = PoolLimits(
+        max_connections_per_host=4, max_idle_connections=10, keepalive_expiry=1.5
+    )
+    engine = requestsEngine(limits=limits)
+    poolmanager = engine.session.get_adapter("http://example.com").poolmanager
+    pool = poolmanager.connection_from_url("http://example.com")
+    assert pool.pool.maxsize == 4
+    assert pool.keepalive_expiry == 1.5
+    assert poolmanager.pools._maxsize == 3
+    engine.close()
+
+
+def test_requests_keepalive_expiry(SERVER_URL):
+    from httpalchemy.config import PoolLimits
+
+    with requestsEngine(limits=PoolLimits(keepalive_expiry=0)) as engine:
+        curl(SERVER_URL, engine=engine)
+        curl(SERVER_URL, engine=engine)
+        assert pooled_connections(engine, SERVER_URL) == 2
+
+
+def test_shared_engine():
+    from httpalchemy._engines import engines
+    from httpalchemy._engines import get_engine
+
+    assert get_engine("requests") is get_engine(engines.requests)
+    engine = requestsEngine()
+    assert get_engine(engine) is engine
+
+
+def test_httpx_simple_request(SERVER_URL):
+    resp = curl(SERVER_URL, engine="httpx")
+    assert resp.status_code == 200
+    assert resp.reason == "OK"
+    assert list(resp.iter_lines()) == [b"200"]
+
+
+def test_httpx_body_sending(ECHO_BODY_URL):
+    resp = curl(ECHO_BODY_URL, _X="POST", _d="key=value", engine="httpx")
+    assert resp.text == '"key=value"'
+    assert (
+        resp.raw.request.headers["Content-Type"] == "application/x-www-form-urlencoded"
+    )
+
+
+def test_httpx_multipart_sending(FILE_UPLOAD_URL):
+    with NamedTemporaryFile(mode="wb+", buffering=0) as f:
+        f.write(b"test-data")
+        resp = curl(FILE_UPLOAD_URL, _F=[f"file=@{f.name}"], _X="POST", engine="httpx")
+        assert resp.status_code == 200
+        assert resp.text == "9"
+
+
+def test_httpx_headers_building(ECHO_HEADERS):
+    resp = curl(ECHO_HEADERS, _A="My-Agent", _u="user:pass", engine="httpx")
+    headers = resp.json()
+    assert headers["user-agent"] == "My-Agent"
+    assert headers["authorization"] == "Basic dXNlcjpwYXNz"
+    assert headers["accept"] == "*/*"
+    assert "accept-encoding" not in headers
+
+
+def test_httpx_clients_per_http_version():
+    from httpalchemy._engines import httpxEngine
+
+    with httpxEngine() as engine:
+        http1 = engine.get_client(create_curl_request("http://example.com"), {})
+        http2 = engine.get_client(
+            create_curl_request("http://example.com", __http2=True), {}
+        )
+        assert http1 is not http2
+        assert http1 is engine.get_client(create_curl_request("http://a.com"), {})
+
+
+def test_requests_http2_prior_knowledge():
+    from httpalchemy._exceptions import UnsupportedOptionError
+
+    curl_request = create_curl_request(
+        "http://example.com", __http2_prior_knowledge=True
+    )
+    with pytest.raises(UnsupportedOptionError):
+        requestsEngine()._convert_request(curl_request=curl_request)
+
+
+def test_httpx_async_requests(CONCURRENCY_URL, ECHO_BODY_URL):
+    import asyncio
+    import uuid
+
+    from httpalchemy._curl import acurl
+    from httpalchemy._engines import httpxEngine
+
+    url = CONCURRENCY_URL + uuid.uuid4().hex
+
+    async def main():
+        async with httpxEngine(max_concurrency=4) as engine:
+            responses = await asyncio.gather(
+                *(acurl(url, engine=engine) for _ in range(20))
+            )
+            assert all(resp.status_code == 200 for resp in responses)
+            # The server saw at most 4 of the requests at once
+            assert max(resp.json()["peak"] for resp in responses) == 4
+
+            resp = await acurl(ECHO_BODY_URL, _X="POST", _d="data", engine=engine)
+            assert resp.text == '"data"'
+
+    asyncio.run(main())
+
+
+def test_httpx_async_clients_are_closed(SERVER_URL):
+    import asyncio
+    import threading
+
+    from httpalchemy._curl import acurl
+    from httpalchemy._engines import httpxEngine
+
+    engine = httpxEngine()
+    background = asyncio.new_event_loop()
+    thread = threading.Thread(target=background.run_forever, daemon=True)
+    thread.start()
+
+    async def request():
+        await acurl(SERVER_URL, engine=engine)
+        return list(engine._async_clients[asyncio.get_running_loop()].values())
+
+    async def main():
+        clients = await request()
+        background_clients = asyncio.run_coroutine_threadsafe(
+            request(), background
+        ).result()
+        await engine.aclose()
+        return clients, background_clients
+
+    try:
+        clients, background_clients = asyncio.run(main())
+        assert all(client.is_closed for client in clients)
+        # Clients of another loop are closed on that loop
+        for _ in range(100):
+            if all(client.is_closed for client in background_clients):
+                break
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.01), background).result()
+        assert all(client.is_closed for client in background_clients)
+        assert not engine._async_clients
+    finally:
+        background.call_soon_threadsafe(background.stop)
+        thread.join()
+        background.close()
+
+
+def test_requests_async_fallback(SERVER_URL):
+    import asyncio
+
+    from httpalchemy._curl import acurl
+
+    resp = asyncio.run(acurl(SERVER_URL, engine="requests"))
+    assert resp.status_code == 200
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_streaming_response(BYTES_URL, engine):
+    with curl(BYTES_URL + "100000", _N=True, engine=engine) as resp:
+        chunks = list(resp.iter_bytes(chunk_size=4096))
+        assert sum(map(len, chunks)) == 100000
+        assert resp.closed
+
+    resp = curl(BYTES_URL + "10000", __no_buffer=True, engine=engine)
+    buffer = bytearray(4096)
+    received = bytearray()
+    while True:
+        size = resp.readinto(buffer)
+        if not size:
+            break
+        received += buffer[:size]
+    assert received == b"x" * 10000
+    assert resp.closed
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_output_file(BYTES_URL, engine):
+    with NamedTemporaryFile() as f:
+        resp = curl(BYTES_URL + "50000", _o=f.name, engine=engine)
+        assert resp.closed
+        assert f.read() == b"x" * 50000
+
+
+def test_streaming_releases_connection(BYTES_URL):
+    with requestsEngine() as engine:
+        for _ in range(3):
+            resp = curl(BYTES_URL + "10000", _N=True, engine=engine)
+            for _ in resp.iter_bytes():
+                ...
+        assert pooled_connections(engine, BYTES_URL) == 1
+
+
+def test_async_output_file(BYTES_URL):
+    import asyncio
+
+    from httpalchemy._curl import acurl
+
+    with NamedTemporaryFile() as f:
+        resp = asyncio.run(acurl(BYTES_URL + "50000", __output=f.name))
+        assert resp.closed
+        assert f.read() == b"x" * 50000
+
+
+def test_urllib3_simple_request(SERVER_URL):
+    resp = curl(SERVER_URL, engine="urllib3")
+    assert resp.status_code == 200
+    assert resp.reason == "OK"
+    assert list(resp.iter_lines()) == [b"200"]
+
+
+def test_urllib3_body_sending(ECHO_BODY_URL):
+    resp = curl(ECHO_BODY_URL, _X="POST", _d="key=value", engine="urllib3")
+    assert resp.text == '"key=value"'
+    assert (
+        resp.raw.request.headers["Content-Type"] == "application/x-www-form-urlencoded"
+    )
+
+
+def test_urllib3_multipart_sending(FILE_UPLOAD_URL):
+    with NamedTemporaryFile(mode="wb+", buffering=0) as f:
+        f.write(b"test-data")
+        resp = curl(
+            FILE_UPLOAD_URL, _F=[f"file=@{f.name}"], _X="POST", engine="urllib3"
+        )
+        assert resp.status_code == 200
+        assert resp.text == "9"
+
+
+def test_urllib3_headers_building(ECHO_HEADERS):
+    resp = curl(ECHO_HEADERS, _A="My-Agent", _u="user:pass", engine="urllib3")
+    headers = resp.json()
+    assert headers["user-agent"] == "My-Agent"
+    assert headers["authorization"] == "Basic dXNlcjpwYXNz"
+    assert headers["accept"] == "*/*"
+    assert "accept-encoding" not in headers
+
+
+def test_urllib3_redirects(SERVER_URL):
+    resp = curl(SERVER_URL + "/redirect/2", engine="urllib3")
+    assert resp.status_code == 302
+    assert resp.headers["Location"] == "/redirect/1"
+
+    resp = curl(SERVER_URL + "/redirect/2", _L=True, engine="urllib3")
+    assert resp.status_code == 200
+    assert resp.write_out("%{num_redirects} %{url_effective}") == "2 %s/" % SERVER_URL
+
+
+def test_urllib3_streaming(BYTES_URL, tmp_path):
+    output = tmp_path / "body"
+    resp = curl(BYTES_URL + "100000", _o=str(output), engine="urllib3")
+    assert resp.closed
+    assert output.stat().st_size == 100000
+
+
+def test_urllib3_raise_for_status(FLAKY_URL):
+    import uuid
+
+    from httpalchemy._exceptions import HTTPStatusError
+
+    resp = curl(FLAKY_URL + uuid.uuid4().hex, engine="urllib3")
+    assert resp.status_code == 503
+    with pytest.raises(HTTPStatusError):
+        resp.raise_for_status()
+
+
+def test_urllib3_pool_reuse(SERVER_URL):
+    from httpalchemy._engines import urllib3Engine
+
+    with urllib3Engine() as engine:
+        curl(SERVER_URL, engine=engine)
+        curl(SERVER_URL, engine=engine)
+        pool = engine.pool_manager.connection_from_url(SERVER_URL)
+        assert pool.num_connections == 1
+    assert engine._pool_manager is None
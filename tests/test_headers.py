@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from httpalchemy._curl import create_curl_request
+from httpalchemy._curl import curl
+from httpalchemy._curl import normalize_headers
+from httpalchemy._engines import requestsEngine
+from httpalchemy._headers import Headers
+
+
+def test_headers_are_case_insensitive_and_keep_repeats():
+    headers = Headers([("X-A", "1"), ("Accept", "*/*"), ("x-a", "2")])
+    assert headers["x-a"] == "1, 2"
+    assert headers.get_list("X-A") == ["1", "2"]
+    assert "ACCEPT" in headers
+    assert list(headers) == ["X-A", "Accept"]
+    assert len(headers) == 2
+    assert headers.multi_items() == (("X-A", "1"), ("Accept", "*/*"), ("x-a", "2"))
+    assert headers == {"x-a": "1, 2", "accept": "*/*"}
+    assert headers == Headers([("x-a", "1, 2"), ("ACCEPT", "*/*")])
+    assert hash(headers) == hash(Headers({"accept": "*/*", "X-A": "1, 2"}))
+    assert headers != {"x-a": "1"}
+
+
+def test_headers_are_immutable():
+    headers = Headers({"Accept": "*/*"})
+    with pytest.raises(TypeError):
+        headers["Accept"] = "text/plain"  # type: ignore[index]
+    with pytest.raises(AttributeError):
+        headers.extra = True  # type: ignore[attr-defined]
+
+    replaced = headers.with_header("accept", "text/plain")
+    assert headers["Accept"] == "*/*"
+    assert replaced.multi_items() == (("accept", "text/plain"),)
+    assert headers.with_default("ACCEPT", "text/plain") is headers
+    assert headers.with_default("X-A", "1")["x-a"] == "1"
+    assert headers.without("accept") == {}
+    assert Headers(headers) == headers
+
+
+def test_normalize_headers_keeps_repeats():
+    headers = normalize_headers(["X-A: 1", "X-A: 2"])
+    assert headers.get_list("x-a") == ["1", "2"]
+    assert normalize_headers(headers) is headers
+
+
+def test_repeated_headers_are_sent(SERVER_URL):
+    response = curl(
+        SERVER_URL + "/echo_raw_headers", _H=["X-A: 1", "x-a: 2"], engine="httpx"
+    )
+    assert [value for name, value in response.json() if name == "x-a"] == ["1", "2"]
+
+    # requests can only send one line per name
+    response = curl(SERVER_URL + "/echo_raw_headers", _H=["X-A: 1", "x-a: 2"])
+    assert [value for name, value in response.json() if name == "x-a"] == ["1, 2"]
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_headers_dont_leak_between_calls(ECHO_HEADERS, engine):
+    curl(ECHO_HEADERS, _H=["X-Leak: 1"], _d="a=1", engine=engine)
+    headers = curl(ECHO_HEADERS, engine=engine).json()
+    assert "x-leak" not in headers
+    assert "content-type" not in headers
+    assert requestsEngine.DEFAULT_HEADERS == {"Accept": "*/*"}
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_auth(ECHO_HEADERS, engine):
+    headers = curl(ECHO_HEADERS, _u="user:pass", engine=engine).json()
+    assert headers["authorization"] == "Basic dXNlcjpwYXNz"
+
+
+def test_concurrent_requests_share_headers(ECHO_HEADERS):
+    curl_request = create_curl_request(ECHO_HEADERS, _H=["X-Shared: 1"])
+    results = []
+
+    def send(index):
+        headers = curl(
+            ECHO_HEADERS, _H=curl_request.headers.with_header("X-Index", str(index))
+        ).json()
+        results.append(headers["x-index"] == str(index) and headers["x-shared"] == "1")
+
+    threads = [threading.Thread(target=send, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [True] * 8
+
+
+def test_slots():
+    curl_request = create_curl_request("http://example.com")
+    with pytest.raises(AttributeError):
+        curl_request.unknown = True  # type: ignore[attr-defined]
+    assert not hasattr(curl_request, "__dict__")
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+from httpalchemy import JSONCodec
+from httpalchemy import set_json_codec
+from httpalchemy._command import curl_cmd
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._exceptions import InvalidOptionError
+from httpalchemy._json import get_json_codec
+from httpalchemy._json import iter_json_lines
+from httpalchemy._json import load_json_codec
+
+
+@pytest.fixture
+def codec():
+    yield
+    set_json_codec(None)
+
+
+def test_json_codecs(codec):
+    for name in ("json", "orjson"):
+        pytest.importorskip(name)
+        set_json_codec(name)
+        assert get_json_codec().name == name
+        assert get_json_codec().loads(b'{"a": [1, "\\u00e9"]}') == {"a": [1, "é"]}
+        assert json.loads(get_json_codec().dumps({"a": "é"})) == {"a": "é"}
+    with pytest.raises(InvalidOptionError):
+        load_json_codec("simdjson")
+
+
+def test_custom_json_codec(ECHO_JSON_URL, codec):
+    decoded = []
+
+    def loads(data):
+        decoded.append(data)
+        return json.loads(data)
+
+    set_json_codec(
+        JSONCodec("counting", loads, lambda value: json.dumps(value).encode())
+    )
+    assert repr(get_json_codec()) == "<JSONCodec [counting]>"
+    resp = curl(ECHO_JSON_URL, __json={"a": 1})
+    assert resp.json()["body"] == {"a": 1}
+    assert resp.json() is resp.json()
+    assert len(decoded) == 1
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_json_request(ECHO_JSON_URL, engine):
+    resp = curl(ECHO_JSON_URL, __json={"key": ["value", 1]}, engine=engine)
+    assert resp.request.method == "POST"
+    assert resp.json() == {
+        "body": {"key": ["value", 1]},
+        "content_type": "application/json",
+        "accept": "application/json",
+    }
+
+
+def test_json_request_command(ECHO_JSON_URL, tmp_path):
+    resp = curl_cmd("curl --json '{\"a\": 1}' -H 'Accept: */*' %s" % ECHO_JSON_URL)
+    assert resp.json()["body"] == {"a": 1}
+    assert resp.json()["accept"] == "*/*"
+    path = tmp_path / "body.json"
+    path.write_text('{"b": 2}')
+    resp = curl(ECHO_JSON_URL, __json="@%s" % path)
+    assert resp.json()["body"] == {"b": 2}
+
+
+def test_iter_json_lines():
+    chunks = [b'{"a"', b': 1}\n\n{"a": 2}', b"\n", b'{"a": 3}']
+    assert list(iter_json_lines(chunks)) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_iter_json(NDJSON_URL, engine):
+    with curl(NDJSON_URL + "50", _N=True, engine=engine) as resp:
+        assert [value["id"] for value in resp.iter_json()] == list(range(50))
+        assert resp.closed
+
+
+def test_aiter_json(NDJSON_URL):
+    async def ids():
+        resp = await acurl(NDJSON_URL + "20", _N=True)
+        return [value["id"] async for value in resp.aiter_json()]
+
+    assert asyncio.run(ids()) == list(range(20))
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+import httpalchemy
+from httpalchemy import _dispatch
+from httpalchemy._command import curl_cmd
+from httpalchemy._command import parse_command
+from httpalchemy._curl import acurl
+from httpalchemy._curl import create_curl_request
+from httpalchemy._curl import curl
+from httpalchemy._engines import get_engine
+from httpalchemy._exceptions import DownloadError
+from httpalchemy._exceptions import IncompatibleTypeError
+from httpalchemy._segmented import download
+from httpalchemy._segmented import split_ranges
+
+
+def body(size):
+    return bytes(i % 251 for i in range(size))
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(httpalchemy.config, "SEGMENT_MIN_SIZE", 1000)
+
+
+def test_range_options_parsing():
+    _, options = parse_command("curl -r 0-99 -C - -o out http://example.com")
+    assert dict(options) == {"_r": "0-99", "_C": "-", "_o": "out"}
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_range(RANGE_URL, engine):
+    resp = curl(RANGE_URL + "1000", _r="10-19", engine=engine)
+    assert resp.status_code == 206
+    assert resp.content == body(1000)[10:20]
+    resp = curl(RANGE_URL + "1000", __range="bytes=-5", engine=engine)
+    assert resp.request.headers["Range"] == "bytes=-5"
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_continue_at(RANGE_URL, tmp_path, engine):
+    output = tmp_path / "out"
+    output.write_bytes(body(400) + b"garbage")
+    curl(RANGE_URL + "1000", _C=400, _o=str(output), engine=engine)
+    assert output.read_bytes() == body(1000)
+
+
+def test_continue_at_output_size(RANGE_URL, tmp_path):
+    output = tmp_path / "out"
+    output.write_bytes(body(300))
+    resp = curl_cmd("curl -C - -o %s %s1000" % (output, RANGE_URL))
+    assert resp.request.headers["Range"] == "bytes=300-"
+    assert output.read_bytes() == body(1000)
+    # Nothing is left to download: the server answers 416 and the file stays
+    resp = curl_cmd("curl -C - -o %s %s1000" % (output, RANGE_URL))
+    assert resp.status_code == 416
+    assert output.read_bytes() == body(1000)
+
+
+def test_continue_at_new_file(RANGE_URL, tmp_path):
+    output = tmp_path / "out"
+    resp = curl(RANGE_URL + "100", _C="-", _o=str(output))
+    assert resp.request.headers is None
+    assert output.read_bytes() == body(100)
+
+
+def test_continue_at_errors(RANGE_URL, tmp_path):
+    with pytest.raises(IncompatibleTypeError):
+        curl(RANGE_URL + "100", _C="-")
+    output = tmp_path / "out"
+    output.write_bytes(b"partial")
+    with pytest.raises(DownloadError):
+        curl(RANGE_URL + "100?ranges=false", _C="-", _o=str(output))
+    assert output.read_bytes() == b"partial"
+
+
+def test_split_ranges(small_segments):
+    assert split_ranges(10000, 4) == [
+        (0, 2499),
+        (2500, 4999),
+        (5000, 7499),
+        (7500, 9999),
+    ]
+    assert split_ranges(10001, 2) == [(0, 5000), (5001, 10000)]
+    assert split_ranges(2500, 8) == [(0, 1249), (1250, 2499)]
+    assert split_ranges(999, 8) == [(0, 998)]
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_segmented_download(RANGE_URL, tmp_path, small_segments, engine):
+    output = tmp_path / "out"
+    output.write_bytes(b"x" * 20000)
+    resp = curl(RANGE_URL + "10007", _o=str(output), segments=4, engine=engine)
+    assert resp.status_code == 200
+    assert resp.timings.size_download == 10007
+    assert output.read_bytes() == body(10007)
+
+
+def test_segmented_download_write_out(RANGE_URL, tmp_path, small_segments, capsys):
+    output = tmp_path / "out"
+    curl(RANGE_URL + "4000", _o=str(output), _w="%{size_download}", segments=4)
+    assert capsys.readouterr().out == "4000"
+
+
+def test_segmented_download_without_ranges(RANGE_URL, tmp_path, small_segments):
+    output = tmp_path / "out"
+    resp = curl(RANGE_URL + "5000?ranges=false", _o=str(output), segments=4)
+    assert resp.status_code == 200
+    assert output.read_bytes() == body(5000)
+
+
+def test_segmented_download_small_file(RANGE_URL, tmp_path, small_segments):
+    output = tmp_path / "out"
+    curl(RANGE_URL + "500", _o=str(output), segments=4)
+    assert output.read_bytes() == body(500)
+
+
+def test_asynchronous_segmented_download(RANGE_URL, tmp_path, small_segments):
+    output = tmp_path / "out"
+    resp = asyncio.run(acurl(RANGE_URL + "6000", _o=str(output), segments=3))
+    assert resp.status_code == 200
+    assert output.read_bytes() == body(6000)
+
+
+def test_failed_segmented_download(RANGE_URL, tmp_path, small_segments):
+    output = tmp_path / "out"
+    send = _dispatch._send_request
+
+    def failing_send(engine, curl_request):
+        if curl_request.headers["Range"] == "bytes=2000-2999":
+            raise DownloadError("Segment lost")
+        return send(engine, curl_request)
+
+    curl_request = create_curl_request(RANGE_URL + "4000", _o=str(output), segments=4)
+    with pytest.raises(DownloadError):
+        download(failing_send, get_engine("requests"), curl_request)
+    # Only the segments written from the start of the file are kept
+    assert output.read_bytes() == body(2000)
+    curl(RANGE_URL + "4000", _o=str(output), _C="-")
+    assert output.read_bytes() == body(4000)
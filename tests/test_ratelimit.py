@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+
+from httpalchemy import set_rate_limit
+from httpalchemy._batch import curl_many
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._exceptions import InvalidOptionError
+from httpalchemy._ratelimit import TokenBucket
+from httpalchemy._ratelimit import parse_rate
+from httpalchemy._ratelimit import rate_limiter
+from httpalchemy._ratelimit import throttled_chunk_size
+from httpalchemy._uploads import ThrottledBody
+
+
+@pytest.fixture
+def limiter():
+    yield rate_limiter
+    rate_limiter.clear()
+
+
+def test_parse_rate():
+    assert parse_rate("100K") == 100 * 1024
+    assert parse_rate("1.5m") == 1.5 * 1024 * 1024
+    assert parse_rate("200") == 200
+    assert parse_rate(2048) == 2048
+    assert parse_rate("0") is None
+    with pytest.raises(InvalidOptionError):
+        parse_rate("fast")
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+    assert 0.19 < bucket.reserve() <= 0.2
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_rate_limit_is_shared_by_threads(SERVER_URL, limiter):
+    set_rate_limit("127.0.0.1", 20, burst=2)
+    started = time.monotonic()
+    results = list(curl_many([SERVER_URL] * 6, max_workers=6))
+    # 2 requests go right away, the 4 others are spaced by 50ms
+    assert time.monotonic() - started >= 0.19
+    assert all(result.response.status_code == 200 for result in results)
+
+
+def test_rate_limit_per_host(SERVER_URL, limiter):
+    set_rate_limit("*", 10)
+    set_rate_limit("localhost", 1000, burst=10)
+    started = time.monotonic()
+    for _ in range(3):
+        curl("http://localhost:7575/")
+    assert time.monotonic() - started < 0.1
+
+    curl(SERVER_URL)
+    curl(SERVER_URL)
+    assert time.monotonic() - started >= 0.09
+
+    set_rate_limit("*", None)
+    started = time.monotonic()
+    curl(SERVER_URL)
+    curl(SERVER_URL)
+    assert time.monotonic() - started < 0.09
+
+
+def test_setting_a_limit_keeps_other_buckets(limiter):
+    limiter.set_limit("*", 10)
+    limiter.set_limit("a.example", 5)
+    a = limiter._bucket("http://a.example/")
+    b = limiter._bucket("http://b.example/")
+    limiter.set_limit("c.example", 1)
+    assert limiter._bucket("http://a.example/") is a
+    assert limiter._bucket("http://b.example/") is b
+
+    limiter.set_limit("*", 20)
+    assert limiter._bucket("http://a.example/") is a
+    assert limiter._bucket("http://b.example/").rate == 20
+
+    limiter.set_limit("a.example", None)
+    assert limiter._bucket("http://a.example/").rate == 20
+
+
+def test_async_rate_limit(SERVER_URL, limiter):
+    set_rate_limit("127.0.0.1", 20)
+
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(acurl(SERVER_URL) for _ in range(4)))
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.14
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_limit_rate_download(BYTES_URL, engine):
+    started = time.monotonic()
+    response = curl(BYTES_URL + "1000", __limit_rate="2K", engine=engine)
+    assert time.monotonic() - started >= 0.45
+    assert response.content == b"x" * 1000
+    assert response.text == "x" * 1000
+    assert response.timings.size_download == 1000
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_limit_rate_upload(ECHO_BODY_URL, engine):
+    started = time.monotonic()
+    response = curl(
+        ECHO_BODY_URL, _X="POST", _d="x" * 1000, __limit_rate=4096, engine=engine
+    )
+    assert time.monotonic() - started >= 0.2
+    assert response.json() == "x" * 1000
+
+
+def test_async_limit_rate(BYTES_URL):
+    async def main():
+        return await acurl(BYTES_URL + "1000", __limit_rate="2k")
+
+    started = time.monotonic()
+    response = asyncio.run(main())
+    assert time.monotonic() - started >= 0.45
+    assert response.content == b"x" * 1000
+
+
+def test_limit_rate_output(BYTES_URL, tmp_path):
+    output = tmp_path / "body"
+    started = time.monotonic()
+    curl(BYTES_URL + "1000", __limit_rate="2K", _o=str(output))
+    assert time.monotonic() - started >= 0.45
+    assert output.read_bytes() == b"x" * 1000
+
+
+def test_throttled_chunk_size():
+    assert throttled_chunk_size(1024 * 1024) == 16 * 1024
+    assert throttled_chunk_size(1024) == 1024
+    assert throttled_chunk_size(0.5) == 1
+    assert throttled_chunk_size(1024 * 1024, 4096) == 4096
+    body = ThrottledBody(b"x" * 40000, 1024 * 1024)
+    assert [len(chunk) for chunk in body] == [16384, 16384, 7232]
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_limit_rate_paces_small_chunks(BYTES_URL, engine):
+    # Chunks never hold more than a second of transfer
+    with curl(BYTES_URL + "6000", __limit_rate="4K", _N=True, engine=engine) as resp:
+        sizes = [len(chunk) for chunk in resp.iter_bytes()]
+    assert sum(sizes) == 6000
+    assert max(sizes) <= 4096
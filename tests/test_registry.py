@@ -0,0 +1,123 @@
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+
+import pytest
+
+from httpalchemy import _engines
+from httpalchemy._curl import curl
+from httpalchemy._engines import Engine
+from httpalchemy._engines import cold_start_times
+from httpalchemy._engines import engines
+from httpalchemy._engines import get_engine
+from httpalchemy._engines import register_engine
+from httpalchemy._engines import resolve_proxies
+from httpalchemy._exceptions import UnknownEngineError
+
+
+class DummyEngine(Engine):
+    def _convert_request(self, curl_request):
+        ...
+
+    def _send(self, request, curl_request, proxies):
+        ...
+
+    def handle_curl(self, request):
+        return self.build_response(
+            request, status_code=200, reason="OK", headers=[], content=b"dummy"
+        )
+
+
+@pytest.fixture
+def registered():
+    yield
+    for name in ("dummy", "plugin"):
+        _engines._registry.pop(name, None)
+        _engines._shared_engines.pop(name, None)
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys, httpalchemy; "
+        "print(sorted({'requests', 'httpx', 'urllib3', 'asyncio'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_cold_start_is_recorded():
+    get_engine("requests")
+    assert cold_start_times()["requests"] > 0
+
+
+def test_bundled_engines_stay_importable():
+    from httpalchemy._engines import requestsEngine
+    from httpalchemy._requests_engine import requestsEngine as engine_class
+
+    assert requestsEngine is engine_class
+
+
+def test_register_engine(registered):
+    register_engine("dummy", "tests.test_registry:DummyEngine")
+    assert curl("http://example.com", engine="dummy").content == b"dummy"
+    assert isinstance(get_engine("dummy"), DummyEngine)
+
+
+def test_entry_point_engine(monkeypatch, registered):
+    entry_point = EntryPoint(
+        name="plugin",
+        value="tests.test_registry:DummyEngine",
+        group=_engines.ENTRY_POINT_GROUP,
+    )
+    monkeypatch.setattr(_engines, "_entry_points_loaded", False)
+    monkeypatch.setattr(
+        "importlib.metadata.entry_points", lambda group=None: [entry_point]
+    )
+    assert isinstance(get_engine("plugin"), DummyEngine)
+
+
+def test_engines_enum_creates_engines():
+    from httpalchemy._requests_engine import requestsEngine
+
+    assert engines.requests.value == "requests"
+    engine = engines.requests.value()
+    assert isinstance(engine, requestsEngine)
+    assert engine is not get_engine(engines.requests)
+    engine.close()
+
+
+def test_unknown_engine():
+    with pytest.raises(UnknownEngineError):
+        get_engine("missing")
+
+
+def test_proxies_are_resolved_per_call(monkeypatch):
+    for name in ("http_proxy", "https_proxy", "all_proxy", "no_proxy"):
+        monkeypatch.delenv(name, raising=False)
+        monkeypatch.delenv(name.upper(), raising=False)
+    assert resolve_proxies("http://example.com") == {}
+
+    monkeypatch.setenv("http_proxy", "http://proxy:3128")
+    monkeypatch.setenv("no_proxy", "internal.example.com")
+    assert resolve_proxies("http://example.com") == {"http": "http://proxy:3128"}
+    assert resolve_proxies("http://internal.example.com:8080/path") == {}
+
+    monkeypatch.setattr("httpalchemy.config.HTTPS_PROXY", "http://configured:8080")
+    assert resolve_proxies("https://example.com") == {
+        "https": "http://configured:8080"
+    }
+
+
+def test_engine_proxies(monkeypatch):
+    monkeypatch.setenv("http_proxy", "http://proxy:3128")
+    engine = DummyEngine(proxies={})
+    assert engine.get_proxies("http://example.com") == {}
+
+
+def test_engine_classes_are_public():
+    import httpalchemy
+    from httpalchemy._httpx_engine import httpxEngine
+
+    assert httpalchemy.httpxEngine is httpxEngine
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import time
+import uuid
+
+import pytest
+
+from httpalchemy import config
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._engines import get_engine
+from httpalchemy._exceptions import InvalidOptionError
+from httpalchemy._exceptions import RecordNotFoundError
+from httpalchemy._replay import RecordingEngine
+from httpalchemy._replay import ReplayStore
+from httpalchemy._replay import _file_digest
+from httpalchemy._replay import replayEngine
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "store")
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx", "urllib3"])
+def test_record_and_replay(store, SERVER_URL, ECHO_BODY_URL, engine):
+    with RecordingEngine(store, engine) as recorder:
+        recorded = curl(SERVER_URL, engine=recorder)
+        curl(ECHO_BODY_URL, _X="POST", _d="a=1", engine=recorder)
+    replay = replayEngine(store)
+    replayed = curl(SERVER_URL, engine=replay)
+    assert replayed.status_code == recorded.status_code
+    assert replayed.content == recorded.content
+    assert replayed.headers["Content-Type"] == recorded.headers["Content-Type"]
+    assert replayed.timings.time_total > 0
+    assert curl(ECHO_BODY_URL, _X="POST", _d="a=1", engine=replay).json() == "a=1"
+    with pytest.raises(RecordNotFoundError):
+        curl(ECHO_BODY_URL, _X="POST", _d="a=2", engine=replay)
+
+
+def test_replay_engine_by_name(store, SERVER_URL):
+    with RecordingEngine(store) as recorder:
+        curl(SERVER_URL, engine=recorder)
+    config.REPLAY_STORE = store
+    try:
+        assert curl(SERVER_URL, engine="replay").status_code == 200
+    finally:
+        config.REPLAY_STORE = None
+    with pytest.raises(InvalidOptionError):
+        replayEngine()
+
+
+def test_replay_latency(store, SLOW_URL):
+    with RecordingEngine(store) as recorder:
+        curl(SLOW_URL + "?delay=0.2", engine=recorder)
+    started = time.monotonic()
+    curl(SLOW_URL + "?delay=0.2", engine=replayEngine(store))
+    assert time.monotonic() - started < 0.2
+    started = time.monotonic()
+    curl(SLOW_URL + "?delay=0.2", engine=replayEngine(store, latency="recorded"))
+    assert time.monotonic() - started >= 0.2
+    started = time.monotonic()
+    delays = []
+    engine = replayEngine(store, latency=lambda record: delays.append(record) or 0.1)
+    curl(SLOW_URL + "?delay=0.2", engine=engine)
+    assert 0.1 <= time.monotonic() - started < 0.2
+    assert delays[0].url == SLOW_URL + "?delay=0.2"
+
+
+def test_replay_in_turn(store, FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex
+    with RecordingEngine(store) as recorder:
+        statuses = [curl(url, engine=recorder).status_code for _ in range(2)]
+    assert statuses == [503, 200]
+    replay = replayEngine(store)
+    assert [curl(url, engine=replay).status_code for _ in range(4)] == [
+        503,
+        200,
+        503,
+        200,
+    ]
+
+
+def test_replay_fallback(store, SERVER_URL):
+    replay = replayEngine(store, fallback="urllib3")
+    assert curl(SERVER_URL, engine=replay).status_code == 200
+
+
+def test_match_headers(store, ECHO_HEADERS):
+    with RecordingEngine(store) as recorder:
+        curl(ECHO_HEADERS, _H=["X-Token: a", "X-Trace: 1"], engine=recorder)
+    replay = replayEngine(store)
+    assert curl(ECHO_HEADERS, _H=["x-trace: 1", "X-Token: a"], engine=replay)
+    with pytest.raises(RecordNotFoundError):
+        curl(ECHO_HEADERS, _H=["X-Token: a", "X-Trace: 2"], engine=replay)
+    # Opening the store with other `match_headers` rebuilds its index
+    replay = replayEngine(ReplayStore(store, match_headers=["X-Token"]))
+    assert curl(ECHO_HEADERS, _H=["X-Token: a", "X-Trace: 2"], engine=replay)
+    with pytest.raises(RecordNotFoundError):
+        curl(ECHO_HEADERS, _H=["X-Token: b"], engine=replay)
+
+
+def test_append_to_store(store, SERVER_URL, BYTES_URL):
+    with RecordingEngine(store) as recorder:
+        curl(SERVER_URL, engine=recorder)
+    with RecordingEngine(store) as recorder:
+        curl(BYTES_URL + "300", engine=recorder)
+    reopened = ReplayStore(store)
+    assert len(reopened) == 2
+    assert [record.url for record in reopened] == [SERVER_URL, BYTES_URL + "300"]
+    response = curl(BYTES_URL + "300", engine=replayEngine(reopened))
+    assert len(response.content) == 300
+
+
+def test_streamed_requests_are_not_recorded(store, BYTES_URL):
+    with RecordingEngine(store) as recorder:
+        with curl(BYTES_URL + "10", _N=True, engine=recorder) as response:
+            assert len(response.content) == 10
+    assert len(ReplayStore(store)) == 0
+
+
+def test_replay_to_file(store, BYTES_URL, tmp_path):
+    with RecordingEngine(store) as recorder:
+        curl(BYTES_URL + "1000", engine=recorder)
+    path = tmp_path / "out.bin"
+    curl(BYTES_URL + "1000", _o=str(path), engine=replayEngine(store))
+    assert path.stat().st_size == 1000
+
+
+def test_export_har(store, SERVER_URL, ECHO_BODY_URL, BYTES_URL, tmp_path):
+    with RecordingEngine(store) as recorder:
+        curl(SERVER_URL + "/?a=1", engine=recorder)
+        curl(ECHO_BODY_URL, _X="POST", _d="body", engine=recorder)
+        curl(BYTES_URL + "4", engine=recorder)
+        path = tmp_path / "store.har"
+        recorder.store.export_har(str(path))
+    log = json.loads(path.read_text())["log"]
+    assert log["version"] == "1.2"
+    first, second, third = log["entries"]
+    assert first["request"]["queryString"] == [{"name": "a", "value": "1"}]
+    assert first["response"]["status"] == 200
+    assert second["request"]["method"] == "POST"
+    assert second["request"]["postData"]["text"] == "body"
+    assert second["response"]["content"]["text"] == '"body"'
+    assert third["response"]["content"]["size"] == 4
+
+
+def test_async_replay(store, SERVER_URL):
+    with RecordingEngine(store) as recorder:
+        curl(SERVER_URL, engine=recorder)
+    replay = replayEngine(store, latency=0.05)
+
+    async def main():
+        requests = (acurl(SERVER_URL, engine=replay) for _ in range(20))
+        return await asyncio.gather(*requests)
+
+    started = time.monotonic()
+    responses = asyncio.run(main())
+    assert time.monotonic() - started < 0.5
+    assert {response.status_code for response in responses} == {200}
+
+
+def test_closing_keeps_the_shared_engines(store, SERVER_URL):
+    shared = get_engine("urllib3")
+    with RecordingEngine(store, "urllib3") as recorder:
+        curl(SERVER_URL, engine=recorder)
+    with replayEngine(store, fallback="urllib3") as replay:
+        curl(SERVER_URL + "/?a=1", engine=replay)
+    assert shared.pool_gauges()["127.0.0.1:7575"].idle >= 1
+
+
+def test_unflushed_records_are_indexed_on_reopen(store, SERVER_URL, BYTES_URL):
+    with RecordingEngine(store) as recorder:
+        curl(SERVER_URL, engine=recorder)
+    recorder = RecordingEngine(store)
+    curl(BYTES_URL + "20", engine=recorder)
+    # The process dies before the records are indexed
+    recorder.store._writer.flush()
+    reopened = ReplayStore(store)
+    assert len(reopened) == 2
+    assert len(curl(BYTES_URL + "20", engine=replayEngine(reopened)).content) == 20
+
+
+def test_decoded_records_are_bounded(store, BYTES_URL, monkeypatch):
+    with RecordingEngine(store) as recorder:
+        for size in (1, 2, 3):
+            curl(BYTES_URL + str(size), engine=recorder)
+    monkeypatch.setattr(config, "REPLAY_DECODED_CACHE_SIZE", 2)
+    replay = replayEngine(store)
+    for size in (1, 2, 3, 2):
+        assert len(curl(BYTES_URL + str(size), engine=replay).content) == size
+    decoded = replay.store._decoded
+    assert [record.url for record in decoded.values()] == [
+        BYTES_URL + "3",
+        BYTES_URL + "2",
+    ]
+
+
+def test_replay_upload(store, ECHO_BODY_URL, tmp_path):
+    upload = tmp_path / "upload.txt"
+    upload.write_text("first")
+    with RecordingEngine(store) as recorder:
+        curl(ECHO_BODY_URL, _X="POST", _T=str(upload), engine=recorder)
+    replay = replayEngine(store)
+    _file_digest.cache_clear()
+    for _ in range(3):
+        curl(ECHO_BODY_URL, _X="POST", _T=str(upload), engine=replay)
+    assert _file_digest.cache_info().misses == 1
+    upload.write_text("second")
+    with pytest.raises(RecordNotFoundError):
+        curl(ECHO_BODY_URL, _X="POST", _T=str(upload), engine=replay)
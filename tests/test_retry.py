@@ -0,0 +1,169 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from httpalchemy import config
+from httpalchemy._command import curl_cmd
+from httpalchemy._curl import acurl
+from httpalchemy._curl import create_curl_request
+from httpalchemy._curl import curl
+from httpalchemy._engines import get_engine
+from httpalchemy._retry import LatencyTracker
+from httpalchemy._retry import can_hedge
+from httpalchemy._retry import latencies
+from httpalchemy._retry import retry_delay
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(config, "RETRY_INITIAL_DELAY", 0.01)
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_retry_transient_status(FLAKY_URL, engine):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=2"
+    response = curl(url, __retry=2, engine=engine)
+    assert response.status_code == 200
+    assert response.json() == {"attempts": 3}
+
+
+def test_retry_gives_up(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=5"
+    response = curl(url, __retry=1)
+    assert response.status_code == 503
+
+
+def test_no_retry_by_default(FLAKY_URL):
+    response = curl(FLAKY_URL + uuid.uuid4().hex)
+    assert response.status_code == 503
+
+
+def test_retry_max_time(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=5"
+    started = time.monotonic()
+    response = curl(url, __retry=5, __retry_delay=0.2, __retry_max_time=0.3)
+    assert response.status_code == 503
+    assert time.monotonic() - started < 1
+
+
+def test_retry_from_command(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=1"
+    response = curl_cmd("curl --retry 1 --retry-delay 0.01 %s" % url)
+    assert response.json() == {"attempts": 2}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    engine = get_engine("requests")
+    sent = []
+
+    def handle_curl(curl_request):
+        sent.append(curl_request)
+        return type(engine).handle_curl(engine, curl_request)
+
+    monkeypatch.setattr(engine, "handle_curl", handle_curl)
+    return sent
+
+
+def test_retry_connrefused(sent):
+    with pytest.raises(Exception):
+        curl("http://127.0.0.1:1", __retry=2)
+    assert len(sent) == 1
+    with pytest.raises(Exception):
+        curl("http://127.0.0.1:1", __retry=2, __retry_connrefused=True)
+    assert len(sent) == 4
+
+
+def test_retry_delay_prefers_retry_after(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?retry_after=3"
+    response = curl(url)
+    curl_request = create_curl_request(url, __retry_delay=1)
+    assert retry_delay(curl_request, 0, response) == 3
+    assert retry_delay(curl_request, 0) == 1
+
+
+def test_backoff_is_capped(monkeypatch):
+    monkeypatch.setattr(config, "RETRY_MAX_DELAY", 2)
+    curl_request = create_curl_request("http://example.com")
+    delays = [retry_delay(curl_request, 30) for _ in range(20)]
+    assert all(1 <= delay <= 2 for delay in delays)
+
+
+def test_async_retry(FLAKY_URL):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=1"
+    response = asyncio.run(acurl(url, __retry=1))
+    assert response.json() == {"attempts": 2}
+
+
+def test_latency_tracker():
+    tracker = LatencyTracker(window=10, min_samples=5)
+    for latency in range(4):
+        tracker.record("host", latency)
+    assert tracker.percentile("host", 50) is None
+    for latency in range(4, 20):
+        tracker.record("host", latency)
+    assert tracker.percentile("host", 50) == 15
+
+
+@pytest.fixture
+def fast_history(SERVER_URL):
+    host = SERVER_URL.split("//")[1]
+    latencies.clear()
+    for _ in range(config.HEDGE_MIN_SAMPLES):
+        latencies.record(host, 0.05)
+    yield
+    latencies.clear()
+
+
+def test_hedge_sends_duplicate(SLOW_URL, fast_history, sent):
+    response = curl(SLOW_URL + "?delay=0.3", hedge=95)
+    assert response.json() == {"delay": 0.3}
+    assert len(sent) == 2
+
+    sent.clear()
+    curl(SLOW_URL, hedge=95)
+    assert len(sent) == 1
+
+
+def test_hedge_skips_non_idempotent(SLOW_URL):
+    curl_request = create_curl_request(SLOW_URL, _X="POST", hedge=95)
+    assert not can_hedge(curl_request)
+    assert can_hedge(create_curl_request(SLOW_URL, hedge=95))
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"_T": __file__},
+        {"_X": "PUT", "_d": "a=1"},
+        {"_X": "PUT", "_d": "@-"},
+        {"_X": "PUT", "__data_binary": "payload"},
+        {"_X": "PUT", "_F": ["field=value"]},
+    ],
+)
+def test_hedge_skips_requests_with_a_body(SLOW_URL, options):
+    assert not can_hedge(create_curl_request(SLOW_URL, hedge=95, **options))
+
+
+def test_async_hedge(SLOW_URL, fast_history):
+    response = asyncio.run(acurl(SLOW_URL + "?delay=0.2", hedge=95))
+    assert response.json() == {"delay": 0.2}
+
+
+def test_write_out_once_with_retries(FLAKY_URL, capsys):
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=1"
+    curl(url, __retry=2, __retry_delay=0, _w="[%{http_code}]")
+    assert capsys.readouterr().out == "[200]"
+    url = FLAKY_URL + uuid.uuid4().hex + "?failures=1"
+    asyncio.run(acurl(url, __retry=2, __retry_delay=0, _w="[%{http_code}]"))
+    assert capsys.readouterr().out == "[200]"
+
+
+def test_write_out_once_with_hedging(SLOW_URL, fast_history, sent, capsys):
+    curl(SLOW_URL + "?delay=0.3", hedge=95, _w="[%{http_code}]")
+    assert len(sent) == 2
+    # Let the losing attempt complete and be closed
+    time.sleep(0.5)
+    assert capsys.readouterr().out == "[200]"
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from httpalchemy._exceptions import IncompatibleTypeError
+from httpalchemy._template import CurlTemplate
+
+
+def test_template_build():
+    template = CurlTemplate(
+        "http://example.com/items/{id}",
+        _X="POST",
+        _H=["Content-Type: text/plain"],
+        _u="user:pass",
+    )
+    curl_request = template.build(id=5, params={"page": "2"}, data="body")
+    assert curl_request.url == "http://example.com/items/5?page=2"
+    assert curl_request.method == "POST"
+    assert curl_request.data == "body"
+    assert curl_request.auth is None
+    assert curl_request.headers["Authorization"] == "Basic dXNlcjpwYXNz"
+
+    other = template.build(id=6)
+    assert other.url == "http://example.com/items/6"
+    assert other.data is None
+    assert other.headers is curl_request.headers
+
+
+def test_template_literal_braces():
+    assert CurlTemplate("http://h/?q={}").build().url == "http://h/?q={}"
+    url = 'http://h/?filter={"a":1}'
+    assert CurlTemplate(url).build(params={"page": "2"}).url == url + "&page=2"
+
+
+def test_template_requests(ECHO_BODY_URL):
+    template = CurlTemplate(ECHO_BODY_URL, _X="POST", engine="httpx")
+    assert template.curl(data="first").text == '"first"'
+    assert asyncio.run(template.acurl(data="second")).text == '"second"'
+
+
+def test_template_data_replaces_the_body():
+    template = CurlTemplate("http://example.com/", __json={"a": 1})
+    curl_request = template.build(data='{"b": 2}')
+    assert curl_request.data_binary == '{"b": 2}'
+    assert curl_request.data is None
+    assert curl_request.method == "POST"
+
+    template = CurlTemplate("http://example.com/", __data_binary="old")
+    assert template.build(data="new").data_binary == "new"
+
+    with pytest.raises(IncompatibleTypeError):
+        CurlTemplate("http://example.com/", _F={"a": "b"}).build(data="new")
+
+
+def test_template_options_resolved_per_call(tmp_path):
+    upload = tmp_path / "upload.txt"
+    upload.write_text("content")
+    template = CurlTemplate("http://example.com/{folder}/", _T=str(upload))
+    assert template.build(folder="a").url == "http://example.com/a/upload.txt"
+
+    output = tmp_path / "output"
+    etag = tmp_path / "etag"
+    template = CurlTemplate(
+        "http://example.com/", _o=str(output), _C="-", __etag_compare=str(etag)
+    )
+    assert "Range" not in (template.build().headers or {})
+    output.write_bytes(b"x" * 10)
+    etag.write_text('"v1"\n')
+    curl_request = template.build()
+    assert curl_request.continue_at == 10
+    assert curl_request.headers["Range"] == "bytes=10-"
+    assert curl_request.headers["If-None-Match"] == '"v1"'
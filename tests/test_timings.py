@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from httpalchemy._command import curl_cmd
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._engines import httpxEngine
+from httpalchemy._engines import requestsEngine
+from httpalchemy._timings import Timings
+
+ENGINES = {"requests": requestsEngine, "httpx": httpxEngine}
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_timings_new_and_reused_connection(BYTES_URL, engine):
+    with ENGINES[engine]() as engine_instance:
+        first = curl(BYTES_URL + "1000", engine=engine_instance)
+        timings = first.timings
+        assert timings.num_connects == 1
+        assert 0 < timings.time_connect <= timings.time_pretransfer
+        assert timings.time_pretransfer <= timings.time_starttransfer
+        assert timings.time_starttransfer <= timings.time_total
+        assert timings.size_download == 1000
+        assert timings.speed_download > 0
+
+        second = curl(BYTES_URL + "1000", engine=engine_instance)
+        assert second.timings.num_connects == 0
+        assert second.timings.time_connect == 0
+        assert 0 < second.timings.time_starttransfer <= second.timings.time_total
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_streamed_timings_finish_on_close(BYTES_URL, engine):
+    response = curl(BYTES_URL + "5000", _N=True, engine=engine)
+    assert response.timings.time_total == 0
+    assert sum(len(chunk) for chunk in response.iter_bytes()) == 5000
+    assert response.timings.time_total > 0
+    assert response.timings.size_download == 5000
+
+
+def test_async_timings(BYTES_URL):
+    async def main():
+        async with httpxEngine() as engine:
+            return await acurl(BYTES_URL + "100", engine=engine)
+
+    timings = asyncio.run(main()).timings
+    assert timings.num_connects == 1
+    assert 0 < timings.time_starttransfer <= timings.time_total
+    assert timings.size_download == 100
+
+
+def test_render():
+    timings = Timings()
+    timings.time_total = 0.5
+    timings.size_download = 100
+    rendered = timings.render(
+        "%{time_total} %{speed_download} %{num_connects} %{http_code}%{unknown}\\n",
+        http_code=200,
+    )
+    assert rendered == "0.500000 200.000000 0 200\n"
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_write_out(BYTES_URL, engine, capsys):
+    curl(BYTES_URL + "10", _w="%{http_code} %{size_download}\\n", engine=engine)
+    assert capsys.readouterr().out == "200 10\n"
+
+
+def test_write_out_from_command(BYTES_URL, capsys):
+    response = curl_cmd("curl -s -w '%%{num_connects}' %s" % (BYTES_URL + "10"))
+    assert capsys.readouterr().out == str(response.timings.num_connects)
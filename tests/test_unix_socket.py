@@ -0,0 +1,123 @@
+import asyncio
+import http.server
+import os
+import socketserver
+import sys
+import threading
+import uuid
+
+import pytest
+
+from httpalchemy._command import curl_cmd
+from httpalchemy._curl import acurl
+from httpalchemy._curl import curl
+from httpalchemy._exceptions import IncompatibleTypeError
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socketserver, "UnixStreamServer"), reason="needs Unix sockets"
+)
+
+ENGINES = ["requests", "httpx", "urllib3"]
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        size = int(self.path.rpartition("/")[2] or 0)
+        body = b"x" * size if size else self.headers["Host"].encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    connections = 0
+
+
+def serve(address):
+    server = Server(address, Handler)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def unix_socket(tmp_path):
+    path = str(tmp_path / "http.sock")
+    server = serve(path)
+    yield path, server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_unix_socket(unix_socket, engine):
+    path, server = unix_socket
+    for _ in range(3):
+        response = curl("http://localhost/", __unix_socket=path, engine=engine)
+        assert response.text == "localhost"
+    # The connection is pooled like a TCP one
+    assert server.connections == 1
+    assert response.timings.num_connects == 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_unix_socket_stream(unix_socket, engine):
+    path, _ = unix_socket
+    with curl(
+        "http://localhost/50000", __unix_socket=path, _N=True, engine=engine
+    ) as response:
+        assert len(b"".join(response.iter_bytes())) == 50000
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_async_unix_socket(unix_socket, engine):
+    path, server = unix_socket
+
+    async def main():
+        requests = (
+            acurl("http://localhost/", __unix_socket=path, engine=engine)
+            for _ in range(5)
+        )
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(main())
+    assert {response.text for response in responses} == {"localhost"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+@pytest.mark.parametrize("engine", ENGINES)
+def test_abstract_unix_socket(engine):
+    name = "httpalchemy-%s" % uuid.uuid4().hex
+    server = serve("\0" + name)
+    try:
+        response = curl("http://localhost/", __abstract_unix_socket=name, engine=engine)
+        assert response.text == "localhost"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix_socket_command(unix_socket):
+    path, _ = unix_socket
+    assert curl_cmd("curl --unix-socket %s http://localhost/" % path).text == (
+        "localhost"
+    )
+
+
+def test_unix_socket_errors(tmp_path):
+    missing = str(tmp_path / "missing.sock")
+    assert not os.path.exists(missing)
+    with pytest.raises(Exception):
+        curl("http://localhost/", __unix_socket=missing)
+    with pytest.raises(IncompatibleTypeError):
+        curl("http://localhost/", __unix_socket=missing, __abstract_unix_socket="a")
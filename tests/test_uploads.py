@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from tempfile import NamedTemporaryFile
+
+import pytest
+
+from httpalchemy import _uploads
+from httpalchemy._curl import acurl
+from httpalchemy._curl import create_curl_request
+from httpalchemy._curl import curl
+from httpalchemy._uploads import MultipartEncoder
+from httpalchemy._uploads import UploadBody
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "upload.txt"
+    path.write_bytes(b"line1\r\nline2\n" * 1000)
+    return str(path)
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_data_binary_file(ECHO_BODY_URL, upload, engine):
+    resp = curl(ECHO_BODY_URL, _X="POST", __data_binary="@" + upload, engine=engine)
+    assert resp.json() == "line1\r\nline2\n" * 1000
+    assert resp.raw.request.headers["Content-Length"] == str(13 * 1000)
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_data_file_strips_newlines(ECHO_BODY_URL, upload, engine):
+    resp = curl(ECHO_BODY_URL, _X="POST", _d="@" + upload, engine=engine)
+    assert resp.json() == "line1line2" * 1000
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_upload_file(ECHO_BODY_URL, upload, engine):
+    resp = curl(ECHO_BODY_URL + "/", _T=upload, engine=engine)
+    assert resp.raw.request.method == "PUT"
+    assert str(resp.raw.request.url).endswith("/echo_body/upload.txt")
+    assert resp.json() == "line1\r\nline2\n" * 1000
+
+
+@pytest.mark.parametrize("engine", ["requests", "httpx"])
+def test_multipart_fields(ECHO_FORM_URL, upload, engine):
+    resp = curl(
+        ECHO_FORM_URL,
+        _X="POST",
+        _F=["name=value", "file=@%s;type=text/plain" % upload],
+        engine=engine,
+    )
+    assert resp.json() == {
+        "name": "value",
+        "file": ["upload.txt", "text/plain", 13 * 1000],
+    }
+
+
+def test_async_multipart(ECHO_FORM_URL, upload):
+    resp = asyncio.run(
+        acurl(ECHO_FORM_URL, _X="POST", _F=["file=@%s" % upload], engine="httpx")
+    )
+    assert resp.json() == {"file": ["upload.txt", "text/plain", 13 * 1000]}
+
+
+@pytest.mark.parametrize("data", ["_d", "__data_binary"])
+def test_async_file_reads_leave_the_loop(ECHO_BODY_URL, upload, monkeypatch, data):
+    loop_thread = threading.get_ident()
+    open_threads = set()
+
+    def tracked_open(*args):
+        open_threads.add(threading.get_ident())
+        return open(*args)
+
+    monkeypatch.setattr(_uploads, "open", tracked_open, raising=False)
+    options = {data: "@" + upload}
+    resp = asyncio.run(acurl(ECHO_BODY_URL, _X="POST", engine="httpx", **options))
+    assert resp.json().replace("\r", "").replace("\n", "") == "line1line2" * 1000
+    assert open_threads and loop_thread not in open_threads
+
+
+def test_upload_body_is_abstract():
+    with pytest.raises(TypeError):
+        UploadBody()
+
+
+def test_multipart_encoder_length(upload):
+    encoder = MultipartEncoder({"a": "b", "file": "@" + upload}, boundary="xyz")
+    body = b"".join(encoder)
+    assert len(encoder) == len(body)
+    assert body.endswith(b"--xyz--\r\n")
+    assert b"".join(encoder) == body
+
+
+def test_upload_request_method():
+    with NamedTemporaryFile() as f:
+        curl_request = create_curl_request("http://example.com/", _T=f.name)
+        assert curl_request.method == "PUT"
+        assert curl_request.url.startswith("http://example.com/tmp")
+
+        curl_request = create_curl_request("http://example.com/x", _T=f.name, _X="POST")
+        assert curl_request.method == "POST"
+        assert curl_request.url == "http://example.com/x"